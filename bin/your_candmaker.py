@@ -22,8 +22,10 @@ from multiprocessing import Pool
 import numpy as np
 import pandas as pd
 
-from your.candidate import Candidate, crop
-from your.utils.gpu import gpu_dedisp_and_dmt_crop
+from your.candidate import Candidate, crop, get_chunks
+from your.formats.psrfits import SUBINT_CACHE
+from your.utils.cpu import cpu_dedisp_and_dmt_crop_batch
+from your.utils.gpu import gpu_dedisp_and_dmt_crop_batch
 from your.utils.misc import YourArgparseFormatter
 
 logger = logging.getLogger()
@@ -37,7 +39,7 @@ def cpu_dedisp_dmt(cand, args):
         time_decimate_factor = pulse_width // 2
     logger.debug(f"Time decimation factor {time_decimate_factor}")
 
-    cand.dmtime()
+    cand.dmtime(target="numba")
     logger.info("Made DMT")
     if args.opt_dm:
         logger.info("Optimising DM")
@@ -68,13 +70,12 @@ def cpu_dedisp_dmt(cand, args):
     return cand
 
 
-def cand2h5(cand_val):
+def make_candidate(cand_val):
     """
-    TODO: Add option to use cand.resize for reshaping FT and DMT
-    Generates h5 file of candidate with resized frequency-time and DM-time arrays
-    :param cand_val: List of candidate parameters (filename, snr, width, dm, label, tcand(s))
-    :type cand_val: Candidate
-    :return: None
+    Makes the Candidate object of a row of the candidate csv
+    :param cand_val: List of candidate parameters (filename, snr, width, dm, label,
+    tcand(s), kill mask, num_files, args, gpu id)
+    :return: Candidate
     """
     (
         filename,
@@ -122,29 +123,57 @@ def cand2h5(cand_val):
         savgol_frequency_window=args.savgol_frequency_window,
         savgol_sigma=args.savgol_sigma,
         flag_rfi=args.flag_rfi,
+        subint_cache=SUBINT_CACHE,
     )
     if os.path.exists(str(kill_mask_path)):
         kill_mask = np.zeros(cand.nchans, dtype=np.bool_)
         kill_mask[kill_chans] = True
         cand.kill_mask = kill_mask
-    cand.get_chunk(for_preprocessing=True)
-    if cand.format == "fil":
-        cand.fp.close()
+    return cand
+
+
+def process_candidates(cands, args, gpu_id):
+    """
+    Makes the DM-time and dedispersed frequency-time arrays of candidates, whose chunks
+    have been read, and writes their h5 files. On the GPU (or with --fused) the
+    candidates whose chunks have the same shape are processed together.
+    :param cands: Candidates with their data
+    :param args: Input arguments
+    :param gpu_id: GPU ID (-1 for the CPU)
+    :return: None
+    """
+    for cand in cands:
+        if cand.format == "fil":
+            cand.fp.close()
 
     logger.info("Got Chunk")
 
     if gpu_id >= 0:
         logger.debug(f"Using the GPU {gpu_id}")
         try:
-            cand = gpu_dedisp_and_dmt_crop(cand, device=gpu_id)
+            gpu_dedisp_and_dmt_crop_batch(cands, device=gpu_id)
         except CudaAPIError:
             logger.info(
-                "Ran into a CudaAPIError, using the CPU version for this candidate"
+                "Ran into a CudaAPIError, using the CPU version for these candidates"
             )
-            cand = cpu_dedisp_dmt(cand, args)
+            cands = [cpu_dedisp_dmt(cand, args) for cand in cands]
+    elif args.fused:
+        cpu_dedisp_and_dmt_crop_batch(cands)
     else:
-        cand = cpu_dedisp_dmt(cand, args)
+        cands = [cpu_dedisp_dmt(cand, args) for cand in cands]
+
+    for cand in cands:
+        save_candidate(cand, args)
+
 
+def save_candidate(cand, args):
+    """
+    Resizes and normalises the DM-time and dedispersed frequency-time arrays of a
+    candidate and writes its h5 file
+    :param cand: Candidate with its DM-time and dedispersed arrays
+    :param args: Input arguments
+    :return: None
+    """
     cand.resize(
         key="ft", size=args.frequency_size, axis=1, anti_aliasing=True, mode="constant"
     )
@@ -162,6 +191,22 @@ def cand2h5(cand_val):
     return None
 
 
+def cands2h5(cand_vals):
+    """
+    Generates h5 files of a batch of candidates from the same files. Their chunks are
+    read together, so the data shared by candidates close in time is read once, and on
+    the GPU (or with --fused) they are dedispersed together.
+    :param cand_vals: List of candidate parameters of each candidate (filename, snr,
+    width, dm, label, tcand(s), kill mask, num_files, args, gpu id)
+    :return: None
+
+    """
+    cands = [make_candidate(cand_val) for cand_val in cand_vals]
+    get_chunks(cands, for_preprocessing=True)
+    process_candidates(cands, cand_vals[0][-2], cand_vals[0][-1])
+    return None
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog="your_candmaker.py",
@@ -264,6 +309,31 @@ if __name__ == "__main__":
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--subint_cache_mb",
+        help="Size of the cache of decoded PSRFITS subints per process (MB), reused by "
+        "candidates close in time",
+        type=float,
+        default=0,
+        required=False,
+    )
+    parser.add_argument(
+        "-b",
+        "--batch_size",
+        help="Number of candidates from the same files processed together, their "
+        "chunks are read at once (and dedispersed in one launch on the GPU or with "
+        "--fused)",
+        type=int,
+        default=16,
+        required=False,
+    )
+    parser.add_argument(
+        "--fused",
+        help="On the CPU, dedisperse, decimate and crop in a single pass as on the GPU "
+        "(with a time size of 256, and without DM optimisation)",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument(
         "--no_log_file", help="Do not write a log file", action="store_true"
     )
@@ -320,30 +390,45 @@ if __name__ == "__main__":
         logger.info("Using CPUs only")
 
     cand_pars = pd.read_csv(values.cand_param_file)
-    # Randomly shuffle the candidates, this is so that the high DM candidates are spread through out
-    # Else they will clog the GPU memory at once
-    cand_pars.sample(frac=1).reset_index(drop=True)
+    # Batches of candidates from the same files, close in time, so that their chunks can
+    # be read together
+    cand_pars = cand_pars.sort_values(["file", "stime"], kind="stable")
     process_list = []
-    for index, row in cand_pars.iterrows():
-        if len(values.gpu_id) > 1:
-            # If there are more than one GPUs cycle the candidates between them.
-            gpu_id = next(gpu_id_cycler)
-        else:
-            gpu_id = values.gpu_id[0]
-        process_list.append(
-            [
-                row["file"],
-                row["snr"],
-                2 ** row["width"],
-                row["dm"],
-                row["label"],
-                row["stime"],
-                row["chan_mask_path"],
-                row["num_files"],
-                values,
-                gpu_id,
-            ]
-        )
-
-    with Pool(processes=values.nproc) as pool:
-        pool.map(cand2h5, process_list, chunksize=1)
+    # the chunks of a batch are read through the same files, set by both the file and
+    # the number of files
+    for _, file_pars in cand_pars.groupby(
+        ["file", "num_files"], sort=False, dropna=False
+    ):
+        rows = [row for _, row in file_pars.iterrows()]
+        batch_size = max(values.batch_size, 1)
+        for i in range(0, len(rows), batch_size):
+            if len(values.gpu_id) > 1:
+                # If there are more than one GPUs cycle the batches between them.
+                gpu_id = next(gpu_id_cycler)
+            else:
+                gpu_id = values.gpu_id[0]
+            process_list.append(
+                [
+                    [
+                        row["file"],
+                        row["snr"],
+                        2 ** row["width"],
+                        row["dm"],
+                        row["label"],
+                        row["stime"],
+                        row["chan_mask_path"],
+                        row["num_files"],
+                        values,
+                        gpu_id,
+                    ]
+                    for row in rows[i : i + batch_size]
+                ]
+            )
+
+    # the candidates of a process share its subint cache
+    with Pool(
+        processes=values.nproc,
+        initializer=SUBINT_CACHE.resize,
+        initargs=(values.subint_cache_mb,),
+    ) as pool:
+        pool.map(cands2h5, process_list, chunksize=1)
@@ -7,12 +7,13 @@ Original C code: https://github.com/demorest/psrfits_utils/blob/master/combine_m
 """
 
 import argparse
+import fnmatch
 import glob
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import astropy.io.fits as pyfits
 import numpy as np
 from astropy.coordinates import SkyCoord
 from rich.logging import RichHandler
@@ -287,6 +288,26 @@ def write_fil(data, lowband_obj, upband_obj, filename=None, outdir=None):
     logger.info("Successfully written data to Filterbank file: %s", filfile)
 
 
+def open_bands(file1, file2):
+    """
+    Opens the two subbands from Mock spectrometer, reading
+    their headers concurrently.
+
+    Args:
+        file1: List of files from one subband
+        file2: List of files from other subband
+    Returns:
+        (lowband_obj, upband_obj): Your objects of the lower
+        and upper frequency bands
+
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        your1, your2 = pool.map(Your, [file1, file2])
+    if your1.chan_freqs.max() < your2.chan_freqs.max():
+        return your1, your2
+    return your2, your1
+
+
 def combine(
     file1,
     file2,
@@ -294,6 +315,7 @@ def combine(
     nsamp=100,
     outdir=None,
     filfile=None,
+    bands=None,
 ):
     """
     combines data from two subbands from Mock spectrometer
@@ -306,23 +328,24 @@ def combine(
         nsamp: number of samples to read
         outdir: Output directory for Filterbank file
         filfile: Name of the Filterbank file to write to
+        bands: (lowband_obj, upband_obj) already opened with
+        open_bands, instead of opening file1 and file2
 
     """
-    your1 = Your(file1)
-    your2 = Your(file2)
-    (lowband_obj, upband_obj) = (
-        (your1, your2)
-        if your1.chan_freqs.max() < your2.chan_freqs.max()
-        else (your2, your1)
-    )
-    del your1
-    del your2
+    if bands is None:
+        bands = open_bands(file1, file2)
+    (lowband_obj, upband_obj) = bands
+    del bands
 
     # if lowband_obj.foff < 0 or upband_obj.foff < 0:
     #     raise AttributeError("Negative channel_bandwidth in Mock fits not supported.")
 
-    low_header = vars(lowband_obj.your_header)
-    up_header = vars(upband_obj.your_header)
+    # gl, gb and tstart_utc are computed on first use, so they are not in vars()
+    low_header = vars(lowband_obj.your_header).copy()
+    up_header = vars(upband_obj.your_header).copy()
+    for key in ("gl", "gb", "tstart_utc"):
+        low_header[key] = getattr(lowband_obj.your_header, key)
+        up_header[key] = getattr(upband_obj.your_header, key)
 
     logger.debug("Header of lowband file is: %s", low_header)
     logger.debug("Header of upband file is: %s", up_header)
@@ -371,41 +394,12 @@ def combine(
     assert startfileid < len(lowband_obj.filelist)
 
     if startfileid != lowband_obj.fileid:
-        lowband_obj.fileid = startfileid
-        upband_obj.fileid = startfileid
-
-        logger.debug(
-            "Updating fileid of lower and upper band to %s and %s",
-            lowband_obj.fileid,
-            upband_obj.fileid,
-        )
-
-        lowband_obj.fits.close()
-        upband_obj.fits.close()
-
-        del lowband_obj.fits["SUBINT"]
-        del upband_obj.fits["SUBINT"]
-
-        logger.debug("Deleted mmap'ed object")
-
-        lowband_obj.filename = lowband_obj.filelist[lowband_obj.fileid]
         logger.debug(
-            "Loweband file id is %s, Reading file: %s",
-            lowband_obj.fileid,
-            lowband_obj.filename,
+            "Updating fileid of lower and upper band to %s",
+            startfileid,
         )
-
-        upband_obj.filename = upband_obj.filelist[upband_obj.fileid]
-        logger.debug(
-            "Upperband file id is %s, Reading file: %s",
-            upband_obj.fileid,
-            upband_obj.filename,
-        )
-
-        lowband_obj.fits = pyfits.open(
-            lowband_obj.filename, mode="readonly", memmap=True
-        )
-        upband_obj.fits = pyfits.open(upband_obj.filename, mode="readonly", memmap=True)
+        lowband_obj.open_file(startfileid)
+        upband_obj.open_file(startfileid)
 
     # Read data
     logger.debug("Startsub %i, endsub %i", startsub, endsub)
@@ -416,37 +410,12 @@ def combine(
 
         if isub > cumsum_num_subint[lowband_obj.fileid] - 1:
             logger.debug("isub lies in a later file")
-            lowband_obj.fits.close()
-            upband_obj.fits.close()
-
-            del lowband_obj.fits["SUBINT"]
-            del upband_obj.fits["SUBINT"]
-
-            logger.debug("Delted mmap'ed object")
-            lowband_obj.fileid += 1
-            upband_obj.fileid += 1
-
-            if lowband_obj.fileid == len(lowband_obj.filelist):
+            if lowband_obj.fileid + 1 == len(lowband_obj.filelist):
                 logger.warning("Not enough subints, returning data till last subint")
-                logger.debug("Setting file ID to that of last file")
-                lowband_obj.fileid -= 1
-                upband_obj.fileid -= 1
                 break
-            logger.debug("Updating lowerband file ID to: %s", lowband_obj.fileid)
-            logger.debug("Updating upperband file ID to: %s", upband_obj.fileid)
-
-            lowband_obj.filename = lowband_obj.filelist[lowband_obj.fileid]
-            logger.debug("Reading lowband file: %s", lowband_obj.filename)
-
-            upband_obj.filename = upband_obj.filelist[upband_obj.fileid]
-            logger.debug("Reading upperband file: %s", upband_obj.filename)
-
-            lowband_obj.fits = pyfits.open(
-                lowband_obj.filename, mode="readonly", memmap=True
-            )
-            upband_obj.fits = pyfits.open(
-                upband_obj.filename, mode="readonly", memmap=True
-            )
+            logger.debug("Updating file ID to: %s", lowband_obj.fileid + 1)
+            lowband_obj.open_file(lowband_obj.fileid + 1)
+            upband_obj.open_file(upband_obj.fileid + 1)
 
         logger.debug("Using: %s and %s", lowband_obj.fits, upband_obj.fits)
         fsub = int(
@@ -461,43 +430,13 @@ def combine(
             upband_obj.filename,
         )
 
-        try:
-            data = read_and_combine_subint(
-                lowband_obj,
-                upband_obj,
-                fsub,
-                upchanskip,
-                lowchanskip,
-            )
-        except KeyError:
-            logger.warning("Encountered KeyError, maybe mmap'd object was deleted")
-            logger.debug(
-                "Trying to open files %s and %s",
-                lowband_obj.filename,
-                upband_obj.filename,
-            )
-
-            lowband_obj.fits = pyfits.open(
-                lowband_obj.filename, mode="readonly", memmap=True
-            )
-            upband_obj.fits = pyfits.open(
-                upband_obj.filename, mode="readonly", memmap=True
-            )
-
-            logger.debug(
-                "Reading subint %i in files %s and %s",
-                fsub,
-                lowband_obj.filename,
-                upband_obj.filename,
-            )
-
-            data = read_and_combine_subint(
-                lowband_obj,
-                upband_obj,
-                fsub,
-                upchanskip,
-                lowchanskip,
-            )
+        data = read_and_combine_subint(
+            lowband_obj,
+            upband_obj,
+            fsub,
+            upchanskip,
+            lowchanskip,
+        )
 
         if skip != 0 and isub == startsub:
             data = data[skip:, :]
@@ -536,7 +475,9 @@ def all_files(direct, outdir):
     direct = os.path.join(direct, "")
     outdir = os.path.join(outdir, "")
     logger.debug("Looking for file pairs.")
-    for a_fits in glob.glob(direct + "*.fits"):
+    # the directory is listed once, and the files of each band are matched in that list
+    fits_files = sorted(glob.glob(direct + "*.fits"))
+    for a_fits in fits_files:
         base_name = os.path.basename(a_fits)
         split = base_name.split(".")
         file_one = (
@@ -578,17 +519,31 @@ def all_files(direct, outdir):
             + split[3][4:6]
             + ".fil"
         )
-        names[out_file] = [file_one, file_two]
+        names[out_file] = [
+            fnmatch.filter(fits_files, file_one),
+            fnmatch.filter(fits_files, file_two),
+        ]
     logger.info("Found %i file pairs, combing.", len(names.keys()))
-    for out, files in names.items():
-        combine(
-            glob.glob(files[0]),
-            glob.glob(files[1]),
-            nstart=values.nstart,
-            nsamp=values.nsamp,
-            outdir=outdir,
-            filfile=out,
-        )
+    pairs = list(names.items())
+    if not pairs:
+        return
+
+    # the headers of the next pair are read while the current pair is combined
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(open_bands, *pairs[0][1])
+        for i, (out, files) in enumerate(pairs):
+            bands = future.result()
+            if i + 1 < len(pairs):
+                future = pool.submit(open_bands, *pairs[i + 1][1])
+            combine(
+                *files,
+                nstart=values.nstart,
+                nsamp=values.nsamp,
+                outdir=outdir,
+                filfile=out,
+                bands=bands,
+            )
+            del bands
 
 
 if __name__ == "__main__":
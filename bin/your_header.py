@@ -11,7 +11,7 @@ from rich.console import Console
 from rich.logging import RichHandler
 from rich.table import Table
 
-from your import Your
+from your.your import read_headers
 from your.utils.misc import YourArgparseFormatter
 
 
@@ -53,12 +53,17 @@ def read_header(f, no_table):
 
     no_table -- bool - if true, don't use rich.table
     """
-    y = Your(f)
-    dic = vars(y.your_header)
-    dic["tsamp"] = y.your_header.tsamp
-    dic["nchans"] = y.your_header.nchans
-    dic["channel_bandwidth"] = y.your_header.foff
-    dic["nspectra"] = y.your_header.nspectra
+    # the PSRFITS files of the observation are opened concurrently, and closed once the
+    # header is read
+    (header,) = read_headers([f])
+    dic = vars(header)
+    dic["tsamp"] = header.tsamp
+    dic["nchans"] = header.nchans
+    dic["channel_bandwidth"] = header.foff
+    dic["nspectra"] = header.nspectra
+    dic["gl"] = header.gl
+    dic["gb"] = header.gb
+    dic["tstart_utc"] = header.tstart_utc
     if no_table:
         nice_print(dic)
     else:
@@ -129,6 +129,9 @@ class Paint(Frame):
         dic["nchans"] = self.your_obj.your_header.nchans
         dic["foff"] = self.your_obj.your_header.foff
         dic["nspectra"] = self.your_obj.your_header.nspectra
+        dic["gl"] = self.your_obj.your_header.gl
+        dic["gb"] = self.your_obj.your_header.gb
+        dic["tstart_utc"] = self.your_obj.your_header.tstart_utc
         self.table_print(dic)
 
     def load_file(
@@ -173,6 +173,14 @@ if __name__ == "__main__":
         default="mean",
         help="Replace the RFI flagged values with either mean, median or zero.",
     )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        help="Number of threads to decode PSRFITS subints with",
+        type=int,
+        default=1,
+        required=False,
+    )
     parser.add_argument(
         "--no_log_file", help="Do not write a log file", action="store_true"
     )
@@ -235,6 +243,7 @@ if __name__ == "__main__":
         replacement_policy=values.replacement_policy,
         npoln=values.num_polarisation,
         highest_frequency_first=values.highest_frequency_first,
+        workers=values.workers,
     )
 
     if values.type == "fits":
@@ -25,14 +25,24 @@ pages = {
         "your.Your",
         "your.Your.bandpass",
         "your.Your.get_data",
+        "your.Your.as_array",
+        "your.Your.get_data_many",
+        "your.Your.chunk_blocks",
+        "your.Your.iter_chunks",
         "your.Your.dispersion_delay",
         "your.Header",
+        "your.read_headers",
+        "your.array.YourArray",
     ],
     "candidate.md": [
         "your.candidate.Candidate",
         "your.candidate.Candidate.save_h5",
         "your.candidate.Candidate.dispersion_delay",
+        "your.candidate.Candidate.chunk_window",
+        "your.candidate.Candidate.read_window",
         "your.candidate.Candidate.get_chunk",
+        "your.candidate.get_chunks",
+        "your.candidate.Candidate.delay_bins",
         "your.candidate.Candidate.dedisperse",
         "your.candidate.Candidate.dedispersets",
         "your.candidate.Candidate.dmtime",
@@ -41,6 +51,15 @@ pages = {
         "your.candidate.Candidate.decimate",
         "your.candidate.Candidate.resize",
     ],
+    "aio.md": [
+        "your.aio.AsyncYour",
+        "your.aio.AsyncYour.open",
+        "your.aio.AsyncYour.get_data",
+        "your.aio.AsyncYour.get_data_many",
+        "your.aio.AsyncYour.iter_chunks",
+        "your.aio.AsyncYour.bandpass",
+        "your.aio.AsyncYour.close",
+    ],
     "writer.md": [
         "your.writer.Writer",
         "your.writer.Writer.to_fil",
@@ -69,11 +88,39 @@ pages = {
     "formats/psrfits.md": [
         "your.formats.psrfits.PsrfitsFile",
         "your.formats.psrfits.PsrfitsFile.read_subint",
+        "your.formats.psrfits.PsrfitsFile.read_subints",
+        "your.formats.psrfits.PsrfitsFile.can_read_subints",
+        "your.formats.psrfits.PsrfitsFile.has_trivial_scaling",
         "your.formats.psrfits.PsrfitsFile.get_data",
+        "your.formats.psrfits.PsrfitsFile.open_file",
+        "your.formats.psrfits.SubintCache",
+        "your.formats.psrfits.FitsFilePool",
+        "your.formats.psrfits.FitsFilePool.get_table",
         "your.formats.psrfits.SpectraInfo",
+        "your.formats.psrfits.read_psrfits_info",
+        "your.formats.psrfits.read_psrfits_infos",
         "your.formats.psrfits.unpack_2bit",
         "your.formats.psrfits.unpack_4bit",
     ],
+    "formats/fitsraw.md": [
+        "your.formats.fitsraw.parse_tform",
+        "your.formats.fitsraw.parse_tdim",
+        "your.formats.fitsraw.bintable_dtype",
+        "your.formats.fitsraw.RawTable",
+        "your.formats.fitsraw.RawTable.from_hdu",
+    ],
+    "formats/fitsheader.md": [
+        "your.formats.fitsheader.parse_value",
+        "your.formats.fitsheader.scan_headers",
+        "your.formats.fitsheader.HeaderIndex",
+        "your.formats.fitsheader.HeaderIndex.get",
+        "your.formats.fitsheader.HeaderIndex.put",
+        "your.formats.fitsheader.HeaderIndex.save",
+    ],
+    "formats/unpack.md": [
+        "your.formats.unpack.lookup_table",
+        "your.formats.unpack.unpack",
+    ],
     "formats/filwriter.md": [
         "your.formats.filwriter.sigproc_object_from_writer",
         "your.formats.filwriter.make_sigproc_object",
@@ -93,7 +140,16 @@ pages = {
         "your.utils.plotter.plot_h5",
         "your.utils.plotter.save_bandpass",
     ],
-    "utils/astro.md": ["your.utils.astro.dec2deg", "your.utils.astro.ra2deg"],
+    "utils/astro.md": [
+        "your.utils.astro.dec2deg",
+        "your.utils.astro.ra2deg",
+        "your.utils.astro.sexagesimal2deg",
+        "your.utils.astro.radec2galactic",
+        "your.utils.astro.mjd2isot",
+        "your.utils.astro.shift_channels",
+        "your.utils.astro.dedisperse",
+        "your.utils.astro.calc_dispersion_delays",
+    ],
     "utils/heimdall.md": [
         "your.utils.heimdall.HeimdallManager",
         "your.utils.heimdall.HeimdallManager.run",
@@ -106,10 +162,30 @@ pages = {
         "your.utils.math.normalise",
         "your.utils.math.smad_plotter",
     ],
+    "utils/decimate.md": [
+        "your.utils.decimate.accumulator_dtype",
+        "your.utils.decimate.block_sum",
+        "your.utils.decimate.block_decimate",
+    ],
+    "utils/batch.md": [
+        "your.utils.batch.crop_parameters",
+        "your.utils.batch.group_candidates",
+        "your.utils.batch.stack_data",
+        "your.utils.batch.delay_tables",
+    ],
+    "utils/cpu.md": [
+        "your.utils.cpu.dmt_shifts",
+        "your.utils.cpu.dm_time",
+        "your.utils.cpu.cpu_dmt",
+        "your.utils.cpu.cpu_dedisp_and_dmt_crop",
+        "your.utils.cpu.cpu_dedisp_and_dmt_crop_batch",
+    ],
     "utils/gpu.md": [
         "your.utils.gpu.gpu_dedisperse",
         "your.utils.gpu.gpu_dmt",
         "your.utils.gpu.gpu_dedisp_and_dmt_crop",
+        "your.utils.gpu.gpu_dedisp_and_dmt_crop_batch",
+        "your.utils.gpu.release_gpu",
         "your.utils.gpu.get_gpu_memory_map",
     ],
     "utils/misc.md": [
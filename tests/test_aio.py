@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import pytest
+
+from your import Your
+from your.aio import AsyncYour
+
+_install_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_async_get_data(file):
+    file = os.path.join(_install_dir, file)
+    y = Your(file)
+    starts = [0, 256, 1000, 2048, 3000]
+
+    async def read():
+        async with await AsyncYour.open(file) as async_y:
+            assert async_y.your_header.nchans == y.your_header.nchans
+            data = await asyncio.gather(
+                *(async_y.get_data(start, 512) for start in starts)
+            )
+            many = await async_y.get_data_many([(0, 64), (32, 64)])
+            bandpass = await async_y.bandpass(nspectra=512)
+            return data, many, bandpass
+
+    data, many, bandpass = asyncio.run(read())
+    for start, d in zip(starts, data):
+        assert (d == y.get_data(start, 512)).all()
+    assert (many[1] == y.get_data(32, 64)).all()
+    assert (bandpass == y.bandpass(nspectra=512)).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_async_iter_chunks(file):
+    y = Your(os.path.join(_install_dir, file))
+
+    async def read():
+        async_y = AsyncYour(y)
+        return [
+            (start, data)
+            async for start, data in async_y.iter_chunks(1000, overlap=24, nsamp=4000)
+        ]
+
+    chunks = asyncio.run(read())
+    assert [start for start, _ in chunks] == list(range(0, 4000, 1000))
+    for start, data in chunks:
+        assert (data == y.get_data(start, min(1024, 4000 - start))).all()
+
+    async def bad_gulp():
+        async for _ in AsyncYour(y).iter_chunks(0):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(bad_gulp())
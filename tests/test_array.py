@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from your import Your
+
+_install_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_as_array(file):
+    y = Your(os.path.join(_install_dir, file))
+    data = y.as_array()
+    nspectra = y.your_header.nspectra
+    assert data.shape == (nspectra, 1, y.your_header.nchans)
+    assert data.dtype == y.your_header.dtype
+    assert len(data) == nspectra
+
+    full = y.get_data(0, nspectra)[:, None, :]
+    for key in [
+        np.s_[10:300],
+        np.s_[10:300, 0, 5:50],
+        np.s_[::7, :, ::3],
+        np.s_[-100:],
+        np.s_[300:10:-3, 0, 50:5:-2],
+        np.s_[..., 20],
+        np.s_[5],
+        np.s_[-1, 0, -1],
+        np.s_[10:10],
+        np.s_[:, :, 5:5],
+    ]:
+        assert (data[key] == full[key]).all()
+        assert data[key].shape == full[key].shape
+
+    # small chunks split the reads, including strided ones
+    small = y.as_array(chunk_mb=0.01)
+    assert (small[::5] == full[::5]).all()
+    assert (small[3::1000] == full[3::1000]).all()
+
+
+def test_as_array_4pol():
+    y = Your(os.path.join(_install_dir, "data/test_4pol.fits"))
+    data = y.as_array()
+    assert data.shape[1] == 4
+    full = y.get_data(0, 64, npoln=4)
+    assert (data[:64] == full).all()
+    assert (data[:64, 2, 10:20] == full[:, 2, 10:20]).all()
+
+
+def test_as_array_errors():
+    y = Your(os.path.join(_install_dir, "data/28.fil"))
+    data = y.as_array()
+    with pytest.raises(IndexError):
+        data[len(data)]
+    with pytest.raises(IndexError):
+        data[0, 0, 0, 0]
+    with pytest.raises(TypeError):
+        data[[1, 2]]
@@ -3,7 +3,7 @@ import os
 import numpy as np
 import pytest
 
-from your.candidate import Candidate
+from your.candidate import Candidate, get_chunks
 
 os.environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
 _install_dir = os.path.abspath(os.path.dirname(__file__))
@@ -79,6 +79,19 @@ def test_dedisperse(cand, request):
     assert np.isclose(np.max(cand.dedispersets()), 47527, atol=1)
 
 
+@pytest.mark.parametrize("cand", ["cand_fil", "cand_fits"])
+def test_dedisperse_valid(cand, request):
+    cand = request.getfixturevalue(cand)
+    cand.get_chunk()
+    wrapped = cand.dedisperse().dedispersed
+    delay_bins = cand.delay_bins()
+    valid = cand.dedisperse(mode="valid").dedispersed
+    start = delay_bins.max()
+    assert valid.shape == (len(wrapped) - (start - delay_bins.min()), cand.nchans)
+    assert (valid == wrapped[start : start + len(valid)]).all()
+    assert (cand.dedispersets(mode="valid") == valid.sum(axis=1)).all()
+
+
 @pytest.mark.parametrize("cand", ["cand_fil", "cand_fits"])
 def test_snr_none(cand, request):
     cand = request.getfixturevalue(cand)
@@ -233,3 +246,37 @@ def test_kill_mask():
     assert cand.data[:, cand.kill_mask].sum() == 0
     assert cand.data[:, [10, 12, 300]].sum() == 0
     assert cand.data[:, ~cand.kill_mask].sum() != 0
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_get_chunks(file):
+    fp = os.path.join(_install_dir, file)
+    # candidates close in time, and at both edges of the data (which are padded)
+    cand = Candidate(fp=fp, dm=475.284, tcand=2.02888, width=2, snr=16.8, device=0)
+    tend = cand.your_header.nspectra * cand.native_tsamp
+    tcands = [2.02888, 2.1, 0.1, tend - 0.1]
+    single = []
+    cands = []
+    for tcand in tcands:
+        for out in [single, cands]:
+            out.append(
+                Candidate(fp=fp, dm=475.284, tcand=tcand, width=2, snr=16.8, device=0)
+            )
+    for cand in single:
+        cand.get_chunk()
+
+    get_chunks(cands)
+    for cand, expected in zip(cands, single):
+        assert cand.data.shape == expected.data.shape
+        assert (cand.data == expected.data).all()
+
+
+def test_get_chunks_different_files():
+    cands = [
+        Candidate(
+            fp=os.path.join(_install_dir, file), dm=475.284, tcand=2.02888, width=2
+        )
+        for file in ["data/28.fil", "data/28.fits"]
+    ]
+    with pytest.raises(ValueError):
+        get_chunks(cands)
@@ -0,0 +1,83 @@
+import os
+import shutil
+
+import astropy.io.fits as pyfits
+import numpy as np
+import pytest
+
+from your.formats.fitsheader import HeaderIndex, parse_value, scan_headers
+from your.formats.psrfits import (
+    SpectraInfo,
+    _astropy_psrfits_info,
+    read_psrfits_info,
+)
+
+_install_dir = os.path.abspath(os.path.dirname(__file__))
+
+FILES = ["data/28.fits", "data/small.fits", "data/test_4pol.fits"]
+
+
+def test_parse_value():
+    assert parse_value("                 'PSRFITS '  / comment") == "PSRFITS"
+    assert parse_value("'it''s'") == "it's"
+    assert parse_value("                   T") is True
+    assert parse_value("                 512 / number of channels") == 512
+    assert parse_value("   1.5D-3") == 1.5e-3
+    assert parse_value("      / no value") is None
+
+
+@pytest.mark.parametrize("file", FILES)
+def test_scan_headers(file):
+    fits_file = os.path.join(_install_dir, file)
+    hdus = scan_headers(fits_file)
+    with pyfits.open(fits_file) as hdul:
+        assert [hdu["name"] for hdu in hdus] == [hdu.name for hdu in hdul]
+        for scanned, hdu in zip(hdus, hdul):
+            assert scanned["data_offset"] == hdu.fileinfo()["datLoc"]
+            for key in ["NAXIS", "NAXIS1", "NAXIS2", "NBITS", "TBIN", "STT_IMJD"]:
+                if key in hdu.header:
+                    assert scanned["header"][key] == hdu.header[key]
+
+    assert scan_headers(fits_file, extnames=["PRIMARY"])[0]["name"] == "PRIMARY"
+    with pytest.raises(ValueError):
+        scan_headers(fits_file, extnames=["NOT_THERE"])
+
+
+@pytest.mark.parametrize("file", FILES)
+def test_read_psrfits_info(file):
+    fits_file = os.path.join(_install_dir, file)
+    info = read_psrfits_info(fits_file)
+    assert info == _astropy_psrfits_info(fits_file)
+    assert info["is_psrfits"]
+
+
+def test_header_index(tmp_path):
+    fits_file = str(tmp_path / "28.fits")
+    shutil.copy(os.path.join(_install_dir, "data/28.fits"), fits_file)
+    specinfo = SpectraInfo([fits_file], use_header_index=True)
+    assert os.path.isfile(tmp_path / ".your_header_index.json")
+
+    index = HeaderIndex()
+    info = index.get(fits_file)
+    assert info == read_psrfits_info(fits_file)
+
+    indexed = SpectraInfo([fits_file], use_header_index=True)
+    for key in ["N", "dt", "df", "lo_freq", "num_channels", "need_scale", "ra2000"]:
+        assert np.all(indexed[key] == specinfo[key])
+    assert type(indexed.df) is type(specinfo.df)
+
+    # a changed file is not looked up in the index
+    with open(fits_file, "ab") as f:
+        f.write(b"\0" * 2880)
+    assert HeaderIndex().get(fits_file) is None
+
+
+def test_spectra_info_workers(tmp_path):
+    files = []
+    for i in range(3):
+        files.append(str(tmp_path / f"28_{i}.fits"))
+        shutil.copy(os.path.join(_install_dir, "data/28.fits"), files[-1])
+    serial = SpectraInfo(files, workers=1)
+    parallel = SpectraInfo(files, workers=4)
+    for key in ["N", "num_subint", "start_MJD", "start_spec", "num_pad", "df"]:
+        assert np.all(parallel[key] == serial[key])
@@ -0,0 +1,45 @@
+import os
+
+import astropy.io.fits as pyfits
+import numpy as np
+import pytest
+
+from your.formats.fitsraw import RawTable, bintable_dtype, parse_tdim, parse_tform
+from your.formats.psrfits import PsrfitsFile
+
+_install_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+def test_parse_tform_tdim():
+    assert parse_tform("336E") == (336, "E")
+    assert parse_tform("D") == (1, "D")
+    assert parse_tdim("(336,1,789)") == (789, 1, 336)
+    with pytest.raises(ValueError):
+        parse_tform("")
+
+
+@pytest.mark.parametrize("file", ["data/28.fits", "data/test_4pol.fits"])
+def test_raw_table(file):
+    fits_file = os.path.join(_install_dir, file)
+    with pyfits.open(fits_file, memmap=True) as hdul:
+        hdu = hdul["SUBINT"]
+        table = RawTable.from_hdu(fits_file, hdu)
+        assert len(table) == hdu.header["NAXIS2"]
+        assert table.dtype.itemsize == hdu.header["NAXIS1"]
+        for column in ["DATA", "DAT_SCL", "DAT_OFFS", "DAT_WTS", "TSUBINT"]:
+            assert table[column].shape == hdu.data[column].shape
+            assert (table[column] == hdu.data[column]).all()
+
+    fits_obj = PsrfitsFile([fits_file])
+    assert isinstance(fits_obj.subint_table, RawTable)
+
+
+def test_raw_table_fallback(tmp_path):
+    fits_file = str(tmp_path / "scaled.fits")
+    data = pyfits.Column(
+        name="DATA", format="4I", bzero=32768, array=np.zeros((2, 4), dtype=np.uint16)
+    )
+    pyfits.BinTableHDU.from_columns([data], name="SUBINT").writeto(fits_file)
+    with pyfits.open(fits_file, memmap=True) as hdul:
+        assert RawTable.from_hdu(fits_file, hdul["SUBINT"], columns=["DATA"]) is None
+        assert bintable_dtype(hdul["SUBINT"].header)["DATA"].shape == (4,)
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+import pytest
+
+# Dependencies which are only needed by some functions, and so should not be imported
+# with the package
+HEAVY_MODULES = ["astropy", "scipy", "h5py", "numba", "skimage", "your.writer"]
+
+
+def imported_modules(statement):
+    code = (
+        f"import sys; {statement}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return [m for m in out.stdout.strip().split(",") if m]
+
+
+@pytest.mark.parametrize(
+    "statement",
+    ["import your", "import your.candidate", "from your.utils.misc import crop"],
+)
+def test_lazy_imports(statement):
+    assert imported_modules(statement) == []
+
+
+def test_writer_import():
+    assert "your.writer" in imported_modules("from your import Writer")
+    assert "your.writer" in imported_modules("import your; your.writer.Writer")
+    # probing for other names does not import the writer
+    assert imported_modules("import your; assert not hasattr(your, 'foo')") == []
+
+
+def test_star_import():
+    import your
+
+    namespace = {}
+    exec("from your import *", namespace)
+    assert namespace["Writer"] is your.Writer
+    assert "Writer" in dir(your)
+    assert imported_modules("import your; dir(your)") == []
+
+
+def test_import_time():
+    # the cumulative time (us) of `import your`, as reported by -X importtime. It is
+    # about 0.2 s without the heavy dependencies (and several times that with them), the
+    # best of 3 runs keeps the check robust to busy runners.
+    times = []
+    for _ in range(3):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import your"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        line = [line for line in out.stderr.splitlines() if line.endswith("| your")]
+        times.append(int(line[-1].split("|")[1]))
+    assert min(times) < 1_000_000
@@ -1,8 +1,17 @@
 import os
+import pickle
 
+import astropy.io.fits as pyfits
 import numpy as np
+import pytest
 
-from your.formats.psrfits import PsrfitsFile
+from your.formats.psrfits import (
+    SUBINT_CACHE,
+    FitsFilePool,
+    PsrfitsFile,
+    SubintCache,
+    angle_to_deg,
+)
 
 _install_dir = os.path.abspath(os.path.dirname(__file__))
 
@@ -19,3 +28,187 @@ def test_get_data_fits():
     fits_obj = PsrfitsFile([fits_file])
     data = fits_obj.get_data(0, 10)
     assert np.isclose(np.mean(data), 128, atol=1)
+
+
+def test_get_data_out_fits():
+    fits_file = os.path.join(_install_dir, "data/28.fits")
+    fits_obj = PsrfitsFile([fits_file])
+    data = fits_obj.get_data(5, 1000)
+    out = np.empty((1000, 1, fits_obj.nchans), dtype=np.float32)
+    assert fits_obj.get_data(5, 1000, out=out) is not None
+    assert (out == data).all()
+
+    subint = fits_obj.read_subint(0)
+    out = np.empty_like(subint)
+    assert fits_obj.read_subint(0, out=out) is out
+    assert (out == subint).all()
+
+
+def test_subint_cache_lru():
+    cache = SubintCache(3 * 1024 / 2**20)
+    for i in range(4):
+        cache.put(i, np.full(256, i, dtype=np.float32))
+    assert len(cache) == 3 and cache.nbytes == 3 * 1024
+    assert cache.get(0) is None
+    assert cache.get(1)[0] == 1
+    assert not cache.get(1).flags.writeable
+    cache.put(4, np.zeros(256, dtype=np.float32))
+    assert cache.get(2) is None and cache.get(1) is not None
+    cache.resize(1024 / 2**20)
+    assert len(cache) == 1
+    cache.resize(0)
+    assert cache.get(4) is None
+
+
+def test_subint_cache_get_data():
+    fits_file = os.path.join(_install_dir, "data/28.fits")
+    fits_obj = PsrfitsFile([fits_file], subint_cache_mb=64)
+    cache = fits_obj.subint_cache
+    # the size of the cache only applies to this object
+    assert PsrfitsFile([fits_file]).subint_cache.max_bytes == 0
+    assert SUBINT_CACHE.max_bytes == 0
+
+    data = fits_obj.get_data(5, 1000)
+    assert len(cache) > 0
+    hits = cache.hits
+    assert (fits_obj.get_data(5, 1000) == data).all()
+    assert (fits_obj.get_data(100, 300) == data[95:395]).all()
+    assert cache.hits > hits
+    assert (fits_obj.get_data(5, 1000, c_min=10, c_max=20) == data[..., 10:20]).all()
+
+    with pytest.raises(ValueError):
+        PsrfitsFile([fits_file], subint_cache_mb=64, subint_cache=SUBINT_CACHE)
+
+    # objects can share a cache, e.g. the one of the process
+    try:
+        SUBINT_CACHE.resize(64)
+        PsrfitsFile([fits_file], subint_cache=SUBINT_CACHE).get_data(5, 1000)
+        hits = SUBINT_CACHE.hits
+        fits_obj = PsrfitsFile([fits_file], subint_cache=SUBINT_CACHE)
+        assert (fits_obj.get_data(5, 1000) == data).all()
+        assert SUBINT_CACHE.hits > hits
+    finally:
+        SUBINT_CACHE.resize(0)
+        SUBINT_CACHE.clear()
+
+
+def test_fits_file_pool():
+    fits_file = os.path.join(_install_dir, "data/28.fits")
+    pool = FitsFilePool([fits_file] * 3, max_open_files=2)
+    first = pool.get(0)
+    assert pool.get(0) is first
+    pool.get(1)
+    pool.get(2)
+    assert len(pool) == 2
+    assert pool.get(0) is not first
+    pool.close()
+    assert len(pool) == 0
+
+    with pytest.raises(ValueError):
+        FitsFilePool([fits_file], max_open_files=0)
+
+
+def test_get_data_multiple_files():
+    fits_file = os.path.join(_install_dir, "data/28.fits")
+    single = PsrfitsFile([fits_file])
+    fits_obj = PsrfitsFile([fits_file, fits_file], max_open_files=2)
+    nspec = single.nspec
+    data = single.get_data(nspec - 200, 200)
+
+    across = fits_obj.get_data(nspec - 200, 400)
+    # reads do not change the current file
+    assert fits_obj.fileid == 0
+    assert (across[:200] == data).all()
+    assert (across[200:] == single.get_data(0, 200)).all()
+
+    first = fits_obj.fits_pool.get(0)
+    assert (fits_obj.get_data(nspec - 200, 200) == data).all()
+    assert fits_obj.fits is first
+
+
+@pytest.fixture(scope="module")
+def scaled_fits_file(tmp_path_factory):
+    fits_file = str(tmp_path_factory.mktemp("data") / "scaled.fits")
+    with pyfits.open(os.path.join(_install_dir, "data/28.fits")) as hdul:
+        subint = hdul["SUBINT"].data
+        rng = np.random.default_rng(1)
+        subint["DAT_SCL"] = rng.uniform(0.5, 2, subint["DAT_SCL"].shape)
+        subint["DAT_OFFS"] = rng.uniform(-3, 3, subint["DAT_OFFS"].shape)
+        subint["DAT_WTS"] = rng.integers(0, 2, subint["DAT_WTS"].shape)
+        hdul.writeto(fits_file)
+    return fits_file
+
+
+@pytest.mark.parametrize("file", ["data/28.fits", "scaled"])
+def test_read_subints(file, scaled_fits_file):
+    fits_file = (
+        scaled_fits_file if file == "scaled" else os.path.join(_install_dir, file)
+    )
+    fits_obj = PsrfitsFile([fits_file])
+    assert fits_obj.can_read_subints(npoln=1)
+    assert fits_obj.has_trivial_scaling() == (file != "scaled")
+
+    block = fits_obj.read_subints(1, 4)
+    assert block.shape == (3, fits_obj.nsamp_per_subint, 1, fits_obj.nchan)
+    for i, isub in enumerate(range(1, 4)):
+        assert np.allclose(block[i], fits_obj.read_subint(isub), rtol=1e-6, atol=1e-4)
+
+    block = fits_obj.read_subints(2, 4, apply_offsets=False, c_min=10, c_max=50)
+    subint = fits_obj.read_subint(3, apply_offsets=False, c_min=10, c_max=50)
+    assert np.allclose(block[1], subint, rtol=1e-6, atol=1e-4)
+
+    # whole subints in the middle of a read are decoded as one block
+    data = fits_obj.get_data(100, 3000)
+
+    # with a cache, the missing subints are still decoded in blocks and then cached
+    cached_obj = PsrfitsFile([fits_file], subint_cache_mb=64)
+    blocks = []
+    read_subints = cached_obj.read_subints
+
+    def count_blocks(start, stop, **kwargs):
+        blocks.append((start, stop))
+        return read_subints(start, stop, **kwargs)
+
+    cached_obj.read_subints = count_blocks
+    assert np.allclose(data, cached_obj.get_data(100, 3000), rtol=1e-6, atol=1e-4)
+    assert blocks == [(1, 3)]
+    assert len(cached_obj.subint_cache) == 4
+    assert np.allclose(data, cached_obj.get_data(100, 3000), rtol=1e-6, atol=1e-4)
+    assert blocks == [(1, 3)]
+    assert cached_obj.subint_cache.hits == 4
+
+    # an unpickled object gets an empty cache of the same size
+    del cached_obj.read_subints
+    cache = pickle.loads(pickle.dumps(cached_obj)).subint_cache
+    assert cache is not cached_obj.subint_cache and len(cache) == 0
+    assert cache.max_bytes == cached_obj.subint_cache.max_bytes
+
+    with pytest.raises(ValueError):
+        fits_obj.read_subints(0, 2, npoln=4)
+
+
+@pytest.mark.parametrize("file", ["data/28.fits", "scaled"])
+def test_get_data_workers(file, scaled_fits_file):
+    fits_file = (
+        scaled_fits_file if file == "scaled" else os.path.join(_install_dir, file)
+    )
+    fits_obj = PsrfitsFile([fits_file, fits_file])
+    nspec = int(fits_obj.nspec)
+    data = fits_obj.get_data(100, nspec - 300)
+    assert (fits_obj.get_data(100, nspec - 300, workers=4) == data).all()
+
+    out = np.empty((nspec - 300, 1, 20), dtype=np.float32)
+    fits_obj.get_data(100, nspec - 300, out=out, workers=3, c_min=5, c_max=25)
+    assert (out == data[..., 5:25]).all()
+
+    with pytest.raises(ValueError):
+        fits_obj.get_data(0, 100, workers=0)
+
+
+def test_angle_to_deg():
+    assert angle_to_deg("12:30:00", hours=True) == pytest.approx(187.5)
+    assert angle_to_deg("-21:53:02.25") == pytest.approx(-21.88395833)
+    # formats which are not sexagesimal are parsed by astropy
+    assert angle_to_deg("12h30m00s", hours=True) == pytest.approx(187.5)
+    assert angle_to_deg("-21d53m02.25s") == pytest.approx(-21.88395833)
+    assert angle_to_deg(187.5) == pytest.approx(187.5)
@@ -3,6 +3,8 @@ import os
 import numpy as np
 import pytest
 
+from your import Your
+from your.formats.filwriter import make_sigproc_object
 from your.formats.pysigproc import SigprocFile
 
 _install_dir = os.path.abspath(os.path.dirname(__file__))
@@ -27,3 +29,34 @@ def test_pol():
     assert fil_obj.poln_order == "I"
     with pytest.raises(AssertionError):
         d = fil_obj.get_data(0, 10, npoln=3)
+
+
+@pytest.mark.parametrize("nbits, nchans", [(1, 13), (2, 3), (2, 8), (4, 5)])
+def test_get_data_sub_byte(tmp_path, nbits, nchans):
+    nspectra = 50
+    values = np.random.randint(0, 2**nbits, size=(nspectra, nchans), dtype=np.uint8)
+    # sigproc packs the first value in the least significant bits of each byte
+    bits = np.unpackbits(values[..., None], axis=-1, bitorder="little")[..., :nbits]
+    packed = np.packbits(bits.ravel(), bitorder="little")
+
+    fil_obj = make_sigproc_object(
+        "test", "test", nchans, -1.0, 1400.0, 1e-3, 59000.0, nbits=nbits
+    )
+    fil_file = str(tmp_path / "sub_byte.fil")
+    fil_obj.write_header(fil_file)
+    with open(fil_file, "ab") as f:
+        f.write(packed.tobytes())
+
+    fil_obj = SigprocFile(fil_file)
+    assert fil_obj.dtype == np.uint8
+    assert fil_obj.native_nspectra() == nspectra
+    assert (fil_obj.get_data(0, nspectra)[:, 0, :] == values).all()
+    for nstart in [1, 3, 7, 45]:
+        data = fil_obj.get_data(nstart, 10, c_min=1)
+        assert (data[:, 0, :] == values[nstart : nstart + 10, 1:]).all()
+    assert (fil_obj.unpack(5, 4)[:, 0, :] == values[5:9]).all()
+    assert fil_obj.get_data(nspectra, 10).shape == (0, 1, nchans)
+
+    y = Your(fil_file)
+    assert y.your_header.nspectra == nspectra
+    assert (y.get_data(3, 20) == values[3:23]).all()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from your.formats.psrfits import unpack_2bit, unpack_4bit
+from your.formats.unpack import lookup_table, unpack
+
+
+def _reference(data, nbits, bitorder):
+    bits = np.unpackbits(data[..., None], axis=-1).reshape(data.shape + (-1, nbits))
+    if bitorder == "little":
+        bits = bits[..., ::-1, :]
+    weights = 2 ** np.arange(nbits - 1, -1, -1)
+    return (bits * weights).sum(-1).reshape(data.shape[:-1] + (-1,))
+
+
+@pytest.mark.parametrize("nbits", [1, 2, 4])
+@pytest.mark.parametrize("bitorder", ["big", "little"])
+def test_unpack(nbits, bitorder):
+    data = np.random.randint(0, 256, size=(16, 10), dtype=np.uint8)
+    unpacked = unpack(data, nbits, bitorder=bitorder)
+    assert unpacked.shape == (16, 10 * 8 // nbits)
+    assert unpacked.dtype == np.uint8
+    assert (unpacked == _reference(data, nbits, bitorder)).all()
+
+    out = np.empty(unpacked.shape, dtype=np.float32)
+    assert unpack(data, nbits, bitorder=bitorder, out=out) is out
+    assert (out == unpacked).all()
+
+    out = np.zeros((16, 2 * unpacked.shape[1]), dtype=np.uint8)
+    unpack(data, nbits, bitorder=bitorder, out=out[:, ::2])
+    assert (out[:, ::2] == unpacked).all()
+
+
+def test_unpack_errors():
+    data = np.zeros((4, 4), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        unpack(data, 3)
+    with pytest.raises(ValueError):
+        unpack(data, 2, bitorder="middle")
+    with pytest.raises(ValueError):
+        unpack(data, 2, out=np.empty((4, 4), dtype=np.uint8))
+    assert not lookup_table(2).flags.writeable
+
+
+def test_psrfits_unpack_wrappers():
+    data = np.array([0b11100100, 0b00011011], dtype=np.uint8)
+    assert list(unpack_2bit(data)) == [3, 2, 1, 0, 0, 1, 2, 3]
+    assert list(unpack_4bit(data)) == [14, 4, 1, 11]
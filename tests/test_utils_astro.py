@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from your.utils.astro import (
+    calc_dispersion_delays,
+    dedisperse,
+    mjd2isot,
+    radec2galactic,
+    sexagesimal2deg,
+    shift_channels,
+)
+
+
+def test_sexagesimal2deg():
+    assert sexagesimal2deg("19:21:44.815", hours=True) == pytest.approx(290.43672917)
+    assert sexagesimal2deg("-21:53:02.25") == pytest.approx(-21.88395833)
+    assert sexagesimal2deg("-00:30:00") == -0.5
+    assert sexagesimal2deg("+10 30") == 10.5
+    with pytest.raises(ValueError):
+        sexagesimal2deg("10.5")
+
+
+def test_radec2galactic():
+    rng = np.random.default_rng(0)
+    for ra, dec in zip(rng.uniform(0, 360, 20), rng.uniform(-90, 90, 20)):
+        expected = SkyCoord(ra, dec, unit="deg").galactic
+        gl, gb = radec2galactic(ra, dec)
+        dl = (expected.l.value - gl + 180) % 360 - 180
+        assert dl * np.cos(np.deg2rad(gb)) == pytest.approx(0, abs=1e-4)
+        assert gb == pytest.approx(expected.b.value, abs=1e-4)
+
+
+@pytest.mark.parametrize("mjd", [51544.5, 58763.123456789, 59000.99999999, 60123.4])
+def test_mjd2isot(mjd):
+    assert mjd2isot(mjd) == Time(mjd, format="mjd").utc.isot
+
+
+def rolled(data, delay_bins):
+    # the per channel roll which dedisperse has always done
+    return np.array(
+        [
+            np.concatenate([channel[-d:], channel[:-d]])
+            for channel, d in zip(data, delay_bins)
+        ]
+    )
+
+
+def test_shift_channels():
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, size=(16, 100), dtype=np.uint8)
+    shifts = np.array(
+        [0, -1, -5, -30, -99, -100, -150, 3, 99, 100, 130, 7, 0, -2, -40, 1]
+    )
+    expected = rolled(data, shifts)
+
+    assert (shift_channels(data, shifts) == expected).all()
+    assert (shift_channels(data.T, shifts, time_axis=0) == expected.T).all()
+    out = np.empty(data.shape, dtype=np.uint8)
+    assert shift_channels(data, shifts, out=out) is out
+    assert (out == expected).all()
+
+    small = np.array([0, -3, -10, 2, -7])
+    valid = shift_channels(data[:5], small, mode="valid")
+    assert valid.shape == (5, 88)
+    assert (valid == rolled(data[:5], small)[:, 2:90]).all()
+    assert (
+        shift_channels(data.T[:, :5], small, time_axis=0, mode="valid") == valid.T
+    ).all()
+    assert shift_channels(data[:2], [0, -200], mode="valid").shape == (2, 0)
+
+    with pytest.raises(ValueError):
+        shift_channels(data, shifts, mode="clip")
+    with pytest.raises(ValueError):
+        shift_channels(data, shifts[:3])
+
+
+def test_dedisperse():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(64, 256)).astype(np.float32)
+    chan_freqs = np.linspace(1500, 1000, 64)
+    tsamp = 1e-3
+    delays = calc_dispersion_delays(50, chan_freqs)
+    expected = rolled(data, np.round(delays / tsamp).astype("int64"))
+    assert (dedisperse(data, 50, tsamp, chan_freqs=chan_freqs) == expected).all()
+    assert (dedisperse(data, 50, tsamp, delays=delays) == expected).all()
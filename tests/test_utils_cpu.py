@@ -0,0 +1,143 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from your.candidate import Candidate
+from your.utils.astro import calc_dispersion_delays, dedisperse
+from your.utils.batch import group_candidates
+from your.utils.cpu import (
+    cpu_dedisp_and_dmt_crop,
+    cpu_dedisp_and_dmt_crop_batch,
+    dm_time,
+    dmt_shifts,
+)
+from your.utils.misc import crop
+
+_install_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_cpu_dmt(file):
+    cand = Candidate(
+        fp=os.path.join(_install_dir, file),
+        dm=475.28400,
+        tcand=2.0288800,
+        width=2,
+        label=-1,
+        snr=16.8128,
+        min_samp=256,
+    )
+    cand.get_chunk()
+    dmt = cand.dmtime().dmt
+    assert (cand.dmtime(target="numba").dmt == dmt).all()
+    assert (cand.dmtime(64, target="numba").dmt == cand.dmtime(dmsteps=64).dmt).all()
+
+
+def test_dm_time():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(300, 32)).astype(np.float32)
+    chan_freqs = np.linspace(1500, 1200, 32)
+    dms = np.linspace(0, 2000, 16)
+    dmt = dm_time(data, dms, chan_freqs, 1e-3)
+    assert dmt.shape == (16, 300)
+    for dm, ts in zip(dms, dmt):
+        expected = dedisperse(data.T, dm, 1e-3, chan_freqs=chan_freqs).sum(0)
+        assert np.allclose(ts, expected, atol=1e-4)
+
+    # delays longer than the data do not shift the channels
+    shifts = dmt_shifts(dms, chan_freqs, 1e-3, 300)
+    assert shifts.min() >= 0 and shifts.max() < 300
+    assert (shifts[-1][-4:] == 0).all()
+
+    with pytest.raises(ValueError):
+        dm_time(data, dms, chan_freqs[:3], 1e-3)
+
+
+def test_cpu_dedisp_dmt_crop():
+    cand = Candidate(
+        fp=os.path.join(_install_dir, "data/28.fil"),
+        dm=475.28400,
+        tcand=2.0288800,
+        width=2,
+        label=-1,
+        snr=16.8128,
+        min_samp=256,
+    )
+    cand.get_chunk()
+    cand = cpu_dedisp_and_dmt_crop(cand)
+    f_dmt = cand.dmt
+    f_dedisp = cand.dedispersed
+    assert f_dmt.shape == (256, 256)
+    assert f_dedisp.shape == (256, 336)
+
+    cand.dedisperse()
+    cand.dmtime()
+    crop_start_sample_ft = cand.dedispersed.shape[0] // 2 - 256 // 2
+    crop_start_sample_dmt = cand.dmt.shape[1] // 2 - 256 // 2
+    c_dmt = crop(cand.dmt, crop_start_sample_dmt, 256, 1)
+    c_dedisp = crop(cand.dedispersed, crop_start_sample_ft, 256, 0)
+    assert np.allclose(f_dmt, c_dmt)
+    assert np.allclose(f_dedisp, c_dedisp)
+
+
+def test_cpu_dedisp_dmt_crop_decimated():
+    rng = np.random.default_rng(0)
+    nt, nf, tsamp = 1100, 520, 1e-3
+    chan_freqs = np.linspace(1500, 1200, nf)
+    cand = SimpleNamespace(
+        data=rng.integers(0, 256, size=(nt, nf)).astype(np.uint8),
+        chan_freqs=chan_freqs,
+        dm=300.0,
+        width=8,
+        your_header=SimpleNamespace(tsamp=tsamp),
+    )
+    cand = cpu_dedisp_and_dmt_crop(cand)
+
+    # roll every channel, decimate by 4 in time (and 2 in frequency) and crop the middle
+    # 256 samples
+    def rolled(dm, freqs):
+        delays = np.round(calc_dispersion_delays(dm, freqs) / tsamp).astype(int)
+        return np.array([np.roll(cand.data[:, c], d) for c, d in enumerate(delays)])
+
+    start = nt // 4 // 2 - 128
+    freqs32 = chan_freqs.astype(np.float32).astype(np.float64)
+    ft = rolled(300.0, freqs32).reshape(260, 2, nt // 4, 4).sum(axis=(1, 3))
+    assert np.allclose(cand.dedispersed, ft[:, start : start + 256].T)
+    for ii, dm in [(0, 0), (100, 600 * 100 / 255), (255, 600)]:
+        ts = rolled(dm, chan_freqs).sum(0).reshape(-1, 4).sum(1)
+        assert np.allclose(cand.dmt[ii], ts[start : start + 256])
+
+    cand.data = cand.data[:, :200]
+    with pytest.raises(IndexError):
+        cpu_dedisp_and_dmt_crop(cand)
+
+
+def test_cpu_dedisp_dmt_crop_batch():
+    rng = np.random.default_rng(0)
+    chan_freqs = np.linspace(1500, 1200, 300)
+
+    def cand(nt, dm, width, dtype=np.uint8):
+        return SimpleNamespace(
+            data=rng.integers(0, 256, size=(nt, 300)).astype(dtype),
+            chan_freqs=chan_freqs,
+            dm=dm,
+            width=width,
+            your_header=SimpleNamespace(tsamp=1e-3),
+        )
+
+    cands = [
+        cand(600, 100.0, 2),
+        cand(600, 400.0, 2, np.float32),
+        cand(1200, 250.0, 4),
+        cand(600, 50.0, 2),
+    ]
+    assert [len(group) for group in group_candidates(cands).values()] == [3, 1]
+    cpu_dedisp_and_dmt_crop_batch(cands)
+    for c in cands:
+        dedispersed, dmt = c.dedispersed, c.dmt
+        cpu_dedisp_and_dmt_crop(c)
+        assert dedispersed.shape == (256, 300) and dmt.shape == (256, 256)
+        assert np.allclose(dedispersed, c.dedispersed)
+        assert np.allclose(dmt, c.dmt)
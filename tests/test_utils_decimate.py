@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from your.utils.decimate import accumulator_dtype, block_decimate, block_sum
+
+
+def test_accumulator_dtype():
+    assert accumulator_dtype(np.uint8, 2) == np.uint16
+    assert accumulator_dtype(np.uint8, 1024) == np.uint32
+    assert accumulator_dtype(np.uint16, 2) == np.uint32
+    assert accumulator_dtype(np.int8, 4) == np.int16
+    assert accumulator_dtype(np.float32, 4) == np.float32
+    with pytest.raises(TypeError):
+        accumulator_dtype(np.complex64, 2)
+
+
+@pytest.mark.parametrize("use_numba", [False, True])
+def test_block_decimate(use_numba):
+    data = np.random.randint(0, 256, size=(64, 2, 32), dtype=np.uint8)
+    expected = data.astype(np.float64).reshape(16, 4, 2, 8, 4).mean(axis=(1, 4))
+
+    dec = block_decimate(data, 4, 4, use_numba=use_numba)
+    assert dec.dtype == np.float32
+    assert np.allclose(dec, expected)
+
+    dec = block_decimate(data[:, 0, :], 4, 4, use_numba=use_numba)
+    assert np.allclose(dec, expected[:, 0, :])
+
+    summed = block_sum(np.full((32, 16), 255, dtype=np.uint8), 32, 16, use_numba)
+    assert summed.dtype == np.uint32
+    assert summed[0, 0] == 255 * 512
+
+
+def test_block_decimate_errors():
+    data = np.zeros((10, 8), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        block_decimate(data, 3, 1)
+    with pytest.raises(ValueError):
+        block_decimate(data, 1, 3)
+    with pytest.raises(ValueError):
+        block_decimate(data[None, None], 1, 1)
@@ -1,4 +1,6 @@
 import os
+import subprocess
+import sys
 
 import pytest
 
@@ -9,6 +11,118 @@ from your.utils.misc import crop
 os.environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
 _install_dir = os.path.abspath(os.path.dirname(__file__))
 
+# runs the kernels on the CUDA simulator, which has to be enabled before numba is
+# imported
+CUDASIM_SCRIPT = """
+from types import SimpleNamespace
+
+import numpy as np
+
+from your.utils.cpu import cpu_dedisp_and_dmt_crop, cpu_dedisp_and_dmt_crop_batch
+from your.utils.gpu import (
+    _state,
+    gpu_dedisp_and_dmt_crop,
+    gpu_dedisp_and_dmt_crop_batch,
+    gpu_dedisperse,
+    gpu_dmt,
+)
+
+rng = np.random.default_rng(0)
+nt, nf, tsamp = 32, 18, 1e-3
+
+
+def reference(cand, size):
+    # port of the original algorithm, cropped:
+    # out[ii // fdf, jj // tdf] += data[ii, (jj + disp_time[ii]) % nt]
+
+    n, f = cand.data.shape
+    tdf = 1 if cand.width < 3 else cand.width // 2
+    fdf = f // size
+    ncols = n // tdf
+    start = ncols // 2 - size // 2
+    data = cand.data.T.astype(np.float64)
+
+    def summed(disp_time, group, nrows):
+        out = np.zeros((nrows, ncols))
+        for ii in range(nrows * group):
+            for jj in range(ncols * tdf):
+                out[ii // group, jj // tdf] += data[ii, (jj + disp_time[ii]) % n]
+        return out[:, start : start + size]
+
+    def disp_time(dm, freqs):
+        return [
+            int(round(-4148808.0 * dm * (1 / freqs[0] ** 2 - 1 / fi**2) / 1000 / tsamp))
+            for fi in freqs
+        ]
+
+    freqs32 = [float(fi) for fi in np.asarray(cand.chan_freqs, dtype=np.float32)]
+    dedispersed = summed(disp_time(cand.dm, freqs32), fdf, f // fdf).T
+    dmt = [
+        summed(disp_time(dm, list(cand.chan_freqs)), f, 1)[0]
+        for dm in np.linspace(0, 2 * cand.dm, size)
+    ]
+    return dedispersed, np.array(dmt)
+
+chan_freqs = np.linspace(1500, 1200, nf)
+cand = SimpleNamespace(
+    chan_freqs=chan_freqs,
+    dm=300.0,
+    width=4,
+    your_header=SimpleNamespace(tsamp=tsamp, dtype=np.uint8),
+)
+
+# the second candidate reuses (and has to zero) the buffers of the first
+for _ in range(2):
+    cand.data = rng.integers(0, 256, size=(nt, nf)).astype(np.uint8)
+    gpu_dedisp_and_dmt_crop(cand, size=8)
+    g_dedisp, g_dmt = cand.dedispersed, cand.dmt
+    assert g_dedisp.shape == (8, 9) and g_dmt.shape == (8, 8)
+    r_dedisp, r_dmt = reference(cand, 8)
+    assert np.allclose(g_dedisp, r_dedisp)
+    assert np.allclose(g_dmt, r_dmt)
+    cpu_dedisp_and_dmt_crop(cand, size=8)
+    assert np.allclose(g_dedisp, cand.dedispersed)
+    assert np.allclose(g_dmt, cand.dmt)
+buffers = dict(_state.buffers)
+
+def rolled(dm):
+    freqs = chan_freqs.astype(np.float32).astype(np.float64)
+    delays = -4148808.0 * dm * (1 / freqs[0] ** 2 - 1 / freqs**2) / 1000
+    delays = np.round(delays / tsamp)
+
+    return np.array([np.roll(cand.data[:, c], -int(d)) for c, d in enumerate(delays)]).T
+
+gpu_dedisperse(cand)
+assert cand.dedispersed.dtype == np.uint8
+assert (cand.dedispersed == rolled(300.0)).all()
+gpu_dmt(cand, dmsteps=3)
+for dmt, dm in zip(cand.dmt, np.linspace(0, 600, 3, dtype=np.float32)):
+    assert np.allclose(dmt, rolled(float(dm)).sum(1))
+assert all(_state.buffers[name] is buffer for name, buffer in buffers.items())
+
+# a batch of two candidates of the same shape and one of another (whose last channel is
+# not decimated)
+cands = [
+    SimpleNamespace(
+        data=rng.integers(0, 256, size=(n, f)).astype(np.uint8),
+        chan_freqs=np.linspace(1500, 1200, f),
+        dm=dm,
+        width=width,
+        your_header=cand.your_header,
+    )
+    for n, f, dm, width in [(nt, nf, 100.0, 4), (nt, nf, 500.0, 4), (20, 19, 300.0, 2)]
+]
+gpu_dedisp_and_dmt_crop_batch(cands, size=8)
+outputs = [(c.dedispersed, c.dmt) for c in cands]
+cpu_dedisp_and_dmt_crop_batch(cands, size=8)
+for c, (g_dedisp, g_dmt) in zip(cands, outputs):
+    r_dedisp, r_dmt = reference(c, 8)
+    for dedispersed, dmt in [(g_dedisp, g_dmt), (c.dedispersed, c.dmt)]:
+        assert dedispersed.shape == r_dedisp.shape and dmt.shape == r_dmt.shape
+        assert np.allclose(dedispersed, r_dedisp)
+        assert np.allclose(dmt, r_dmt)
+"""
+
 
 @pytest.mark.skipif(not cuda.is_available(), reason="requires a GPU")
 def test_gpu_dedisperse():
@@ -84,3 +198,10 @@ def test_gpu_dedisp_dmt_crop():
 
     assert np.isclose(np.sum(g_dmt - c_dmt), 0, atol=1)
     assert np.isclose(np.sum(g_dedisp - c_dedisp), 0, atol=1)
+
+
+def test_gpu_kernels_cudasim():
+    env = dict(os.environ, NUMBA_ENABLE_CUDASIM="1")
+    subprocess.run(
+        [sys.executable, "-c", CUDASIM_SCRIPT], check=True, timeout=600, env=env
+    )
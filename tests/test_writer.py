@@ -1,5 +1,6 @@
 import os
 
+import numpy as np
 import pytest
 
 from your import Your
@@ -46,6 +47,19 @@ def test_fil_to_fil(your_object):
     os.remove("small_converted.fil")
 
 
+def test_get_data_to_write_no_copy(your_object):
+    # the data is only copied when it is modified
+    data = your_object.get_data(0, 10, copy=False)
+    w = Writer(your_object, nstart=0, nsamp=10, outdir="./")
+    w.get_data_to_write(0, 10)
+    assert np.shares_memory(w.data, data)
+    assert (w.data[:, 0] == data).all()
+
+    w = Writer(your_object, nstart=0, nsamp=10, outdir="./", flag_rfi=True)
+    w.get_data_to_write(0, 10)
+    assert not np.shares_memory(w.data, data)
+
+
 def test_fits_to_fil():
     # from fits
     file = os.path.join(_install_dir, "data/small.fits")
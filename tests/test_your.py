@@ -1,8 +1,16 @@
+import multiprocessing
 import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pytest
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
 
-from your import Your
+from your import Your, read_headers
 
 _install_dir = os.path.abspath(os.path.dirname(__file__))
 
@@ -128,3 +136,245 @@ def test_repr(fil_file):
 
 def test_dispersion_delay(y):
     assert pytest.approx(y.dispersion_delay(1), rel=1e-3) == 0.0013160529703817566
+
+
+def test_iter_chunks(y):
+    starts = []
+    chunks = []
+    for start, data in y.iter_chunks(100, nstart=10, nsamp=350):
+        starts.append(start)
+        chunks.append(data)
+    assert starts == [10, 110, 210, 310]
+    assert [len(c) for c in chunks] == [100, 100, 100, 50]
+    assert (np.concatenate(chunks) == y.get_data(10, 350)).all()
+
+    chunks = [data for _, data in y.iter_chunks(100, overlap=20, nsamp=300)]
+    assert [len(c) for c in chunks] == [120, 120, 100]
+    assert (chunks[0][100:] == chunks[1][:20]).all()
+
+    with pytest.raises(ValueError):
+        next(y.iter_chunks(0))
+
+
+def test_chunk_blocks(y):
+    blocks = list(y.chunk_blocks(100, overlap=20, nstart=10, nsamp=250))
+    assert blocks == [(10, 120), (110, 120), (210, 50)]
+    nspectra = int(y.your_header.nspectra)
+    assert list(y.chunk_blocks(nspectra, nstart=nspectra - 5)) == [(nspectra - 5, 5)]
+    assert list(y.chunk_blocks(100, nsamp=0)) == []
+    with pytest.raises(ValueError):
+        list(y.chunk_blocks(10, overlap=-1))
+
+
+def test_get_data_no_copy(y, fits_file):
+    data = y.get_data(0, 256, copy=False)
+    assert not data.flags.writeable
+    assert data.base is not None
+    assert (data == y.get_data(0, 256)).all()
+    assert y.get_data(0, 256).flags.writeable
+
+    data = y.get_data(0, 256, time_decimation_factor=2, copy=False)
+    assert data.shape == (128, 336)
+    assert data.dtype == y.your_header.dtype
+
+    fits_obj = Your(fits_file)
+    data = fits_obj.get_data(0, 256, copy=False)
+    assert (data == fits_obj.get_data(0, 256)).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_get_data_out(file):
+    y = Your(os.path.join(_install_dir, file))
+    out = np.zeros((300, 336), dtype=y.your_header.dtype)
+    data = y.get_data(10, 300, out=out)
+    assert data is out or data.base is out
+    assert (out == y.get_data(10, 300)).all()
+
+    out = np.zeros((300, 336), dtype=np.float32)
+    y.get_data(10, 300, out=out)
+    assert (out == y.get_data(10, 300)).all()
+
+    out = np.zeros((150, 168), dtype=y.your_header.dtype)
+    data = y.get_data(
+        10, 300, time_decimation_factor=2, frequency_decimation_factor=2, out=out
+    )
+    assert data.base is out
+    assert (out == data).all()
+
+    with pytest.raises(ValueError):
+        y.get_data(10, 100, out=out)
+
+
+def test_get_data_out_4pol():
+    y = Your(os.path.join(_install_dir, "data/test_4pol.fits"))
+    out = np.empty((100, 4, 512), dtype=y.your_header.dtype)
+    y.get_data(0, 100, npoln=4, out=out)
+    assert (out == y.get_data(0, 100, npoln=4)).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_get_data_channel_range(file):
+    y = Your(os.path.join(_install_dir, file))
+    data = y.get_data(0, 200)
+    assert (y.get_data(0, 200, c_min=10, c_max=100) == data[:, 10:100]).all()
+    assert (y.get_data(0, 200, c_min=300) == data[:, 300:]).all()
+    assert (y.get_data(0, 200, c_max=1) == data[:, :1]).all()
+
+    data = y.get_data(0, 200, c_min=16, c_max=272, frequency_decimation_factor=4)
+    assert data.shape == (200, 64)
+
+    with pytest.raises(ValueError):
+        y.get_data(0, 200, c_min=100, c_max=100)
+
+
+def test_get_data_channel_range_4pol():
+    y = Your(os.path.join(_install_dir, "data/test_4pol.fits"))
+    data = y.get_data(0, 100, npoln=4)
+    assert (y.get_data(0, 100, npoln=4, c_min=5, c_max=50) == data[..., 5:50]).all()
+    data = y.get_data(0, 100, pol=1)
+    assert (y.get_data(0, 100, pol=1, c_min=5, c_max=50) == data[..., 5:50]).all()
+
+
+def test_decimation_adjacent_samples(y):
+    data = y.get_data(0, 256).astype(np.float32)
+    dec = y.get_data(0, 256, time_decimation_factor=4, frequency_decimation_factor=2)
+    expected = np.round(data.reshape(64, 4, 168, 2).mean(axis=(1, 3)))
+    assert (dec == expected.astype(y.your_header.dtype)).all()
+    assert (
+        y.get_data(
+            0,
+            256,
+            time_decimation_factor=4,
+            frequency_decimation_factor=2,
+            use_numba=True,
+        )
+        == dec
+    ).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_get_data_workers(file):
+    y = Your(os.path.join(_install_dir, file))
+    data = y.get_data(10, 4000)
+    assert (y.get_data(10, 4000, workers=4) == data).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_concurrent_reads(file):
+    y = Your(os.path.join(_install_dir, file))
+    nstarts = list(range(0, 4096, 256)) * 4
+    expected = {nstart: y.get_data(nstart, 300) for nstart in set(nstarts)}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        data = list(executor.map(lambda nstart: y.get_data(nstart, 300), nstarts))
+    for nstart, d in zip(nstarts, data):
+        assert (d == expected[nstart]).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_concurrent_decimation(file):
+    y = Your(os.path.join(_install_dir, file))
+    factors = [(1, 1), (4, 2)] * 16
+    expected = {
+        f: y.get_data(
+            0, 512, time_decimation_factor=f[0], frequency_decimation_factor=f[1]
+        )
+        for f in set(factors)
+    }
+    y.your_header.time_decimation_factor = 1
+    y.your_header.frequency_decimation_factor = 1
+
+    # a read without factors leaves those of the header
+    y.get_data(0, 512)
+    assert y.your_header.nspectra == y.your_header.native_nspectra
+
+    def read(f):
+        return y.get_data(
+            0, 512, time_decimation_factor=f[0], frequency_decimation_factor=f[1]
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        data = list(executor.map(read, factors))
+    for f, d in zip(factors, data):
+        assert (d == expected[f]).all()
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_pickle(file):
+    y = Your(os.path.join(_install_dir, file))
+    data = y.get_data(100, 512)
+    unpickled = pickle.loads(pickle.dumps(y))
+    assert (unpickled.get_data(100, 512) == data).all()
+    assert unpickled.your_header.nspectra == y.your_header.nspectra
+
+
+FORK_READ = """
+import multiprocessing
+import numpy as np
+from your import Your
+
+y = Your({file!r})
+data = y.get_data(100, 512)
+
+
+def read(nstart):
+    return y.get_data(nstart, 512)
+
+
+with multiprocessing.get_context("fork").Pool(2) as pool:
+    forked = pool.map(read, [100, 100, 100, 100])
+assert all((f == data).all() for f in forked)
+assert (y.get_data(100, 512) == data).all()
+"""
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_read_after_fork(file):
+    # in a new interpreter, as forking after numba has started its threads can hang
+    code = FORK_READ.format(file=os.path.join(_install_dir, file))
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=120)
+
+
+def test_read_headers():
+    files = [
+        os.path.join(_install_dir, "data/small.fil"),
+        os.path.join(_install_dir, "data/28.fits"),
+        [os.path.join(_install_dir, "data/28.fits")],
+    ]
+    headers = read_headers(files, workers=3)
+    assert [header.format for header in headers] == ["fil", "fits", "fits"]
+    assert headers[1].nspectra == Your(files[1]).your_header.nspectra
+    assert read_headers(files[:1], workers=1)[0].nchans == headers[0].nchans
+
+
+def test_header_lazy_values():
+    y = Your(os.path.join(_install_dir, "data/28.fits"))
+    header = y.your_header
+    assert "gl" not in vars(header)
+    expected = SkyCoord(header.ra_deg, header.dec_deg, unit="deg").galactic
+    assert header.gl == pytest.approx(expected.l.value - 180, abs=1e-4)
+    assert header.gb == pytest.approx(expected.b.value, abs=1e-4)
+    assert header.tstart_utc == Time(header.tstart, format="mjd").utc.isot
+
+
+@pytest.mark.parametrize("file", ["data/28.fil", "data/28.fits"])
+def test_get_data_many(file):
+    y = Your(os.path.join(_install_dir, file))
+    windows = [(500, 100), (0, 64), (520, 50), (600, 10), (2000, 128), (0, 32)]
+    data = y.get_data_many(windows)
+    for (nstart, nsamp), d in zip(windows, data):
+        assert (d == y.get_data(nstart, nsamp)).all()
+    # the overlapping and adjacent windows share one read
+    assert data[0].base is data[2].base is data[3].base
+    assert data[0].base is not data[4].base
+
+    # spans are not merged beyond max_span_mb
+    small = y.get_data_many(windows, max_span_mb=1e-4)
+    assert small[0].base is not small[3].base
+    for d, s in zip(data, small):
+        assert (d == s).all()
+
+    with pytest.raises(ValueError):
+        y.get_data_many([(0, 64)], time_decimation_factor=2)
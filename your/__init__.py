@@ -1,4 +1,32 @@
-from your.writer import *
 from your.your import *
 
 __version__ = "0.6.8"
+
+# Names of the writer module, which pulls in astropy and scipy, so it is only imported
+# once one of them is used (e.g. your.Writer). These are the names it used to
+# star-export into the package.
+_WRITER_NAMES = {
+    "Writer",
+    "fits",
+    "Time",
+    "Progress",
+    "sigproc_object_from_writer",
+    "initialize_psrfits",
+    "primes",
+    "sk_sg_filter",
+}
+
+__all__ = [name for name in dir() if not name.startswith("_")] + sorted(_WRITER_NAMES)
+
+
+def __getattr__(name):
+    if name == "writer" or name in _WRITER_NAMES:
+        import importlib
+
+        writer = importlib.import_module("your.writer")
+        return writer if name == "writer" else getattr(writer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _WRITER_NAMES | {"writer"})
@@ -0,0 +1,186 @@
+"""
+asyncio interface to the readers, so that an event loop can wait on many reads without
+blocking.
+"""
+
+import asyncio
+import functools
+import logging
+
+from your.your import Your
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncYour(object):
+    """
+    Awaitable reads from a Your object. The reads (and the decoding of the data) run in
+    an executor, so the event loop keeps serving other requests while the data is read,
+    and the reads of concurrent requests overlap.
+
+    Args:
+        file: String or a list of files (see `Your`), or a Your object
+        executor (concurrent.futures.Executor): Executor to run the reads in (default:
+        the default executor of the event loop, a thread pool)
+        **kwargs: arguments passed on to `Your`
+
+    Note:
+        Opening a file reads its headers, use `await AsyncYour.open(file)` to do that in
+        the executor as well. Each read uses its own decimation factors, so the executor
+        can read for many requests at once. Factors passed to a read are stored in the
+        header of the Your object though (see `Your.get_data`), so requests which
+        decimate differently should all pass their factors.
+
+    Examples:
+        async with await AsyncYour.open("/path/to/filterbank.fil") as your_object:
+            data = await your_object.get_data(0, 1024)
+            cutouts = await asyncio.gather(
+                *(your_object.get_data(s, 256) for s in starts)
+            )
+
+    Attributes:
+        your: the Your object
+        your_header: instance of the Header class of the Your object
+
+    """
+
+    def __init__(self, file, executor=None, **kwargs):
+        self.your = file if isinstance(file, Your) else Your(file, **kwargs)
+        self.executor = executor
+
+    @classmethod
+    async def open(cls, file, executor=None, **kwargs):
+        """
+        Open the file(s) in the executor.
+
+        Args:
+            file: String or a list of files (see `Your`)
+            executor (concurrent.futures.Executor): Executor to run the reads in
+            **kwargs: arguments passed on to `Your`
+
+        Returns:
+            AsyncYour: the opened files
+
+        """
+        loop = asyncio.get_running_loop()
+        your = await loop.run_in_executor(
+            executor, functools.partial(Your, file, **kwargs)
+        )
+        return cls(your, executor=executor)
+
+    @property
+    def your_header(self):
+        return self.your.your_header
+
+    def __repr__(self):
+        return f"AsyncYour({self.your!r})"
+
+    def _run(self, func, *args, **kwargs):
+        """
+        Run a function in the executor.
+
+        Returns:
+            asyncio.Future: result of the function
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def get_data(self, nstart, nsamp, **kwargs):
+        """
+        Read data, see `Your.get_data`.
+
+        Args:
+            nstart (int): start sample
+            nsamp (int): number of samples to read
+            **kwargs: arguments passed on to `Your.get_data`
+
+        Returns:
+            numpy.ndarray: data
+
+        """
+        return await self._run(self.your.get_data, nstart, nsamp, **kwargs)
+
+    async def get_data_many(self, windows, **kwargs):
+        """
+        Read many windows of data, see `Your.get_data_many`.
+
+        Args:
+            windows (list): (nstart, nsamp) of every window
+            **kwargs: arguments passed on to `Your.get_data_many`
+
+        Returns:
+            list: numpy.ndarray of data of every window
+
+        """
+        return await self._run(self.your.get_data_many, windows, **kwargs)
+
+    async def bandpass(self, nspectra=None):
+        """
+        Create the bandpass of the file, see `Your.bandpass`.
+
+        Args:
+            nspectra (int): Number of spectra to create bandpass from.
+
+        Returns:
+            numpy.ndarray: bandpass array
+
+        """
+        return await self._run(self.your.bandpass, nspectra)
+
+    async def iter_chunks(self, gulp, overlap=0, nstart=0, nsamp=None, **kwargs):
+        """
+        Iterate over consecutive blocks of data, see `Your.iter_chunks`. The next block
+        is read in the executor while the current one is being processed by the caller.
+
+        Args:
+            gulp (int): number of samples to step forward by for every block
+            overlap (int): number of extra samples to read at the end of every block
+            nstart (int): start sample
+            nsamp (int): number of samples to iterate over (default: till the end of the
+            data)
+            **kwargs: arguments passed on to `Your.get_data`
+
+        Examples:
+            async for start, data in your_object.iter_chunks(4096, overlap=max_delay):
+                process(start, data)
+
+        Yields:
+            tuple: (start sample of the block, numpy.ndarray of data)
+
+        """
+        blocks = list(self.your.chunk_blocks(gulp, overlap, nstart, nsamp))
+        if not blocks:
+            return
+
+        def read(block):
+            return self.your.get_data(*block, **kwargs)
+
+        future = self._run(read, blocks[0])
+        try:
+            for i, (start, _) in enumerate(blocks):
+                data = await future
+                if i + 1 < len(blocks):
+                    logger.debug(
+                        f"Prefetching block starting at sample {blocks[i + 1][0]}"
+                    )
+                    future = self._run(read, blocks[i + 1])
+                yield start, data
+        finally:
+            future.cancel()
+
+    def close(self):
+        """
+        Close the open files of the Your object.
+        """
+        if self.your.format == "fits":
+            self.your.fits_pool.close()
+        else:
+            self.your.fp.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
@@ -0,0 +1,193 @@
+"""
+Read-only array view of an observation, which reads the data only when it is indexed.
+"""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class YourArray(object):
+    """
+    Array of shape (nspectra, npol, nchans) over the data of a Your object. Nothing is
+    read until the array is indexed, and then only the spectra and channels spanned by
+    the index are read, in chunks of at most `chunk_mb`. Integers, slices (with steps)
+    and Ellipsis are supported on every axis, as in numpy.
+
+    Args:
+        your: Your object
+        chunk_mb (float): Maximum size of each read (MB). Strided indices read each
+        chunk and keep every step-th spectrum, so reading every 1000th spectrum of a
+        long observation does not read all of it at once.
+        workers (int): Number of threads decoding PSRFITS subints, see `Your.get_data`
+
+    Note:
+        The polarisation axis has all the polarisations for data with 4 polarisations,
+        otherwise only the intensity. The data is not decimated, whatever the decimation
+        factors of the header are.
+
+    Examples:
+        data = your_object.as_array()
+        data[1000:2000, 0, 100:200]  # numpy array of shape (1000, 100)
+        data[::64, 0]  # every 64th spectrum
+
+    Attributes:
+        shape (tuple): Shape of the array
+        dtype: dtype of the data
+        ndim (int): Number of dimensions (3)
+
+    """
+
+    def __init__(self, your, chunk_mb=256, workers=1):
+        self.your = your
+        self.chunk_mb = chunk_mb
+        self.workers = workers
+        self.npoln = 4 if your.your_header.npol == 4 else 1
+        self.shape = (
+            int(your.your_header.native_nspectra),
+            self.npoln,
+            int(your.your_header.native_nchans),
+        )
+        self.dtype = np.dtype(your.your_header.dtype)
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return (
+            f"YourArray(shape={self.shape}, dtype={self.dtype}, "
+            f"file={self.your.your_header.filename})"
+        )
+
+    def __array__(self, dtype=None, copy=None):
+        logger.warning("Reading all the data of the observation into memory.")
+        data = self[:]
+        return data if dtype is None else data.astype(dtype)
+
+    def _normalise_key(self, key):
+        """
+        Expand the index into one entry (int or slice) per axis.
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if sum(k is Ellipsis for k in key) > 1:
+            raise IndexError("an index can only have a single ellipsis ('...')")
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:i] + fill + key[i + 1 :]
+        if len(key) > self.ndim:
+            raise IndexError(
+                f"too many indices for array: array is {self.ndim}-dimensional, "
+                f"but {len(key)} were indexed"
+            )
+        key = key + (slice(None),) * (self.ndim - len(key))
+        for k in key:
+            if not isinstance(k, (slice, int, np.integer)):
+                raise TypeError(
+                    "Only integers, slices and ellipsis are valid indices, "
+                    f"got {type(k).__name__}"
+                )
+        return key
+
+    @staticmethod
+    def _axis_range(k, n, axis):
+        """
+        Indices selected by an int or slice along an axis of length n.
+        """
+        if isinstance(k, slice):
+            return range(n)[k]
+        if not -n <= k < n:
+            raise IndexError(
+                f"index {k} is out of bounds for axis {axis} with size {n}"
+            )
+        return range(n)[k : k + 1 if k != -1 else None]
+
+    def _read(self, nstart, nsamp, c_min, c_max, out):
+        """
+        Read nsamp spectra of channels c_min to c_max into out, with the dtype
+        conversion of `Your.get_data`.
+        """
+        your = self.your
+        kwargs = {"workers": self.workers} if your.format == "fits" else {}
+        data = your.formatclass.get_data(
+            your,
+            nstart,
+            nsamp,
+            npoln=self.npoln,
+            c_min=c_min,
+            c_max=c_max,
+            **kwargs,
+        )
+        if data.ndim == 2:
+            data = data[:, None, :]
+        if your.your_header.nbits != 32 and data.dtype != self.dtype:
+            np.rint(data, out=out, casting="unsafe")
+        else:
+            out[...] = data
+
+    def __getitem__(self, key):
+        key = self._normalise_key(key)
+        times, pols, chans = (
+            self._axis_range(k, n, axis)
+            for axis, (k, n) in enumerate(zip(key, self.shape))
+        )
+
+        # the spectra are read in increasing order, and channels from the smallest to
+        # the largest selected
+        nt = len(times)
+        step = abs(times.step)
+        c_min, c_max = self._bounds(chans)
+        data = np.empty((nt, self.npoln, c_max - c_min), dtype=self.dtype)
+        if nt and c_max > c_min:
+            t_first = min(times[0], times[-1])
+            # the readers decode to float32
+            spectrum_bytes = 4 * self.npoln * (c_max - c_min)
+            per_read = max(1, int(self.chunk_mb * 2**20 // spectrum_bytes) // step)
+            logger.debug(
+                f"Reading {nt} spectra from {t_first} with step {step}, "
+                f"{per_read} per read"
+            )
+            block = None
+            for k in range(0, nt, per_read):
+                n = min(per_read, nt - k)
+                nsamp = (n - 1) * step + 1
+                if block is None or block.shape[0] != nsamp:
+                    block = np.empty((nsamp, self.npoln, c_max - c_min), self.dtype)
+                self._read(t_first + k * step, nsamp, c_min, c_max, block)
+                data[k : k + n] = block[::step]
+
+        if times.step < 0:
+            data = data[::-1]
+        selection = (
+            slice(None) if isinstance(key[0], slice) else 0,
+            self._relative(pols, 0, key[1]),
+            self._relative(chans, c_min, key[2]),
+        )
+        return data[selection]
+
+    @staticmethod
+    def _bounds(indices):
+        """
+        Smallest range (start, stop) with a step of 1 which contains the indices.
+        """
+        if len(indices) == 0:
+            return 0, 0
+        return min(indices[0], indices[-1]), max(indices[0], indices[-1]) + 1
+
+    @staticmethod
+    def _relative(indices, offset, k):
+        """
+        Index into an array which starts at offset (and has every index in between),
+        selecting indices.
+        """
+        if not isinstance(k, slice):
+            return indices[0] - offset
+        if len(indices) == 0:
+            return slice(0, 0)
+        start = indices[0] - offset
+        stop = indices[-1] - offset + (1 if indices.step > 0 else -1)
+        return slice(start, stop if stop >= 0 else None, indices.step)
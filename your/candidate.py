@@ -1,10 +1,7 @@
 #!/usr/bin/env python3
 
-import h5py
-from scipy.optimize import golden
-
 from your import Your
-from your.utils.gpu import gpu_dedisperse, gpu_dmt
+from your.utils.astro import calc_dispersion_delays, shift_channels
 from your.utils.misc import *
 from your.utils.misc import _decimate, _resize
 from your.utils.rfi import sk_sg_filter
@@ -30,6 +27,9 @@ class Candidate(Your):
         savgol_frequency_window (float): Filter window for savgol filter
         savgol_sigma (float):  Sigma for savgol filter
         flag_rfi (bool): To turn on RFI flagging
+        subint_cache_mb (float): Size of the cache of decoded PSRFITS subints (MB), see
+        `Your`
+        subint_cache (SubintCache): Cache of decoded PSRFITS subints to use, see `Your`
     """
 
     def __init__(
@@ -47,8 +47,12 @@ class Candidate(Your):
         savgol_frequency_window=15,
         savgol_sigma=4,
         flag_rfi=False,
+        subint_cache_mb=None,
+        subint_cache=None,
     ):
-        Your.__init__(self, fp)
+        Your.__init__(
+            self, fp, subint_cache_mb=subint_cache_mb, subint_cache=subint_cache
+        )
         self.dm = dm
         self.tcand = tcand
         self.width = width
@@ -96,6 +100,8 @@ class Candidate(Your):
                 out_dir = out_dir + "/"
             fnout = out_dir + fnout
         logger.info(f"Saving h5 file {fnout}.")
+        import h5py
+
         with h5py.File(fnout, "w") as f:
             f.attrs["cand_id"] = cand_id
             f.attrs["tcand"] = self.tcand
@@ -122,6 +128,9 @@ class Candidate(Your):
             f.attrs["nchans"] = self.your_header.nchans
             f.attrs["foff"] = self.your_header.foff
             f.attrs["nspectra"] = self.your_header.nspectra
+            f.attrs["gl"] = self.your_header.gl
+            f.attrs["gb"] = self.your_header.gb
+            f.attrs["tstart_utc"] = self.your_header.tstart_utc
 
             freq_time_dset = f.create_dataset(
                 "data_freq_time",
@@ -166,9 +175,10 @@ class Candidate(Your):
             / 1000
         )
 
-    def get_chunk(self, tstart=None, tstop=None, for_preprocessing=True):
+    def chunk_window(self, tstart=None, tstop=None, for_preprocessing=True):
         """
-        Get a chunk of data. The data is saved in `self.data`.
+        Window of spectra read by `get_chunk`. It can extend beyond the data, which is
+        then padded.
 
         Args:
             tstart (float): start time of the chunk in seconds
@@ -176,6 +186,9 @@ class Candidate(Your):
             for_preprocessing (bool): if the data is to be preprocessed later. This will modify the number of samples
             read based on the width of the candidate
 
+        Returns:
+            tuple: (nstart, nsamp) of the window
+
         """
         if tstart is None:
             tstart = (
@@ -208,62 +221,65 @@ class Candidate(Your):
             f"nstart is {nstart}, nsamp is {nsamp}"
         )
 
-        nspectra = int(self.your_header.nspectra)
-        if nstart_read >= 0 and nstart_read + nsamp_read <= nspectra:
-            logging.debug(
-                f"All the data available in the file, no need to pad. \n"
-                f"nstart_read({nstart_read})>=0 and \n"
-                f"nstart_read({nstart_read})+nsamp_read({nsamp_read})<=nspectra({nspectra})"
-            )
-            data = self.get_data(nstart=nstart_read, nsamp=nsamp_read)
-        elif nstart_read < 0:
-            if nstart_read + nsamp_read <= nspectra:
-                logging.debug(
-                    f"nstart_read({nstart_read})<0 and nstart_read({nstart_read})\n"
-                    f"+nsamp_read({nsamp_read})<=nspectra({nspectra})"
-                )
-                logging.info("Padding with median in the beginning")
-                d = self.get_data(nstart=0, nsamp=nsamp_read + nstart_read)
-                dmedian = np.median(d, axis=0)
-                data = (
-                    np.ones(
-                        (nsamp_read, self.your_header.nchans),
-                        dtype=self.your_header.dtype,
-                    )
-                    * dmedian[None, :]
-                )
-                data[-nstart_read:, :] = d
-            else:
-                logging.debug(
-                    f"nstart_read({nstart_read})<0 and nstart_read({nstart_read})"
-                    f"+nsamp_read({nsamp_read})>nspectra({nspectra})"
-                )
-                logging.info("Padding with median in the beginning and the end")
-                d = self.get_data(nstart=0, nsamp=nspectra)
-                dmedian = np.median(d, axis=0)
-                data = (
-                    np.ones(
-                        (nsamp_read, self.your_header.nchans),
-                        dtype=self.your_header.dtype,
-                    )
-                    * dmedian[None, :]
-                )
-                data[-nstart_read : -nstart_read + nspectra, :] = d
-        else:
+        return nstart_read, nsamp_read
+
+    def read_window(self, tstart=None, tstop=None, for_preprocessing=True):
+        """
+        Spectra of `chunk_window` which are in the data.
+
+        Returns:
+            tuple: (nstart, nsamp) to read
+
+        """
+        return self._clip_window(*self.chunk_window(tstart, tstop, for_preprocessing))
+
+    def _clip_window(self, nstart, nsamp):
+        read_start = max(nstart, 0)
+        read_stop = min(nstart + nsamp, int(self.your_header.nspectra))
+        return read_start, read_stop - read_start
+
+    def get_chunk(self, tstart=None, tstop=None, for_preprocessing=True, data=None):
+        """
+        Get a chunk of data. The data is saved in `self.data`.
+
+        Args:
+            tstart (float): start time of the chunk in seconds
+            tstop (float): stop time of the chunk in seconds
+            for_preprocessing (bool): if the data is to be preprocessed later. This will
+            modify the number of samples read based on the width of the candidate
+            data (numpy.ndarray): Data of `read_window`, if it has already been read
+            (e.g. by `get_chunks`)
+
+        """
+        nstart_read, nsamp_read = self.chunk_window(tstart, tstop, for_preprocessing)
+        read_start, read_nsamp = self._clip_window(nstart_read, nsamp_read)
+        if data is None:
+            data = self.get_data(nstart=read_start, nsamp=read_nsamp)
+
+        pad_start = read_start - nstart_read
+        pad_end = nstart_read + nsamp_read - (read_start + read_nsamp)
+        if pad_start > 0 or pad_end > 0:
             logging.debug(
-                f"nstart_read({nstart_read})>=0 and nstart_read({nstart_read})"
-                f"+nsamp_read({nsamp_read})>nspectra({nspectra})"
+                f"nstart_read({nstart_read}), nsamp_read({nsamp_read}) extend beyond "
+                f"the data (nspectra: {self.your_header.nspectra})"
             )
-            logging.info("Padding with median in the end")
-            d = self.get_data(nstart=nstart_read, nsamp=nspectra - nstart_read)
-            dmedian = np.median(d, axis=0)
-            data = (
+            where = {
+                (True, False): "the beginning",
+                (False, True): "the end",
+                (True, True): "the beginning and the end",
+            }[(pad_start > 0, pad_end > 0)]
+            logging.info(f"Padding with median in {where}")
+            dmedian = np.median(data, axis=0)
+            padded = (
                 np.ones(
                     (nsamp_read, self.your_header.nchans), dtype=self.your_header.dtype
                 )
                 * dmedian[None, :]
             )
-            data[: nspectra - nstart_read, :] = d
+            padded[pad_start : pad_start + read_nsamp, :] = data
+            data = padded
+        else:
+            logging.debug("All the data available in the file, no need to pad.")
 
         self.data = data.astype(self.your_header.dtype)
 
@@ -290,16 +306,35 @@ class Candidate(Your):
             del data_copy
         return self
 
-    def dedisperse(self, dms=None, target="CPU"):
+    def delay_bins(self, dms=None):
+        """
+        Dispersion delay of every channel relative to the first one, in samples.
+
+        Args:
+            dms (float): The DM to calculate the delays at.
+
+        Returns:
+            numpy.ndarray: delays (samples)
+
+        """
+        if dms is None:
+            dms = self.dm
+        delay_time = calc_dispersion_delays(dms, self.chan_freqs)
+        return np.round(delay_time / self.native_tsamp).astype("int64")
+
+    def dedisperse(self, dms=None, target="CPU", mode="wrap"):
         """
         Dedisperse a chunk of data. Saves the dedispersed chunk in `self.dedispersed`.
 
         Note:
-            Our method rolls the data around while dedispersing it.
+            Our method rolls the data around while dedispersing it. With mode="valid"
+            (only on the CPU) only the samples which are not rolled around in any
+            channel are kept.
 
         Args:
             dms (float): The DM to dedisperse the data at.
             target (str): 'CPU' to run the code on the CPU or 'GPU' to run it on a GPU.
+            mode (str): "wrap" or "valid", see `your.utils.astro.shift_channels`
 
         """
 
@@ -309,29 +344,19 @@ class Candidate(Your):
             if target == "CPU":
                 nt, nf = self.data.shape
                 assert nf == len(self.chan_freqs)
-                delay_time = (
-                    4148808.0
-                    * dms
-                    * (1 / (self.chan_freqs[0]) ** 2 - 1 / (self.chan_freqs) ** 2)
-                    / 1000
+                self.dedispersed = shift_channels(
+                    self.data, self.delay_bins(dms), time_axis=0, mode=mode
                 )
-                delay_bins = np.round(delay_time / self.native_tsamp).astype("int64")
-                self.dedispersed = np.zeros(self.data.shape, dtype=np.float32)
-                for ii in range(nf):
-                    self.dedispersed[:, ii] = np.concatenate(
-                        [
-                            self.data[-delay_bins[ii] :, ii],
-                            self.data[: -delay_bins[ii], ii],
-                        ]
-                    )
             elif target == "GPU":
+                from your.utils.gpu import gpu_dedisperse
+
                 gpu_dedisperse(self, device=self.device)
         else:
             logger.warning("No data in self.data, run self.get_chunk() first")
             self.dedispersed = None
         return self
 
-    def dedispersets(self, dms=None):
+    def dedispersets(self, dms=None, mode="wrap"):
         """
         Create a dedispersed time series
 
@@ -340,6 +365,7 @@ class Candidate(Your):
 
         Args:
             dms (float): The DM to dedisperse the data at.
+            mode (str): "wrap" or "valid", see `your.utils.astro.shift_channels`
 
         Returns:
             numpy.ndarray: Dedispersed time series.
@@ -350,19 +376,10 @@ class Candidate(Your):
         if self.data is not None:
             nt, nf = self.data.shape
             assert nf == len(self.chan_freqs)
-            delay_time = (
-                4148808.0
-                * dms
-                * (1 / (self.chan_freqs[0]) ** 2 - 1 / (self.chan_freqs) ** 2)
-                / 1000
+            dedispersed = shift_channels(
+                self.data, self.delay_bins(dms), time_axis=0, mode=mode
             )
-            delay_bins = np.round(delay_time / self.native_tsamp).astype("int64")
-            ts = np.zeros(nt, dtype=np.float32)
-            for ii in range(nf):
-                ts += np.concatenate(
-                    [self.data[-delay_bins[ii] :, ii], self.data[: -delay_bins[ii], ii]]
-                )
-            return ts
+            return dedispersed.sum(axis=1, dtype=np.float32)
 
     def dmtime(self, dmsteps=256, target="CPU"):
         """
@@ -373,7 +390,9 @@ class Candidate(Your):
 
         Args:
             dmsteps (int): Number of DMs to dedisperse at.
-            target (str): 'CPU' to run the code on the CPU or 'GPU' to run it on a GPU.
+            target (str): 'CPU' to dedisperse one DM at a time with numpy, 'numba' to
+            run a numba kernel on the CPU (all the DMs in parallel, much faster and with
+            the same output) or 'GPU' to run it on a GPU.
 
         """
         if target == "CPU":
@@ -382,8 +401,14 @@ class Candidate(Your):
             self.dmt = np.zeros((dmsteps, self.data.shape[0]), dtype=np.float32)
             for ii, dm in enumerate(dm_list):
                 self.dmt[ii, :] = self.dedispersets(dms=dm)
+        elif target == "numba":
+            from your.utils.cpu import cpu_dmt
+
+            cpu_dmt(self, dmsteps=dmsteps)
         elif target == "GPU":
-            gpu_dmt(self, device=self.device)
+            from your.utils.gpu import gpu_dmt
+
+            gpu_dmt(self, device=self.device, dmsteps=dmsteps)
         return self
 
     def get_snr(self, time_series=None):
@@ -426,6 +451,8 @@ class Candidate(Your):
             time_series = self.dedispersets(dm)
             return -self.get_snr(time_series)
 
+        from scipy.optimize import golden
+
         try:
             out = golden(
                 dm2snr,
@@ -500,3 +527,37 @@ class Candidate(Your):
                 'Key can either be "dmt": DM-Time or "ft": Frequency-Time'
             )
         return self
+
+
+def get_chunks(candidates, for_preprocessing=True, **kwargs):
+    """
+    Get the chunks of many candidates of the same observation (see
+    `Candidate.get_chunk`). The chunks are read with `Your.get_data_many`, so the
+    spectra shared by the chunks of candidates close in time are read once.
+
+    Args:
+        candidates (list): Candidate objects of the same files
+        for_preprocessing (bool): if the data is to be preprocessed later, see
+        `Candidate.get_chunk`
+        **kwargs: arguments passed on to `Your.get_data_many` (e.g. max_span_mb)
+
+    Returns:
+        list: the candidates, with their chunks in `data`
+
+    """
+    if not candidates:
+        return candidates
+    # all the chunks are read through the files of the first candidate
+    for cand in candidates[1:]:
+        if cand.your_file != candidates[0].your_file:
+            raise ValueError(
+                "Cannot read the chunks of candidates of different files together "
+                f"({cand.your_file} and {candidates[0].your_file})."
+            )
+    windows = [
+        cand.read_window(for_preprocessing=for_preprocessing) for cand in candidates
+    ]
+    chunks = candidates[0].get_data_many(windows, **kwargs)
+    for cand, data in zip(candidates, chunks):
+        cand.get_chunk(for_preprocessing=for_preprocessing, data=data)
+    return candidates
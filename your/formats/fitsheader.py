@@ -0,0 +1,243 @@
+"""
+Scan FITS headers without astropy, and keep an on-disk index of the scanned values.
+
+Only the header blocks are read (2880 bytes at a time) and the data of the HDUs are
+skipped over, so getting the headers of a file costs a few small reads. The index is a
+JSON file next to the data files, with an entry per file which is only used while the
+file's modification time and size are unchanged.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 2880
+CARD_SIZE = 80
+
+INDEX_NAME = ".your_header_index.json"
+
+
+def parse_value(value):
+    """
+    Parse the value part of a FITS card (everything after "= ").
+
+    Args:
+        value (str): value and comment of the card
+
+    Returns:
+        The value as str, bool, int or float (None if the card has no value)
+
+    """
+    value = value.strip()
+    if value.startswith("'"):
+        # strings are quoted, with '' for a quote inside the string
+        chars = []
+        i = 1
+        while i < len(value):
+            if value[i] == "'":
+                if value[i + 1 : i + 2] == "'":
+                    chars.append("'")
+                    i += 2
+                    continue
+                break
+            chars.append(value[i])
+            i += 1
+        return "".join(chars).rstrip()
+
+    value = value.split("/", 1)[0].strip()
+    if value == "":
+        return None
+    if value == "T":
+        return True
+    if value == "F":
+        return False
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value.replace("D", "E"))
+    except ValueError:
+        return value
+
+
+def _read_header(f):
+    """
+    Read the header at the current position of the file.
+
+    Returns:
+        dict: keywords and values of the header
+    """
+    header = {}
+    previous = None
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if len(block) < BLOCK_SIZE:
+            raise ValueError("Unexpected end of file while reading a header")
+        block = block.decode("ascii", errors="replace")
+        for i in range(0, BLOCK_SIZE, CARD_SIZE):
+            card = block[i : i + CARD_SIZE]
+            keyword = card[:8].strip()
+            if keyword == "END":
+                return header
+            if (
+                keyword == "CONTINUE"
+                and isinstance(header.get(previous), str)
+                and header[previous].endswith("&")
+            ):
+                # long strings go on over CONTINUE cards, with a trailing &
+                header[previous] = header[previous][:-1] + parse_value(card[8:])
+                continue
+            if card[8:10] != "= ":
+                continue
+            header[keyword] = parse_value(card[10:])
+            previous = keyword
+
+
+def _data_size(header):
+    """
+    Size of the data of an HDU in bytes, padded to whole FITS blocks.
+    """
+    naxis = header.get("NAXIS", 0)
+    if naxis == 0:
+        return 0
+    nelements = int(np.prod([header[f"NAXIS{i}"] for i in range(1, naxis + 1)]))
+    nbytes = (
+        abs(header["BITPIX"])
+        // 8
+        * header.get("GCOUNT", 1)
+        * (header.get("PCOUNT", 0) + nelements)
+    )
+    return -(-nbytes // BLOCK_SIZE) * BLOCK_SIZE
+
+
+def scan_headers(filename, extnames=None):
+    """
+    Read the headers of a FITS file, skipping over the data.
+
+    Args:
+        filename (str): Name of the FITS file
+        extnames (list): Stop scanning once the HDUs with these EXTNAMEs are found
+        (default: scan all HDUs)
+
+    Returns:
+        list: one dict per HDU, with its "name", "header" (dict) and "data_offset"
+        (bytes from the start of the file)
+
+    """
+    remaining = None if extnames is None else set(extnames)
+    hdus = []
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            header = _read_header(f)
+            data_offset = f.tell()
+            name = "PRIMARY" if not hdus else str(header.get("EXTNAME", "")).upper()
+            hdus.append({"name": name, "header": header, "data_offset": data_offset})
+            if remaining is not None:
+                remaining.discard(name)
+                if not remaining:
+                    break
+            f.seek(data_offset + _data_size(header))
+    if remaining:
+        raise ValueError(f"HDUs {sorted(remaining)} not found in {filename}")
+    return hdus
+
+
+class HeaderIndex(object):
+    """
+    On-disk index of values read from file headers, kept as a JSON file in the directory
+    of the files.
+
+    An entry is only returned while the file's modification time and size match the ones
+    it was stored with. Directories which can not be written to are skipped silently,
+    the index is just not saved there.
+
+    Args:
+        name (str): Name of the index file in each directory
+
+    """
+
+    def __init__(self, name=INDEX_NAME):
+        self.name = name
+        self._indices = {}
+        self._dirty = set()
+
+    def _index_path(self, filename):
+        return os.path.join(os.path.dirname(os.path.abspath(filename)), self.name)
+
+    def _load(self, path):
+        index = self._indices.get(path)
+        if index is None:
+            try:
+                with open(path, "r") as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+            self._indices[path] = index
+        return index
+
+    @staticmethod
+    def _stamp(filename):
+        stat = os.stat(filename)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def get(self, filename):
+        """
+        Look up the values stored for a file.
+
+        Args:
+            filename (str): Name of the file
+
+        Returns:
+            dict: stored values, or None if there are none or the file has changed since
+
+        """
+        entry = self._load(self._index_path(filename)).get(os.path.basename(filename))
+        if entry is None or entry["stamp"] != self._stamp(filename):
+            return None
+        return entry["values"]
+
+    def put(self, filename, values):
+        """
+        Store values for a file. They are written to disk by `save`.
+
+        Args:
+            filename (str): Name of the file
+            values (dict): JSON serialisable values
+
+        """
+        path = self._index_path(filename)
+        self._load(path)[os.path.basename(filename)] = {
+            "stamp": self._stamp(filename),
+            "values": values,
+        }
+        self._dirty.add(path)
+
+    def save(self):
+        """
+        Write the indices with new entries to disk. Each index file is replaced
+        atomically, so concurrent readers never see a partial index.
+        """
+        for path in self._dirty:
+            # merge with the entries other processes may have written meanwhile
+            index = self._indices[path]
+            self._indices.pop(path)
+            merged = self._load(path)
+            merged.update(index)
+            tmp = None
+            try:
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    json.dump(merged, f)
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.debug(f"Could not write the header index {path}: {e}")
+                if tmp is not None and os.path.exists(tmp):
+                    os.remove(tmp)
+        self._dirty.clear()
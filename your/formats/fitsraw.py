@@ -0,0 +1,178 @@
+"""
+Read the rows of a FITS binary table straight from a memory map.
+
+The table layout (NAXIS1, TFORMn, TDIMn) is parsed once into a NumPy structured dtype,
+so a row, or a range of rows, is a view into the file without going through astropy's
+per-row objects.
+"""
+
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# FITS binary table column types and their (big endian) numpy equivalents
+TFORM_DTYPES = {
+    "L": "i1",
+    "B": "u1",
+    "I": ">i2",
+    "J": ">i4",
+    "K": ">i8",
+    "E": ">f4",
+    "D": ">f8",
+    "C": ">c8",
+    "M": ">c16",
+}
+
+tform_re = re.compile(r"^\s*(?P<repeat>[0-9]*)(?P<code>[A-Z])")
+
+
+def parse_tform(tform):
+    """
+    Parse a TFORMn value of a binary table.
+
+    Args:
+        tform (str): value of the TFORMn keyword (e.g. "336E")
+
+    Returns:
+        tuple: (repeat count, type code)
+
+    """
+    match = tform_re.match(tform)
+    if match is None:
+        raise ValueError(f"Could not parse TFORM: {tform}")
+    repeat = match.group("repeat")
+    return (int(repeat) if repeat else 1), match.group("code")
+
+
+def parse_tdim(tdim):
+    """
+    Parse a TDIMn value into a numpy (C ordered) shape.
+
+    Args:
+        tdim (str): value of the TDIMn keyword (e.g. "(336,1,789)")
+
+    Returns:
+        tuple: shape of the column in each row
+
+    """
+    dims = [int(d) for d in tdim.strip().strip("()").split(",")]
+    return tuple(dims[::-1])
+
+
+def bintable_dtype(header):
+    """
+    Structured dtype of a row of a binary table.
+
+    Args:
+        header: header of the binary table HDU (anything with dict-like access to the
+        keywords)
+
+    Returns:
+        numpy.dtype: dtype with one field per column, at the byte offsets given by the
+        header
+
+    """
+    names = []
+    formats = []
+    offsets = []
+    offset = 0
+    for icol in range(1, int(header["TFIELDS"]) + 1):
+        name = header[f"TTYPE{icol}"].strip()
+        repeat, code = parse_tform(header[f"TFORM{icol}"])
+        if code == "A":
+            fmt, nbytes = f"S{repeat}", repeat
+        elif code == "X":
+            nbytes = (repeat + 7) // 8
+            fmt = ("u1", (nbytes,))
+        elif code in TFORM_DTYPES:
+            base = np.dtype(TFORM_DTYPES[code])
+            nbytes = repeat * base.itemsize
+            shape = (repeat,)
+            tdim = header.get(f"TDIM{icol}")
+            if tdim is not None and int(np.prod(parse_tdim(tdim))) == repeat:
+                shape = parse_tdim(tdim)
+            fmt = (base, shape) if repeat != 1 else base
+        else:
+            # variable length arrays (P/Q) point into the heap
+            raise ValueError(f"Column {name} has unsupported TFORM code {code}")
+        names.append(name)
+        formats.append(fmt)
+        offsets.append(offset)
+        offset += nbytes
+
+    itemsize = int(header["NAXIS1"])
+    if offset != itemsize:
+        raise ValueError(f"Columns take {offset} bytes, but NAXIS1 is {itemsize}")
+    return np.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": itemsize}
+    )
+
+
+class RawTable(object):
+    """
+    Rows of a binary table, memory mapped with a structured dtype.
+
+    Args:
+        filename (str): Name of the FITS file
+        header: header of the binary table HDU
+        data_offset (int): Byte offset of the table data in the file
+
+    Attributes:
+        dtype (numpy.dtype): dtype of a row
+        nrows (int): Number of rows
+        data (numpy.memmap): Read-only rows of the table
+
+    """
+
+    def __init__(self, filename, header, data_offset):
+        self.dtype = bintable_dtype(header)
+        self.nrows = int(header["NAXIS2"])
+        self.data = np.memmap(
+            filename,
+            dtype=self.dtype,
+            mode="r",
+            offset=data_offset,
+            shape=(self.nrows,),
+        )
+
+    def __len__(self):
+        return self.nrows
+
+    def __getitem__(self, key):
+        # a column name gives a view of that column for all the rows
+        return self.data[key]
+
+    @classmethod
+    def from_hdu(cls, filename, hdu, columns=None):
+        """
+        Memory map a binary table HDU opened with astropy, if its columns can be read as
+        they are stored.
+
+        Args:
+            filename (str): Name of the FITS file
+            hdu (astropy.io.fits.BinTableHDU): binary table HDU
+            columns (list): Columns which will be read. They can not be scaled
+            (TSCALn/TZEROn).
+
+        Returns:
+            RawTable: the table, or None if it has to be read with astropy
+
+        """
+        header = hdu.header
+        ttypes = {
+            header[f"TTYPE{icol}"].strip(): icol
+            for icol in range(1, int(header["TFIELDS"]) + 1)
+        }
+        for column in columns or ttypes:
+            icol = ttypes.get(column)
+            if icol is None or f"TSCAL{icol}" in header or f"TZERO{icol}" in header:
+                logger.debug(f"Column {column} can not be read raw, using astropy")
+                return None
+        try:
+            return cls(filename, header, hdu.fileinfo()["datLoc"])
+        except ValueError as e:
+            logger.debug(f"{e}, using astropy")
+            return None
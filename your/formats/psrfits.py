@@ -11,11 +11,17 @@ import logging
 import os
 import os.path
 import re
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-import astropy.io.fits as pyfits
-import astropy.time as aptime
 import numpy as np
-from astropy import coordinates, units
+
+from your.formats.fitsheader import HeaderIndex, scan_headers
+from your.formats.fitsraw import RawTable
+from your.formats.unpack import unpack
+from your.utils.astro import sexagesimal2deg
 
 # import spectra
 logger = logging.getLogger(__name__)
@@ -41,11 +47,7 @@ def unpack_2bit(data):
         np.ndarray: unpacked array. The size of this array will be four times the size of the input data.
 
     """
-    piece0 = np.bitwise_and(data >> 0x06, 0x03)
-    piece1 = np.bitwise_and(data >> 0x04, 0x03)
-    piece2 = np.bitwise_and(data >> 0x02, 0x03)
-    piece3 = np.bitwise_and(data, 0x03)
-    return np.dstack([piece0, piece1, piece2, piece3]).flatten()
+    return unpack(np.ravel(data), 2)
 
 
 def unpack_4bit(data):
@@ -59,9 +61,456 @@ def unpack_4bit(data):
         np.ndarray: unpacked array. The size of this array will be twice the size of the input data.
 
     """
-    piece0 = np.bitwise_and(data >> 0x04, 0x0F)
-    piece1 = np.bitwise_and(data, 0x0F)
-    return np.dstack([piece0, piece1]).flatten()
+    return unpack(np.ravel(data), 4)
+
+
+class SubintCache(object):
+    """
+    Size bounded, least recently used cache of decoded subints. Each PsrfitsFile has its
+    own cache, unless one is passed to it: the module level `SUBINT_CACHE` can be shared
+    by several objects, so that repeated reads from new objects (e.g. one Candidate per
+    candidate) also use it.
+
+    Args:
+        max_mb (float): Maximum size of the cached data (MB)
+
+    Attributes:
+        max_bytes (int): Maximum size of the cached data (bytes)
+        nbytes (int): Current size of the cached data (bytes)
+        hits (int): Number of lookups which found the subint
+        misses (int): Number of lookups which did not find the subint
+
+    """
+
+    def __init__(self, max_mb):
+        self.max_bytes = int(max_mb * 2**20)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._subints = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subints)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._subints
+
+    def get(self, key):
+        """
+        Look up a subint and mark it as the most recently used.
+
+        Args:
+            key (tuple): Key of the subint
+
+        Returns:
+            np.ndarray: read-only decoded subint, or None if it is not cached
+
+        """
+        if self.max_bytes == 0:
+            return None
+        with self._lock:
+            data = self._subints.get(key)
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._subints.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """
+        Store a copy of a subint, evicting the least recently used subints to stay
+        within the size limit.
+
+        Args:
+            key (tuple): Key of the subint
+            data (np.ndarray): Decoded subint
+
+        """
+        if data.nbytes > self.max_bytes:
+            return
+        data = data.copy()
+        data.flags.writeable = False
+        with self._lock:
+            old = self._subints.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            while self._subints and self.nbytes + data.nbytes > self.max_bytes:
+                _, evicted = self._subints.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+            self._subints[key] = data
+            self.nbytes += data.nbytes
+
+    def clear(self):
+        """
+        Remove all the cached subints.
+        """
+        with self._lock:
+            self._subints.clear()
+            self.nbytes = 0
+
+    def resize(self, max_mb):
+        """
+        Change the size limit of the cache, evicting the least recently used subints if
+        needed.
+
+        Args:
+            max_mb (float): Maximum size of the cached data (MB). The cache is disabled
+            if 0.
+
+        """
+        with self._lock:
+            self.max_bytes = int(max_mb * 2**20)
+            while self._subints and self.nbytes > self.max_bytes:
+                _, evicted = self._subints.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+
+# cache which can be shared by the objects of a process, disabled until it is resized
+SUBINT_CACHE = SubintCache(0)
+
+# pools of open files, whose handles are dropped in forked children
+_POOLS = weakref.WeakSet()
+
+
+def _after_fork():
+    """
+    Reset the locks and open files inherited by a forked child process. A lock held by a
+    thread of the parent at the time of the fork would never be released in the child.
+    """
+    SUBINT_CACHE._lock = threading.Lock()
+    for pool in list(_POOLS):
+        pool._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+# columns of the SUBINT table used to read the data
+SUBINT_COLUMNS = ("DATA", "DAT_SCL", "DAT_OFFS", "DAT_WTS")
+
+# Threads reading headers. Opening a file costs a round trip on network file systems,
+# which the threads overlap.
+HEADER_WORKERS = 8
+
+
+# Keywords of the primary and SUBINT headers which SpectraInfo uses
+PRIMARY_KEYWORDS = (
+    "FITSTYPE",
+    "OBS_MODE",
+    "TELESCOP",
+    "OBSERVER",
+    "SRC_NAME",
+    "FRONTEND",
+    "BACKEND",
+    "PROJID",
+    "DATE-OBS",
+    "FD_POLN",
+    "RA",
+    "DEC",
+    "OBSFREQ",
+    "OBSNCHAN",
+    "OBSBW",
+    "BMIN",
+    "CHAN_DM",
+    "TRK_MODE",
+    "STT_IMJD",
+    "STT_SMJD",
+    "STT_OFFS",
+)
+SUBINT_KEYWORDS = (
+    "TBIN",
+    "NCHAN",
+    "NPOL",
+    "POL_TYPE",
+    "NCHNOFFS",
+    "NSBLK",
+    "NBITS",
+    "NAXIS2",
+    "NSUBOFFS",
+)
+
+
+def _python_value(value):
+    # numpy scalars (from astropy headers and table rows) to plain python values
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _summarise_psrfits(hdu_names, primary, subint, columns, data_format, first_row):
+    """
+    Collect the values SpectraInfo needs from the headers and the first row of the
+    SUBINT table.
+
+    Returns:
+        dict: JSON serialisable values
+    """
+    info = {
+        "hdu_names": hdu_names,
+        "is_psrfits": primary.get("FITSTYPE") == "PSRFITS"
+        and primary.get("OBS_MODE") == "SEARCH",
+        "primary": {
+            key: _python_value(primary[key])
+            for key in PRIMARY_KEYWORDS
+            if key in primary
+        },
+        "subint": {
+            key: _python_value(subint[key]) for key in SUBINT_KEYWORDS if key in subint
+        },
+        "columns": list(columns),
+        "data_format": data_format,
+    }
+    if first_row is None:
+        return info
+
+    for column in ("TEL_AZ", "TEL_ZEN"):
+        if column in columns:
+            info[column] = float(first_row[column])
+    if "DAT_FREQ" in columns:
+        freqs = np.atleast_1d(first_row["DAT_FREQ"])
+        # the channel spacing is computed in the precision of the column
+        df = freqs[1] - freqs[0]
+        info["freq_dtype"] = freqs.dtype.newbyteorder("=").str
+        info["df"] = df.item()
+        info["lo_freq"] = freqs[0].item()
+        info["hi_freq"] = freqs[-1].item()
+        info["spacing_changes"] = bool(np.any(freqs[1:] - freqs[:-1] - df))
+    for column, key, default in (
+        ("DAT_WTS", "need_weight", 1.0),
+        ("DAT_OFFS", "need_offset", 0.0),
+        ("DAT_SCL", "need_scale", 1.0),
+    ):
+        if column in columns:
+            info[key] = bool(np.any(first_row[column] != default))
+    return info
+
+
+def _scan_psrfits_info(filename):
+    """
+    Read the file info with the fast header scanner, and the first row from a memory
+    map.
+    """
+    hdus = scan_headers(filename)
+    primary = hdus[0]["header"]
+    subint = next(hdu for hdu in hdus if hdu["name"] == "SUBINT")
+    header = subint["header"]
+    columns = [
+        header[f"TTYPE{icol}"].strip()
+        for icol in range(1, int(header.get("TFIELDS", 0)) + 1)
+    ]
+    data_format = None
+    if "DATA" in columns:
+        data_format = header[f"TFORM{columns.index('DATA') + 1}"].strip()
+
+    first_row = None
+    if header.get("NAXIS2", 0) > 0:
+        if any(key.startswith(("TSCAL", "TZERO")) for key in header):
+            # scaled columns are left to astropy
+            raise ValueError("SUBINT table has scaled columns")
+        table = RawTable(filename, header, subint["data_offset"])
+        first_row = table[0]
+    return _summarise_psrfits(
+        [hdu["name"] for hdu in hdus], primary, header, columns, data_format, first_row
+    )
+
+
+def _astropy_psrfits_info(filename):
+    """
+    Read the file info with astropy.
+    """
+    import astropy.io.fits as pyfits
+
+    with pyfits.open(
+        filename, mode="readonly", memmap=True, ignore_missing_end=True
+    ) as hdus:
+        hdus.verify()
+        primary = hdus["PRIMARY"].header
+        if "SUBINT" not in hdus:
+            return _summarise_psrfits(
+                [hdu.name for hdu in hdus], primary, {}, [], None, None
+            )
+        subint_hdu = hdus["SUBINT"]
+        columns = subint_hdu.columns.names
+        data_format = None
+        if "DATA" in columns:
+            data_format = subint_hdu.columns["DATA"].format
+        first_row = subint_hdu.data[0] if subint_hdu.header["NAXIS2"] > 0 else None
+        return _summarise_psrfits(
+            [hdu.name for hdu in hdus],
+            primary,
+            subint_hdu.header,
+            columns,
+            data_format,
+            first_row,
+        )
+
+
+def read_psrfits_info(filename):
+    """
+    Read the header values of a PSRFITS file which SpectraInfo needs. Only the header
+    blocks and the first row of the SUBINT table are read, astropy is used if the file
+    can not be scanned directly.
+
+    Args:
+        filename (str): Name of the fits file
+
+    Returns:
+        dict: JSON serialisable values, which can be kept in a `HeaderIndex`
+
+    """
+    try:
+        return _scan_psrfits_info(filename)
+    except (ValueError, KeyError, StopIteration, AttributeError) as e:
+        logger.debug(f"Could not scan {filename} ({e}), reading it with astropy")
+        return _astropy_psrfits_info(filename)
+
+
+def read_psrfits_infos(filenames, use_header_index=None, workers=HEADER_WORKERS):
+    """
+    Read the header values of many PSRFITS files (see `read_psrfits_info`), reading the
+    files on a thread pool.
+
+    Args:
+        filenames (list): Names of the fits files
+        use_header_index (bool): Look the values up in (and add them to) the
+        `HeaderIndex` next to the files. Defaults to the YOUR_HEADER_INDEX environment
+        variable ("1" to use the index).
+        workers (int): Number of threads reading the files
+
+    Returns:
+        list: values of each file, in the order of filenames
+
+    """
+    if use_header_index is None:
+        use_header_index = os.getenv("YOUR_HEADER_INDEX", "0") == "1"
+    index = HeaderIndex() if use_header_index else None
+    infos = [None if index is None else index.get(fn) for fn in filenames]
+    missing = [ii for ii, info in enumerate(infos) if info is None]
+    if not missing:
+        return infos
+
+    # the index is only touched from this thread
+    missing_files = [filenames[ii] for ii in missing]
+    if workers > 1 and len(missing) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+            read = list(pool.map(read_psrfits_info, missing_files))
+    else:
+        read = [read_psrfits_info(fn) for fn in missing_files]
+
+    for ii, fn, info in zip(missing, missing_files, read):
+        infos[ii] = info
+        if index is not None:
+            index.put(fn, info)
+    if index is not None:
+        index.save()
+    return infos
+
+
+class FitsFilePool(object):
+    """
+    Bounded pool of open fits files of an observation, indexed by file id. The least
+    recently used file is closed when a new one has to be opened and the pool is full.
+
+    The pool can be used from many threads. After a fork, the child process drops the
+    handles it inherited (their file positions are shared with the parent) and opens the
+    files again when they are next used. When pickled, only the file list is kept.
+
+    Args:
+        filelist (list): List of files
+        max_open_files (int): Maximum number of files to keep open
+
+    """
+
+    def __init__(self, filelist, max_open_files=16):
+        if max_open_files < 1:
+            raise ValueError(f"max_open_files ({max_open_files}) should be at least 1")
+        self.filelist = filelist
+        self.max_open_files = max_open_files
+        self._reset()
+        _POOLS.add(self)
+
+    def _reset(self):
+        """
+        Forget the open files, without closing them.
+        """
+        self._handles = OrderedDict()
+        self._tables = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        return {"filelist": self.filelist, "max_open_files": self.max_open_files}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+        _POOLS.add(self)
+
+    def __len__(self):
+        return len(self._handles)
+
+    def get(self, fileid):
+        """
+        Return the open fits file, opening it (and memory mapping its SUBINT table) if
+        needed.
+
+        Args:
+            fileid (int): Index of the file in the file list
+
+        Returns:
+            astropy.io.fits.HDUList: fits object of the file
+
+        """
+        with self._lock:
+            handle = self._handles.get(fileid)
+            if handle is not None:
+                self._handles.move_to_end(fileid)
+                return handle
+
+            while len(self._handles) >= self.max_open_files:
+                old_fileid, old = self._handles.popitem(last=False)
+                logger.debug(f"Closing file: {self.filelist[old_fileid]}")
+                del self._tables[old_fileid]
+                old.close()
+
+            logger.debug(f"Opening file: {self.filelist[fileid]}")
+            import astropy.io.fits as pyfits
+
+            handle = pyfits.open(self.filelist[fileid], mode="readonly", memmap=True)
+            # map the table now, so that later reads only index into it
+            table = RawTable.from_hdu(
+                self.filelist[fileid], handle["SUBINT"], columns=SUBINT_COLUMNS
+            )
+            self._tables[fileid] = handle["SUBINT"].data if table is None else table
+            self._handles[fileid] = handle
+            return handle
+
+    def get_table(self, fileid):
+        """
+        Return the SUBINT table of a file. Columns are accessed as
+        `table["DATA"][isub]`.
+
+        Args:
+            fileid (int): Index of the file in the file list
+
+        Returns:
+            RawTable: memory mapped table, or the astropy table data if the columns are
+            scaled
+
+        """
+        with self._lock:
+            self.get(fileid)
+            return self._tables[fileid]
+
+    def close(self):
+        """
+        Close all the open files.
+        """
+        with self._lock:
+            self._tables.clear()
+            while self._handles:
+                _, handle = self._handles.popitem(last=False)
+                handle.close()
 
 
 class PsrfitsFile(object):
@@ -73,12 +522,23 @@ class PsrfitsFile(object):
 
     Args:
         psrfitslist (str): list of files
+        subint_cache_mb (float): Size of the cache of decoded subints of this object
+        (MB). The cache is disabled if 0 or None.
+        max_open_files (int): Maximum number of files of the observation to keep open
+        use_header_index (bool): Keep the header values in an index next to the files,
+        see `SpectraInfo`
+        subint_cache (SubintCache): Cache of decoded subints to use instead of a cache
+        of this object, e.g. `SUBINT_CACHE` to share it with other objects. It is not
+        resized.
 
     Attributes:
         filename (str): Name of the first file
         filelist (list): List of files
         fileid (int): Index of the current file
         fits (obj): fits object of the current file read
+        fits_pool (FitsFilePool): Pool of open fits objects of all the files
+        subint_table: SUBINT table of the current file, memory mapped with a structured
+        dtype if possible
         specinfo (obj): Object of class SpectraInfo for the given file list
         header (list): Header of the fits file
         source_name (str): Source Name
@@ -98,19 +558,36 @@ class PsrfitsFile(object):
         tstart (float): Start MJD of the data
         tsamp (float): Sampling interval (seconds)
         nifs (int): Number of IFs in the data.
+        subint_cache (SubintCache): Cache of decoded subints used by get_data
 
     """
 
-    def __init__(self, psrfitslist):
+    def __init__(
+        self,
+        psrfitslist,
+        subint_cache_mb=None,
+        max_open_files=16,
+        use_header_index=None,
+        subint_cache=None,
+    ):
         psrfitsfn = psrfitslist[0]
         if not os.path.isfile(psrfitsfn):
             raise ValueError("ERROR: File does not exist!\n\t(%s)" % psrfitsfn)
         self.filename = psrfitsfn
         self.filelist = psrfitslist
         self.fileid = 0
+        if subint_cache is None:
+            subint_cache = SubintCache(subint_cache_mb or 0)
+        elif subint_cache_mb is not None:
+            raise ValueError(
+                "Only one of subint_cache and subint_cache_mb can be given"
+            )
+        self.subint_cache = subint_cache
+        self._file_cache_keys = {}
+        self._trivial_scaling = {}
 
-        self.fits = pyfits.open(psrfitsfn, mode="readonly", memmap=True)
-        self.specinfo = SpectraInfo(psrfitslist)
+        self.fits_pool = FitsFilePool(psrfitslist, max_open_files)
+        self.specinfo = SpectraInfo(psrfitslist, use_header_index=use_header_index)
         self.header = self.fits[0].header  # Primary HDU
         self.nbits = self.specinfo.bits_per_sample
         self.nchan = self.specinfo.num_channels
@@ -135,14 +612,44 @@ class PsrfitsFile(object):
         self.nchans = self.nchan
         self.tstart = self.specinfo.start_MJD[0]
         self.source_name = self.specinfo.source
-        loc = coordinates.SkyCoord(
-            self.header["RA"], self.header["DEC"], unit=(units.hourangle, units.deg)
-        )
-        self.ra_deg = loc.ra.value
-        self.dec_deg = loc.dec.value
+        self.ra_deg = angle_to_deg(self.header["RA"], hours=True)
+        self.dec_deg = angle_to_deg(self.header["DEC"])
         self.telescope = self.header["TELESCOP"].strip()
         self.backend = self.header["BACKEND"].strip()
 
+    @property
+    def fits(self):
+        """
+        astropy.io.fits.HDUList: fits object of the current file, taken from the pool of
+        open files
+        """
+        return self.fits_pool.get(self.fileid)
+
+    @property
+    def subint_table(self):
+        """
+        SUBINT table of the current file, see `FitsFilePool.get_table`
+        """
+        return self.fits_pool.get_table(self.fileid)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # caches are not pickled: the unpickled object uses the shared cache of its
+        # process if this one did, and an empty cache of the same size otherwise
+        cache = state.pop("subint_cache")
+        state["subint_cache_mb"] = (
+            None if cache is SUBINT_CACHE else cache.max_bytes / 2**20
+        )
+        return state
+
+    def __setstate__(self, state):
+        subint_cache_mb = state.pop("subint_cache_mb")
+        self.__dict__.update(state)
+        if subint_cache_mb is None:
+            self.subint_cache = SUBINT_CACHE
+        else:
+            self.subint_cache = SubintCache(subint_cache_mb)
+
     def nspectra(self):
         """
 
@@ -200,6 +707,10 @@ class PsrfitsFile(object):
         apply_offsets=True,
         pol=0,
         npoln=1,
+        out=None,
+        c_min=None,
+        c_max=None,
+        fileid=None,
     ):
         """
         Read a PSRFITS subint from a open pyfits file object.
@@ -212,12 +723,24 @@ class PsrfitsFile(object):
             apply_offsets (bool): If True, apply offsets. (Default: apply offsets)
             pol (int): which polarization to chose
             npoln (int): number of polarizations to return
+            out (np.ndarray): Optional float32 array of shape (nsamps, npoln, nchan) to
+            write the data into
+            c_min (int): First channel to read (default: 0)
+            c_max (int): Channel to stop reading at, exclusive (default: nchan)
+            fileid (int): Index of the file to read from (default: the current file)
+
+        Note:
+            Only the selected channels are converted and have scales, weights and
+            offsets applied.
 
         Returns:
             np.ndarray: Subint data with scales, weights, and offsets applied in float32 dtype with shape (nsamps,nchan).
 
         """
-        sdata = self.fits["SUBINT"].data[isub]["DATA"]
+        chans = slice(c_min, c_max)
+        nchan = len(range(self.nchan)[chans])
+        table = self._get_table(fileid)
+        sdata = table["DATA"][isub]
         shp = sdata.squeeze().shape
 
         assert npoln <= self.npoln, (
@@ -231,79 +754,261 @@ class PsrfitsFile(object):
             )
 
         if self.nbits < 8:  # Unpack the bytes data
-            if len(shp) == 2:
-                if (shp[0] != self.nsamp_per_subint) and (
-                    shp[1] != self.nchan * self.nbits / 8
-                ):
-                    sdata = sdata.reshape(
-                        self.nsamp_per_subint, int(self.nchan * self.nbits / 8)
+            sdata = np.asarray(sdata).reshape(self.nsamp_per_subint, -1)
+            if (
+                nchan == self.nchan
+                and npoln == self.npoln
+                and (out is None or out.flags.c_contiguous)
+            ):
+                # nothing to select, so unpack straight into the float32 output
+                if out is None:
+                    out = np.empty(
+                        (self.nsamp_per_subint, npoln, nchan), dtype=np.float32
                     )
-            if self.nbits == 4:
-                data = unpack_4bit(sdata)
-            elif self.nbits == 2:
-                data = unpack_2bit(sdata)
+                unpack(sdata, self.nbits, out=out.reshape(self.nsamp_per_subint, -1))
+                data = None
             else:
-                data = np.asarray(sdata)
+                data = unpack(sdata, self.nbits)
+                data = data.reshape((self.nsamp_per_subint, -1, self.nchan))[
+                    :, :, chans
+                ]
         elif npoln == 4:
             data = sdata.squeeze()
-            data = data.reshape((self.nsamp_per_subint, self.npoln, self.nchan)).astype(
-                np.float32
-            )
+            data = data.reshape((self.nsamp_per_subint, self.npoln, self.nchan))
+            data = data[:, :, chans]
         else:
+            if sdata.ndim < 3:
+                sdata = sdata.reshape((self.nsamp_per_subint, self.npoln, self.nchan))
+            sdata = sdata[:, :, chans]
             # Handle 4-poln GUPPI/PUPPI data
             if len(shp) == 3 and shp[1] == self.npoln and self.poln_order == "AABBCRCI":
                 logger.warning("Polarization is AABBCRCI, summing AA and BB")
-                data = np.zeros((self.nsamp_per_subint, self.nchan), dtype=np.float32)
-                data += sdata[:, 0, :].squeeze()
-                data += sdata[:, 1, :].squeeze()
+                data = np.zeros((self.nsamp_per_subint, nchan), dtype=np.float32)
+                data += sdata[:, 0, :]
+                data += sdata[:, 1, :]
                 data *= 0.5
             elif len(shp) == 3 and shp[1] == self.npoln and self.poln_order == "IQUV":
                 logger.warning("Polarization is IQUV")
-                data = np.zeros((self.nsamp_per_subint, self.nchan), dtype=np.float32)
+                data = np.zeros((self.nsamp_per_subint, nchan), dtype=np.float32)
                 if pol == 0:
                     logger.info("Just using Stokes I.")
-                    data += sdata[:, 0, :].squeeze()
+                    data += sdata[:, 0, :]
                 elif pol == 1:
                     logger.info("Calculating right circular polarisation data.")
-                    data = data + ((sdata[:, 0, :] + sdata[:, 3, :]) / 2).squeeze()
+                    data = data + ((sdata[:, 0, :] + sdata[:, 3, :]) / 2)
                 elif pol == 2:
                     logger.info("Calculating left circular polarisation data.")
-                    data = data + ((sdata[:, 0, :] - sdata[:, 3, :]) / 2).squeeze()
+                    data = data + ((sdata[:, 0, :] - sdata[:, 3, :]) / 2)
                 elif pol == 3:
                     logger.info("Calculating horizontal linear polarisation data.")
-                    data = data + ((sdata[:, 0, :] + sdata[:, 1, :]) / 2).squeeze()
+                    data = data + ((sdata[:, 0, :] + sdata[:, 1, :]) / 2)
                 elif pol == 4:
                     logger.info("Calculating vertical linear polarisation data.")
-                    data = data + ((sdata[:, 0, :] - sdata[:, 1, :]) / 2).squeeze()
+                    data = data + ((sdata[:, 0, :] - sdata[:, 1, :]) / 2)
                 else:
                     raise ValueError(f"pol={pol} value not supported.")
             elif len(shp) == 3 and shp[1] == self.npoln and self.poln_order == "AABB":
                 logger.warning("Polarization is AABB, summing AA and BB")
-                data = np.zeros((self.nsamp_per_subint, self.nchan), dtype=np.float32)
-                data += sdata[:, 0, :].squeeze()
-                data += sdata[:, 1, :].squeeze()
+                data = np.zeros((self.nsamp_per_subint, nchan), dtype=np.float32)
+                data += sdata[:, 0, :]
+                data += sdata[:, 1, :]
                 data *= 0.5
             elif len(shp) == 4 and shp[-1] == 2 and self.poln_order == "IQUV":
                 logger.warning(
                     "Data is packed as two uint8 arrays. Concatenating them to get uint16."
                 )
                 logger.warning("Polarization is IQUV. Just using Stokes I.")
-                data = np.zeros((self.nsamp_per_subint, self.nchan), dtype=np.float32)
+                data = np.zeros((self.nsamp_per_subint, nchan), dtype=np.float32)
                 data1 = sdata[:, 0, :, 0].astype(np.uint16)
                 data2 = sdata[:, 0, :, 1].astype(np.uint16)
                 data += np.left_shift(data2, 8) + data1
             else:
                 data = np.asarray(sdata)
-        data = data.reshape((self.nsamp_per_subint, npoln, self.nchan)).astype(
-            np.float32
-        )
+        if out is None:
+            out = np.empty((self.nsamp_per_subint, npoln, nchan), dtype=np.float32)
+        if data is not None:
+            out[...] = data.reshape((self.nsamp_per_subint, npoln, nchan))
+        if self.has_trivial_scaling(fileid):
+            return out
         if apply_scales:
-            data *= self.get_scales(isub)[: self.nchan]
+            out *= table["DAT_SCL"][isub][: self.nchan][chans]
         if apply_offsets:
-            data += self.get_offsets(isub)[: self.nchan]
+            out += table["DAT_OFFS"][isub][: self.nchan][chans]
         if apply_weights:
-            data *= self.get_weights(isub)[: self.nchan]
-        return data
+            out *= table["DAT_WTS"][isub][: self.nchan][chans]
+        return out
+
+    def open_file(self, fileid):
+        """
+        Make a file of the observation the current one. Its fits object is taken from
+        the pool of open files.
+
+        Args:
+            fileid (int): Index of the file in the file list
+
+        """
+        self.fileid = fileid
+        self.filename = self.filelist[fileid]
+        logger.debug(f"File id is {self.fileid}, Reading file: {self.filename}")
+        self.fits_pool.get(fileid)
+
+    def _file_cache_key(self, fileid=None):
+        """
+        Identify a file in the subint cache. The modification time and size are part of
+        the key, so that a file which is rewritten is not served from stale cache
+        entries.
+
+        Args:
+            fileid (int): Index of the file (default: the current file)
+
+        Returns:
+            tuple: absolute path, modification time (ns) and size of the file
+
+        """
+        filename = self.filename if fileid is None else self.filelist[fileid]
+        key = self._file_cache_keys.get(filename)
+        if key is None:
+            stat = os.stat(filename)
+            key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+            self._file_cache_keys[filename] = key
+        return key
+
+    def can_read_subints(self, npoln=1):
+        """
+        Check if subints can be decoded in blocks by `read_subints`. This needs all the
+        polarisations to be read (npoln equal to the number of polarisations in the
+        file) and the data to be stored as (nsamps, npoln, nchan).
+
+        Args:
+            npoln (int): number of polarizations to return
+
+        Returns:
+            bool: True if read_subints can be used
+
+        """
+        if npoln != self.npoln:
+            return False
+        samples_per_value = 8 // self.nbits if self.nbits < 8 else 1
+        row_size = self.subint_table["DATA"][0].size * samples_per_value
+        return row_size == self.nsamp_per_subint * self.npoln * self.nchan
+
+    def read_subints(
+        self,
+        start,
+        stop,
+        apply_weights=True,
+        apply_scales=True,
+        apply_offsets=True,
+        npoln=1,
+        out=None,
+        c_min=None,
+        c_max=None,
+        fileid=None,
+    ):
+        """
+        Read a contiguous range of subints of a file in one go.
+        Scales, weights and offsets are applied with a single broadcast over all the
+        subints, and not at all if they would not change the data (scales and weights
+        all 1, offsets all 0).
+
+        Args:
+            start (int): index of the first subint (first subint of the file is 0)
+            stop (int): index of the subint to stop at, exclusive
+            apply_weights (bool): If True, apply weights. (Default: apply weights)
+            apply_scales (bool): If True, apply scales. (Default: apply scales)
+            apply_offsets (bool): If True, apply offsets. (Default: apply offsets)
+            npoln (int): number of polarizations to return, see `can_read_subints`
+            out (np.ndarray): Optional float32 array of shape (nsub, nsamps, npoln,
+            nchan) to write the data into
+            c_min (int): First channel to read (default: 0)
+            c_max (int): Channel to stop reading at, exclusive (default: nchan)
+            fileid (int): Index of the file to read from (default: the current file)
+
+        Returns:
+            np.ndarray: Subints with scales, weights, and offsets applied in float32
+            dtype with shape (nsub, nsamps, npoln, nchan).
+
+        """
+        if not self.can_read_subints(npoln):
+            raise ValueError(
+                f"Subints can not be read in blocks with npoln={npoln}, use read_subint"
+            )
+        chans = slice(c_min, c_max)
+        nchan = len(range(self.nchan)[chans])
+        nsub = stop - start
+        shape = (nsub, self.nsamp_per_subint, self.npoln, self.nchan)
+        if out is None:
+            out = np.empty(shape[:-1] + (nchan,), dtype=np.float32)
+
+        table = self._get_table(fileid)
+        sdata = np.asarray(table["DATA"][start:stop])
+        if self.nbits < 8:
+            sdata = sdata.reshape(nsub * self.nsamp_per_subint, -1)
+            if nchan == self.nchan and out.flags.c_contiguous:
+                unpack(sdata, self.nbits, out=out.reshape(sdata.shape[0], -1))
+            else:
+                out[...] = unpack(sdata, self.nbits).reshape(shape)[..., chans]
+        else:
+            out[...] = sdata.reshape(shape)[..., chans]
+
+        if not (apply_scales or apply_offsets or apply_weights):
+            return out
+        if self.has_trivial_scaling(fileid):
+            logger.debug("Scales, offsets and weights do not change the data")
+            return out
+
+        # (d * scale + offset) * weight, as one multiply and one add
+        def column(name):
+            values = table[name][start:stop, : self.nchan][:, chans]
+            return values.astype(np.float32)[:, None, None, :]
+
+        weights = column("DAT_WTS") if apply_weights else None
+        if apply_scales:
+            factor = column("DAT_SCL")
+            if weights is not None:
+                factor *= weights
+        else:
+            factor = weights
+        if factor is not None:
+            out *= factor
+        if apply_offsets:
+            offsets = column("DAT_OFFS")
+            if weights is not None:
+                offsets *= weights
+            out += offsets
+        return out
+
+    def has_trivial_scaling(self, fileid=None):
+        """
+        Check if the scales and weights of a file are all 1, and its offsets all 0.
+        The check is done once per file.
+
+        Args:
+            fileid (int): Index of the file (default: the current file)
+
+        Returns:
+            bool: True if applying scales, offsets and weights does not change the data
+
+        """
+        if fileid is None:
+            fileid = self.fileid
+        trivial = self._trivial_scaling.get(fileid)
+        if trivial is None:
+            table = self._get_table(fileid)
+            trivial = bool(
+                (table["DAT_SCL"] == 1).all()
+                and (table["DAT_OFFS"] == 0).all()
+                and (table["DAT_WTS"] == 1).all()
+            )
+            self._trivial_scaling[fileid] = trivial
+        return trivial
+
+    def _get_table(self, fileid=None):
+        """
+        SUBINT table of a file (default: the current one), taken from the pool of open
+        files.
+        """
+        return self.fits_pool.get_table(self.fileid if fileid is None else fileid)
 
     def get_weights(self, isub):
         """
@@ -316,7 +1021,7 @@ class PsrfitsFile(object):
             np.ndarray: Subint weights. (There is one value for each channel)
 
         """
-        return self.fits["SUBINT"].data[isub]["DAT_WTS"]
+        return self.subint_table["DAT_WTS"][isub]
 
     def get_scales(self, isub):
         """
@@ -329,7 +1034,7 @@ class PsrfitsFile(object):
             np.ndarray: Subint scales. (There is one value for each channel)
 
         """
-        return self.fits["SUBINT"].data[isub]["DAT_SCL"]
+        return self.subint_table["DAT_SCL"][isub]
 
     def get_offsets(self, isub):
         """
@@ -342,9 +1047,19 @@ class PsrfitsFile(object):
             np.ndarray: Subint offsets. (There is one value for each channel)
 
         """
-        return self.fits["SUBINT"].data[isub]["DAT_OFFS"]
+        return self.subint_table["DAT_OFFS"][isub]
 
-    def get_data(self, nstart, nsamp, pol=0, npoln=1):
+    def get_data(
+        self,
+        nstart,
+        nsamp,
+        pol=0,
+        npoln=1,
+        out=None,
+        c_min=None,
+        c_max=None,
+        workers=1,
+    ):
         """
         Return 2D array of data from PSRFITS files.
 
@@ -353,6 +1068,17 @@ class PsrfitsFile(object):
             nsamp (int): number of samples to read
             pol (int): which polarization to return
             npoln (int): number of polarizations to return
+            out (np.ndarray): Optional array of shape (nsamp, npoln, nchan) to write the
+            data into. If it has an integer dtype, the data are rounded before being
+            written.
+            c_min (int): First channel to read (default: 0)
+            c_max (int): Channel to stop reading at, exclusive (default: nchan)
+            workers (int): Number of threads decoding subints concurrently, each into
+            its own part of the output
+
+        Note:
+            Reads do not change the state of the object (the current file stays the
+            same), so one object can be read from many threads at once.
 
         Returns:
             np.ndarray: Time-Frequency numpy array
@@ -376,76 +1102,185 @@ class PsrfitsFile(object):
         logger.debug(f"Number of spectra to skip from start: {skip}")
         logger.debug(f"Number of spectra to truncate from end: {trunc}")
 
+        if trunc < 0:
+            raise ValueError("Number of bins to truncate is negative: %d" % trunc)
+
+        nread = (endsub - startsub + 1) * self.nsamp_per_subint - skip - trunc
+        nchan = len(range(self.nchan)[c_min:c_max])
+        if out is None:
+            out = np.empty((nread, npoln, nchan), dtype=np.float32)
+        elif out.shape[0] < nread or out.shape[1:] != (npoln, nchan):
+            raise ValueError(
+                f"out has shape {out.shape}, expected ({nread}, {npoln}, {nchan})"
+            )
+        if workers < 1:
+            raise ValueError(f"workers ({workers}) should be at least 1")
+
         cumsum_num_subint = np.cumsum(self.specinfo.num_subint)
+        first_subint = np.concatenate([np.array([0]), cumsum_num_subint])
         startfileid = np.where(startsub < cumsum_num_subint)[0][0]
         assert startfileid < len(self.filelist)
 
-        if startfileid != self.fileid:
-            self.fileid = startfileid
-            logger.debug(f"Updating fileid to {self.fileid}")
+        read_blocks = self.can_read_subints(npoln)
+        use_cache = self.subint_cache.max_bytes > 0
 
-            self.fits.close()
-            del self.fits["SUBINT"]
-            logger.debug("Deleted mmap'ed object")
-            self.filename = self.filelist[self.fileid]
-            logger.debug(f"File id is {self.fileid}, Reading file: {self.filename}")
-            self.fits = pyfits.open(self.filename, mode="readonly", memmap=True)
-
-        # Read data
-        data = []
+        # Plan the reads as (fileid, subint in the file, number of subints, lo, hi,
+        # position in out)
         logger.debug(f"Startsub {startsub}, endsub {endsub}")
-        for isub in range(startsub, endsub + 1):
-            logger.debug(f"isub is {isub}")
-            logger.debug(f"file id is {self.fileid}")
-
-            if isub > cumsum_num_subint[self.fileid] - 1:
+        reads = []
+        nfilled = 0
+        fileid = startfileid
+        isub = startsub
+        while isub <= endsub:
+            if isub > cumsum_num_subint[fileid] - 1:
                 logger.debug("isub lies in a later file")
-                self.fits.close()
-                del self.fits["SUBINT"]
-                logger.debug("Delted mmap'ed object")
-                self.fileid += 1
-                if self.fileid == len(self.filelist):
+                if fileid + 1 == len(self.filelist):
                     logger.warning(
                         "Not enough subints, returning data till last subint"
                     )
-                    logger.debug("Setting file ID to that of last file")
-                    self.fileid -= 1
                     break
-                logger.debug(f"Updating file ID to: {self.fileid}")
-                self.filename = self.filelist[self.fileid]
-                logger.debug(f"Reading file: {self.filename}")
-                self.fits = pyfits.open(self.filename, mode="readonly", memmap=True)
-
-            logger.debug(f"Using: {self.fits}")
-            fsub = int(
-                (isub - np.concatenate([np.array([0]), cumsum_num_subint]))[self.fileid]
+                fileid += 1
+            fsub = int(isub - first_subint[fileid])
+            # Truncate data to desired interval
+            lo = skip if isub == startsub else 0
+            hi = (
+                self.nsamp_per_subint - trunc
+                if isub == endsub
+                else self.nsamp_per_subint
             )
-            logger.debug(f"Reading subint {fsub} in file {self.filename}")
-            try:
-                data.append(self.read_subint(fsub, pol=pol, npoln=npoln))
-            except KeyError:
-                logger.warning("Encountered KeyError, maybe mmap'd object was delected")
-                logger.debug(f"Trying to open file {self.filename}")
-                self.fits = pyfits.open(self.filename, mode="readonly", memmap=True)
-                logger.debug(f"Reading subint {fsub} in file {self.filename}")
-                data.append(self.read_subint(fsub, pol=pol, npoln=npoln))
 
-        logging.debug("Read all the necessary subints")
-        if len(data) > 1:
-            data = np.concatenate(data)
-        else:
-            data = np.array(data)[0, :, :, :]
+            # number of whole subints from isub onwards in the current file
+            nblock = int(min(endsub, cumsum_num_subint[fileid] - 1) - isub + 1)
+            if trunc > 0 and isub + nblock - 1 == endsub:
+                nblock -= 1
+            if read_blocks and lo == 0 and nblock > 1:
+                # cached subints are read from the cache, the runs of the others are
+                # decoded in blocks
+                if use_cache:
+                    file_key = self._file_cache_key(fileid)
+                    cached = [
+                        (file_key, fsub + i, pol, npoln, c_min, c_max)
+                        in self.subint_cache
+                        for i in range(nblock)
+                    ]
+                else:
+                    cached = [False] * nblock
+                first = 0
+                while first < nblock:
+                    nrun = 1
+                    while (
+                        first + nrun < nblock
+                        and not cached[first]
+                        and not cached[first + nrun]
+                    ):
+                        nrun += 1
+                    # split the run, so that every worker gets a share
+                    step = -(-nrun // workers)
+                    for start in range(first, first + nrun, step):
+                        n = min(step, first + nrun - start)
+                        reads.append(
+                            (fileid, fsub + start, n, 0, self.nsamp_per_subint, nfilled)
+                        )
+                        nfilled += n * self.nsamp_per_subint
+                    first += nrun
+                isub += nblock
+            else:
+                reads.append((fileid, fsub, 1, lo, hi, nfilled))
+                nfilled += hi - lo
+                isub += 1
+
+        # subints which are only partly needed, or which need rounding are decoded here
+        # first
+        buffers = threading.local()
+
+        def decode(read):
+            fileid, fsub, nsub, lo, hi, start = read
+            if nsub > 1:
+                logger.debug(f"Reading subints {fsub} to {fsub + nsub - 1}")
+                target = out[start : start + nsub * self.nsamp_per_subint]
+                block_shape = (nsub, self.nsamp_per_subint, npoln, nchan)
+                if target.dtype == np.float32 and target.flags.c_contiguous:
+                    block = target.reshape(block_shape)
+                    self.read_subints(
+                        fsub,
+                        fsub + nsub,
+                        npoln=npoln,
+                        out=block,
+                        c_min=c_min,
+                        c_max=c_max,
+                        fileid=fileid,
+                    )
+                else:
+                    block = self.read_subints(
+                        fsub,
+                        fsub + nsub,
+                        npoln=npoln,
+                        c_min=c_min,
+                        c_max=c_max,
+                        fileid=fileid,
+                    ).reshape(block_shape)
+                    if np.issubdtype(target.dtype, np.floating):
+                        target[...] = block.reshape(target.shape)
+                    else:
+                        np.rint(
+                            block.reshape(target.shape), out=target, casting="unsafe"
+                        )
+                if use_cache:
+                    file_key = self._file_cache_key(fileid)
+                    for i, subint in enumerate(block):
+                        key = (file_key, fsub + i, pol, npoln, c_min, c_max)
+                        self.subint_cache.put(key, subint)
+                return
+
+            target = out[start : start + hi - lo]
+            if hi - lo == self.nsamp_per_subint and target.dtype == np.float32:
+                subint_out = target
+            else:
+                subint_out = getattr(buffers, "subint", None)
+                if subint_out is None:
+                    subint_out = np.empty(
+                        (self.nsamp_per_subint, npoln, nchan), dtype=np.float32
+                    )
+                    buffers.subint = subint_out
 
-        # data shape is (nt, 1, nf) or (nt, nifs, nf)
+            key = (self._file_cache_key(fileid), fsub, pol, npoln, c_min, c_max)
+            cached = self.subint_cache.get(key)
+            if cached is not None:
+                logger.debug(f"Using cached subint {fsub} of file {fileid}")
+                subint_out = cached
+            else:
+                logger.debug(f"Reading subint {fsub} in file {fileid}")
+                self.read_subint(
+                    fsub,
+                    pol=pol,
+                    npoln=npoln,
+                    out=subint_out,
+                    c_min=c_min,
+                    c_max=c_max,
+                    fileid=fileid,
+                )
+                if use_cache:
+                    self.subint_cache.put(key, subint_out)
+
+            if subint_out is not target:
+                if np.issubdtype(target.dtype, np.floating):
+                    target[...] = subint_out[lo:hi]
+                else:
+                    np.rint(subint_out[lo:hi], out=target, casting="unsafe")
 
-        # data = np.transpose(data)
-        # Truncate data to desired interval
-        if trunc > 0:
-            data = data[skip:-trunc, :, :]
-        elif trunc == 0:
-            data = data[skip:, :, :]
+        if workers > 1 and len(reads) > 1:
+            logger.debug(f"Decoding {len(reads)} reads with {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # list() re-raises the exceptions of the workers
+                list(executor.map(decode, reads))
         else:
-            raise ValueError("Number of bins to truncate is negative: %d" % trunc)
+            for read in reads:
+                decode(read)
+
+        logging.debug("Read all the necessary subints")
+
+        # data shape is (nt, 1, nf) or (nt, nifs, nf)
+        data = out[:nfilled]
         #         if not self.specinfo.need_flipband:
         #             # for psrfits module freqs go from low to high.
         #             # spectra module expects high frequency first.
@@ -463,9 +1298,14 @@ class SpectraInfo:
 
     Args:
         filenames (list): list of fits files
+        use_header_index (bool): Keep the header values of the files in an index next to
+        them (see `HeaderIndex`), so that they are not read again while the files are
+        unchanged. Defaults to the YOUR_HEADER_INDEX environment variable ("1" to use
+        the index).
+        workers (int): Number of threads reading the headers of the files
     """
 
-    def __init__(self, filenames):
+    def __init__(self, filenames, use_header_index=None, workers=HEADER_WORKERS):
         self.filenames = filenames
         self.num_files = len(filenames)
         self.N = 0
@@ -486,265 +1326,261 @@ class SpectraInfo:
         self.need_weight = False
         self.need_flipband = False
 
-        for ii, fn in enumerate(filenames):
-            if not is_PSRFITS(fn):
+        infos = read_psrfits_infos(
+            filenames, use_header_index=use_header_index, workers=workers
+        )
+        for ii, (fn, info) in enumerate(zip(filenames, infos)):
+            if not info["is_psrfits"]:
                 raise ValueError("File '%s' does not appear to be PSRFITS!" % fn)
 
-            # Open the PSRFITS file
-            with pyfits.open(
-                fn, mode="readonly", memmap=True, ignore_missing_end=True
-            ) as hdus:
-                hdus.verify()
-
-                if ii == 0:
-                    self.hdu_names = [hdu.name for hdu in hdus]
-
-                primary = hdus["PRIMARY"].header
-
-                if "TELESCOP" not in primary.keys():
-                    telescope = ""
-                else:
-                    telescope = primary["TELESCOP"]
-                    # Quick fix for MockSpec data...
-                    if telescope == "ARECIBO 305m":
-                        telescope = "Arecibo"
-                if ii == 0:
-                    self.telescope = telescope
-                else:
-                    if telescope != self.telescope:
-                        logger.warning(
-                            f"'TELESCOP' values don't match for files 0 ({self.telescope}) and {ii}({telescope})!"
-                        )
+            if ii == 0:
+                self.hdu_names = info["hdu_names"]
 
-                self.observer = primary["OBSERVER"]
-                self.source = primary["SRC_NAME"]
-                self.frontend = primary["FRONTEND"]
-                self.backend = primary["BACKEND"]
-                self.project_id = primary["PROJID"]
-                self.date_obs = primary["DATE-OBS"]
-                self.poln_type = primary["FD_POLN"]
-                self.ra_str = primary["RA"]
-                self.dec_str = primary["DEC"]
-                self.fctr = primary["OBSFREQ"]
-                self.orig_num_chan = primary["OBSNCHAN"]
-                self.orig_df = primary["OBSBW"]
-                self.beam_FWHM = primary["BMIN"]
-
-                # CHAN_DM card is not in earlier versions of PSRFITS
-                if "CHAN_DM" not in primary.keys():
-                    self.chan_dm = 0.0
-                else:
-                    self.chan_dm = primary["CHAN_DM"]
+            primary = info["primary"]
 
-                # Are we tracking
-                track = primary["TRK_MODE"] == "TRACK"
-                if ii == 0:
-                    self.tracking = track
-                else:
-                    if track != self.tracking:
-                        logger.warning(
-                            "'TRK_MODE' values don't match for files 0 and %d" % ii
-                        )
+            if "TELESCOP" not in primary:
+                telescope = ""
+            else:
+                telescope = primary["TELESCOP"]
+                # Quick fix for MockSpec data...
+                if telescope == "ARECIBO 305m":
+                    telescope = "Arecibo"
+            if ii == 0:
+                self.telescope = telescope
+            else:
+                if telescope != self.telescope:
+                    logger.warning(
+                        f"'TELESCOP' values don't match for files 0 ({self.telescope}) "
+                        f"and {ii}({telescope})!"
+                    )
 
-                # Now switch to the subint HDU header
-                subint = hdus["SUBINT"].header
+            self.observer = primary["OBSERVER"]
+            self.source = primary["SRC_NAME"]
+            self.frontend = primary["FRONTEND"]
+            self.backend = primary["BACKEND"]
+            self.project_id = primary["PROJID"]
+            self.date_obs = primary["DATE-OBS"]
+            self.poln_type = primary["FD_POLN"]
+            self.ra_str = primary["RA"]
+            self.dec_str = primary["DEC"]
+            self.fctr = primary["OBSFREQ"]
+            self.orig_num_chan = primary["OBSNCHAN"]
+            self.orig_df = primary["OBSBW"]
+            self.beam_FWHM = primary["BMIN"]
+
+            # CHAN_DM card is not in earlier versions of PSRFITS
+            if "CHAN_DM" not in primary:
+                self.chan_dm = 0.0
+            else:
+                self.chan_dm = primary["CHAN_DM"]
 
-                self.dt = subint["TBIN"]
-                self.num_channels = subint["NCHAN"]
-                self.num_polns = subint["NPOL"]
+            # Are we tracking
+            track = primary["TRK_MODE"] == "TRACK"
+            if ii == 0:
+                self.tracking = track
+            else:
+                if track != self.tracking:
+                    logger.warning(
+                        "'TRK_MODE' values don't match for files 0 and %d" % ii
+                    )
 
-                # PRESTO's 'psrfits.c' has some settings based on environ variables
-                envval = os.getenv("PSRFITS_POLN")
-                if envval is not None:
-                    ival = int(envval)
-                    if (ival > -1) and (ival < self.num_polns):
-                        logger.info(
-                            f"Using polarisation {ival} (from 0-{self.num_polns - 1}) from PSRFITS_POLN."
-                        )
-                        self.default_poln = ival
-                        self.user_poln = 1
-
-                self.poln_order = subint["POL_TYPE"]
-                if subint["NCHNOFFS"] > 0:
-                    logger.warning("first freq channel is not 0 in file %d" % ii)
-                self.spectra_per_subint = subint["NSBLK"]
-                self.bits_per_sample = subint["NBITS"]
-                nsubints = subint["NAXIS2"]
-                if nsubints == 0:
-                    logger.warning(f"Number of subints in {fn} is zero.")
-                    if ii == len(filenames) - 1:
-                        logger.warning(
-                            f"File {fn} is the last file and has zero subints. Ignoring this file."
-                        )
-                        if ii == 0:
-                            raise ValueError(
-                                f"File {fn} is the only file and has zero subints. Stopping"
-                            )
-                        else:
-                            continue
-                    else:
+            # Now switch to the subint HDU header
+            subint = info["subint"]
+
+            self.dt = subint["TBIN"]
+            self.num_channels = subint["NCHAN"]
+            self.num_polns = subint["NPOL"]
+
+            # PRESTO's 'psrfits.c' has some settings based on environ variables
+            envval = os.getenv("PSRFITS_POLN")
+            if envval is not None:
+                ival = int(envval)
+                if (ival > -1) and (ival < self.num_polns):
+                    logger.info(
+                        f"Using polarisation {ival} (from 0-{self.num_polns - 1}) "
+                        "from PSRFITS_POLN."
+                    )
+                    self.default_poln = ival
+                    self.user_poln = 1
+
+            self.poln_order = subint["POL_TYPE"]
+            if subint["NCHNOFFS"] > 0:
+                logger.warning("first freq channel is not 0 in file %d" % ii)
+            self.spectra_per_subint = subint["NSBLK"]
+            self.bits_per_sample = subint["NBITS"]
+            nsubints = subint["NAXIS2"]
+            if nsubints == 0:
+                logger.warning(f"Number of subints in {fn} is zero.")
+                if ii == len(filenames) - 1:
+                    logger.warning(
+                        f"File {fn} is the last file and has zero subints. "
+                        "Ignoring this file."
+                    )
+                    if ii == 0:
                         raise ValueError(
-                            f"File {fn} has zero subints and is not the last file."
+                            f"File {fn} is the only file and has zero subints. Stopping"
                         )
+                    else:
+                        continue
                 else:
-                    self.num_subint[ii] = nsubints
+                    raise ValueError(
+                        f"File {fn} has zero subints and is not the last file."
+                    )
+            else:
+                self.num_subint[ii] = nsubints
 
-                self.start_subint[ii] = subint["NSUBOFFS"]
-                self.time_per_subint = self.dt * self.spectra_per_subint
+            self.start_subint[ii] = subint["NSUBOFFS"]
+            self.time_per_subint = self.dt * self.spectra_per_subint
 
-                # This is the MJD offset based on the starting subint number
-                MJDf = (self.time_per_subint * self.start_subint[ii]) / SECPERDAY
+            # This is the MJD offset based on the starting subint number
+            MJDf = (self.time_per_subint * self.start_subint[ii]) / SECPERDAY
 
-                self.start_MJD[ii] = (
-                    primary["STT_IMJD"]
-                    + (primary["STT_SMJD"] + primary["STT_OFFS"]) / SECPERDAY
-                )
-                # The start_MJD values should always be correct
-                self.start_MJD[ii] += MJDf
-
-                # Compute the starting spectra from the times
-                MJDf = self.start_MJD[ii] - self.start_MJD[0]
-                if MJDf < 0.0:
-                    raise ValueError("File %d seems to be from before file 0!" % ii)
-
-                self.start_spec[ii] = MJDf * SECPERDAY / self.dt + 0.5
-
-                # Now pull stuff from the columns
-                subint_hdu = hdus["SUBINT"]
-                first_subint = subint_hdu.data[0]
-                # Identify the OFFS_SUB column number
-                if "OFFS_SUB" not in subint_hdu.columns.names:
-                    logger.warning("Can't find the 'OFFS_SUB' column!")
-                else:
-                    colnum = subint_hdu.columns.names.index("OFFS_SUB")
-                    if ii == 0:
-                        self.offs_sub_col = colnum
-                    elif self.offs_sub_col != colnum:
-                        logger.warning(
-                            "'OFFS_SUB' column changes between files 0 and %d!" % ii
-                        )
+            self.start_MJD[ii] = (
+                primary["STT_IMJD"]
+                + (primary["STT_SMJD"] + primary["STT_OFFS"]) / SECPERDAY
+            )
+            # The start_MJD values should always be correct
+            self.start_MJD[ii] += MJDf
 
-                # Identify the data column and the data type
-                if "DATA" not in subint_hdu.columns.names:
-                    logger.warning("Can't find the 'DATA' column!")
-                else:
-                    colnum = subint_hdu.columns.names.index("DATA")
-                    if ii == 0:
-                        self.data_col = colnum
-                        self.FITS_typecode = subint_hdu.columns[self.data_col].format[
-                            -1
-                        ]
-                    elif self.data_col != colnum:
-                        logger.warning(
-                            "'DATA' column changes between files 0 and %d!" % ii
-                        )
+            # Compute the starting spectra from the times
+            MJDf = self.start_MJD[ii] - self.start_MJD[0]
+            if MJDf < 0.0:
+                raise ValueError("File %d seems to be from before file 0!" % ii)
 
-                # Telescope azimuth
-                if "TEL_AZ" not in subint_hdu.columns.names:
-                    self.azimuth = 0.0
-                else:
-                    colnum = subint_hdu.columns.names.index("TEL_AZ")
-                    if ii == 0:
-                        self.tel_az_col = colnum
-                        self.azimuth = first_subint["TEL_AZ"]
+            self.start_spec[ii] = MJDf * SECPERDAY / self.dt + 0.5
 
-                # Telescope zenith angle
-                if "TEL_ZEN" not in subint_hdu.columns.names:
-                    self.zenith_ang = 0.0
-                else:
-                    colnum = subint_hdu.columns.names.index("TEL_ZEN")
-                    if ii == 0:
-                        self.tel_zen_col = colnum
-                        self.zenith_ang = first_subint["TEL_ZEN"]
+            # Now pull stuff from the columns
+            columns = info["columns"]
+            # Identify the OFFS_SUB column number
+            if "OFFS_SUB" not in columns:
+                logger.warning("Can't find the 'OFFS_SUB' column!")
+            else:
+                colnum = columns.index("OFFS_SUB")
+                if ii == 0:
+                    self.offs_sub_col = colnum
+                elif self.offs_sub_col != colnum:
+                    logger.warning(
+                        "'OFFS_SUB' column changes between files 0 and %d!" % ii
+                    )
 
-                # Observing frequencies
-                if "DAT_FREQ" not in subint_hdu.columns.names:
-                    logger.warning("Can't find the channel freq column, 'DAT_FREQ'!")
-                else:
-                    colnum = subint_hdu.columns.names.index("DAT_FREQ")
-                    freqs = first_subint["DAT_FREQ"]
-                    if ii == 0:
-                        self.freqs_col = colnum
-                        self.df = freqs[1] - freqs[0]
-                        self.lo_freq = freqs[0]
-                        self.hi_freq = freqs[-1]
-                        # Now check that the channel spacing is the same throughout
-                        ftmp = freqs[1:] - freqs[:-1]
-                        if np.any((ftmp - self.df)) > 1e-7:
-                            logger.warning("Channel spacing changes in file %d!" % ii)
-                    else:
-                        ftmp = np.abs(self.df - (freqs[1] - freqs[0]))
-                        if ftmp > 1e-7:
-                            logger.warning(
-                                "Channel spacing between files 0 and %d!" % ii
-                            )
-                        ftmp = np.abs(self.lo_freq - freqs[0])
-                        if ftmp > 1e-7:
-                            logger.warning(
-                                "Low channel changes between files 0 and %d!" % ii
-                            )
-                        ftmp = np.abs(self.hi_freq - freqs[-1])
-                        if ftmp > 1e-7:
-                            logger.warning(
-                                "High channel changes between files 0 and %d!" % ii
-                            )
-
-                # Data weights
-                if "DAT_WTS" not in subint_hdu.columns.names:
-                    logger.warning("Can't find the channel weights column, 'DAT_WTS'!")
-                else:
-                    colnum = subint_hdu.columns.names.index("DAT_WTS")
-                    if ii == 0:
-                        self.dat_wts_col = colnum
-                    elif self.dat_wts_col != colnum:
-                        logger.warning(
-                            "'DAT_WTS column changes between files 0 and %d!" % ii
-                        )
-                    if np.any(first_subint["DAT_WTS"] != 1.0):
-                        self.need_weight = True
+            # Identify the data column and the data type
+            if "DATA" not in columns:
+                logger.warning("Can't find the 'DATA' column!")
+            else:
+                colnum = columns.index("DATA")
+                if ii == 0:
+                    self.data_col = colnum
+                    self.FITS_typecode = info["data_format"][-1]
+                elif self.data_col != colnum:
+                    logger.warning("'DATA' column changes between files 0 and %d!" % ii)
+
+            # Telescope azimuth
+            if "TEL_AZ" not in columns:
+                self.azimuth = 0.0
+            else:
+                colnum = columns.index("TEL_AZ")
+                if ii == 0:
+                    self.tel_az_col = colnum
+                    self.azimuth = info["TEL_AZ"]
+
+            # Telescope zenith angle
+            if "TEL_ZEN" not in columns:
+                self.zenith_ang = 0.0
+            else:
+                colnum = columns.index("TEL_ZEN")
+                if ii == 0:
+                    self.tel_zen_col = colnum
+                    self.zenith_ang = info["TEL_ZEN"]
 
-                # Data offsets
-                if "DAT_OFFS" not in subint_hdu.columns.names:
-                    logger.warning("Can't find the channel offsets column, 'DAT_OFFS'!")
+            # Observing frequencies
+            if "DAT_FREQ" not in columns:
+                logger.warning("Can't find the channel freq column, 'DAT_FREQ'!")
+            else:
+                colnum = columns.index("DAT_FREQ")
+                # keep the precision the frequencies are stored with
+                freq_type = np.dtype(info["freq_dtype"]).type
+                df = freq_type(info["df"])
+                lo_freq = freq_type(info["lo_freq"])
+                hi_freq = freq_type(info["hi_freq"])
+                if ii == 0:
+                    self.freqs_col = colnum
+                    self.df = df
+                    self.lo_freq = lo_freq
+                    self.hi_freq = hi_freq
+                    # Now check that the channel spacing is the same throughout
+                    if info["spacing_changes"]:
+                        logger.warning("Channel spacing changes in file %d!" % ii)
                 else:
-                    colnum = subint_hdu.columns.names.index("DAT_OFFS")
-                    if ii == 0:
-                        self.dat_offs_col = colnum
-                    elif self.dat_offs_col != colnum:
+                    ftmp = np.abs(self.df - df)
+                    if ftmp > 1e-7:
+                        logger.warning("Channel spacing between files 0 and %d!" % ii)
+                    ftmp = np.abs(self.lo_freq - lo_freq)
+                    if ftmp > 1e-7:
                         logger.warning(
-                            "'DAT_OFFS column changes between files 0 and %d!" % ii
+                            "Low channel changes between files 0 and %d!" % ii
                         )
-                    if np.any(first_subint["DAT_OFFS"] != 0.0):
-                        self.need_offset = True
-
-                # Data scalings
-                if "DAT_SCL" not in subint_hdu.columns.names:
-                    logger.warning("Can't find the channel scalings column, 'DAT_SCL'!")
-                else:
-                    colnum = subint_hdu.columns.names.index("DAT_SCL")
-                    if ii == 0:
-                        self.dat_scl_col = colnum
-                    elif self.dat_scl_col != colnum:
+                    ftmp = np.abs(self.hi_freq - hi_freq)
+                    if ftmp > 1e-7:
                         logger.warning(
-                            "'DAT_SCL' column changes between files 0 and %d!" % ii
+                            "High channel changes between files 0 and %d!" % ii
                         )
-                    if np.any(first_subint["DAT_SCL"] != 1.0):
-                        self.need_scale = True
-
-                # Comute the samples per file and the amount of padding
-                # that the _previous_ file has
-                self.num_pad[ii] = 0
-                self.num_spec[ii] = self.spectra_per_subint * self.num_subint[ii]
-                if ii > 0:
-                    if self.start_spec[ii] > self.N:  # Need padding
-                        self.num_pad[ii - 1] = self.start_spec[ii] - self.N
-                        self.N += self.num_pad[ii - 1]
-                self.N += self.num_spec[ii]
+
+            # Data weights
+            if "DAT_WTS" not in columns:
+                logger.warning("Can't find the channel weights column, 'DAT_WTS'!")
+            else:
+                colnum = columns.index("DAT_WTS")
+                if ii == 0:
+                    self.dat_wts_col = colnum
+                elif self.dat_wts_col != colnum:
+                    logger.warning(
+                        "'DAT_WTS column changes between files 0 and %d!" % ii
+                    )
+                if info["need_weight"]:
+                    self.need_weight = True
+
+            # Data offsets
+            if "DAT_OFFS" not in columns:
+                logger.warning("Can't find the channel offsets column, 'DAT_OFFS'!")
+            else:
+                colnum = columns.index("DAT_OFFS")
+                if ii == 0:
+                    self.dat_offs_col = colnum
+                elif self.dat_offs_col != colnum:
+                    logger.warning(
+                        "'DAT_OFFS column changes between files 0 and %d!" % ii
+                    )
+                if info["need_offset"]:
+                    self.need_offset = True
+
+            # Data scalings
+            if "DAT_SCL" not in columns:
+                logger.warning("Can't find the channel scalings column, 'DAT_SCL'!")
+            else:
+                colnum = columns.index("DAT_SCL")
+                if ii == 0:
+                    self.dat_scl_col = colnum
+                elif self.dat_scl_col != colnum:
+                    logger.warning(
+                        "'DAT_SCL' column changes between files 0 and %d!" % ii
+                    )
+                if info["need_scale"]:
+                    self.need_scale = True
+
+            # Comute the samples per file and the amount of padding
+            # that the _previous_ file has
+            self.num_pad[ii] = 0
+            self.num_spec[ii] = self.spectra_per_subint * self.num_subint[ii]
+            if ii > 0:
+                if self.start_spec[ii] > self.N:  # Need padding
+                    self.num_pad[ii - 1] = self.start_spec[ii] - self.N
+                    self.N += self.num_pad[ii - 1]
+            self.N += self.num_spec[ii]
 
         # Finished looping through PSRFITS files. Finalise a few things.
         # Convert the position strings into degrees
-        self.ra2000 = coordinates.Angle(self.ra_str, unit=units.hourangle).deg
-        self.dec2000 = coordinates.Angle(self.dec_str, unit=units.deg).deg
+        self.ra2000 = angle_to_deg(self.ra_str, hours=True)
+        self.dec2000 = angle_to_deg(self.dec_str)
 
         # Are the polarisations summed?
         if (self.poln_order == "AA+BB") or (self.poln_order == "INTEN"):
@@ -857,6 +1693,28 @@ class SpectraInfo:
         return getattr(self, key)
 
 
+def angle_to_deg(value, hours=False):
+    """
+    Convert the RA or DEC card of a PSRFITS file to degrees. Sexagesimal strings are
+    parsed directly, other formats are left to astropy.
+
+    Args:
+        value (str): value of the card
+        hours (bool): The value is in hours (RA)
+
+    Returns:
+        float: angle in degrees
+
+    """
+    try:
+        return sexagesimal2deg(value, hours=hours)
+    except (TypeError, ValueError):
+        from astropy import coordinates, units
+
+        unit = units.hourangle if hours else units.deg
+        return coordinates.Angle(value, unit=unit).deg
+
+
 def DATEOBS_to_MJD(dateobs):
     """
     Convert DATE-OBS string from PSRFITS primary HDU to a MJD.
@@ -865,6 +1723,8 @@ def DATEOBS_to_MJD(dateobs):
          tuple: (integer part of MJD, fractional part of MJD)
 
     """
+    import astropy.time as aptime
+
     # Parse string using regular expression defined at top of file
     m = date_obs_re.match(dateobs)
     mjd_fracday = (
@@ -885,6 +1745,8 @@ def is_PSRFITS(filename):
         bool: True if filename appears to be PSRFITS format. Return False otherwise.
 
     """
+    import astropy.io.fits as pyfits
+
     with pyfits.open(filename, mode="readonly", memmap=True) as hdus:
         primary = hdus["PRIMARY"].header
 
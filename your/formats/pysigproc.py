@@ -9,6 +9,7 @@ from collections import OrderedDict
 
 import numpy
 
+from your.formats.unpack import unpack
 from your.utils.astro import dec2deg, ra2deg
 
 
@@ -44,6 +45,12 @@ class SigprocFile(object):
         tsamp (float): Sampling interval (seconds)
         nifs (int): Number of IFs in the data.
 
+    Note:
+        The data are read from a private, read-only memory map at absolute offsets, so
+        reads do not depend on the position of the file and one object can be read from
+        many threads, or from processes forked after it was opened. When pickled, the
+        file is opened and mapped again on unpickling.
+
     """
 
     # List of types
@@ -101,6 +108,24 @@ class SigprocFile(object):
                 self.ra_deg = None
                 self.dec_deg = None
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # open files and memory maps can not be pickled, the file is opened again by
+        # __setstate__
+        fp = state.pop("fp", None)
+        if state.pop("_mmdata", None) is not None:
+            state["_filename"] = fp.name
+        return state
+
+    def __setstate__(self, state):
+        filename = state.pop("_filename", None)
+        self.__dict__.update(state)
+        if filename is not None:
+            self.fp = open(filename, "rb")
+            self._mmdata = mmap.mmap(
+                self.fp.fileno(), 0, mmap.MAP_PRIVATE, mmap.PROT_READ
+            )
+
     # See sigproc send_stuff.c
 
     @staticmethod
@@ -237,10 +262,10 @@ class SigprocFile(object):
         """
 
         Returns:
-            dtype of the data
+            dtype of the data. Sub-byte data is unpacked to uint8.
 
         """
-        if self.nbits == 8:
+        if self.nbits in (1, 2, 4, 8):
             return numpy.uint8
         elif self.nbits == 16:
             return numpy.uint16
@@ -254,7 +279,8 @@ class SigprocFile(object):
         """
 
         Returns:
-            bytes per spectrum
+            bytes per spectrum. This is fractional for sub-byte data if a spectrum does
+            not fill whole bytes.
 
         """
         return self.nbits * self.nchans * self.nifs / 8
@@ -266,7 +292,7 @@ class SigprocFile(object):
             Number of specrta in the file
 
         """
-        return (self._mmdata.size() - self.hdrbytes) / self.bytes_per_spectrum
+        return SigprocFile.native_nspectra(self)
 
     def native_nspectra(self):
         """
@@ -278,9 +304,10 @@ class SigprocFile(object):
 
         """
 
-        return (self._mmdata.size() - self.hdrbytes) / self.bytes_per_spectrum
+        nbits_per_spectrum = self.nbits * self.nchans * self.nifs
+        return (self._mmdata.size() - self.hdrbytes) * 8 // nbits_per_spectrum
 
-    def get_data(self, nstart, nsamp, offset=0, pol=0, npoln=1):
+    def get_data(self, nstart, nsamp, offset=0, pol=0, npoln=1, c_min=None, c_max=None):
         """
         Return nsamp time slices starting at nstart.
 
@@ -290,20 +317,36 @@ class SigprocFile(object):
             offset (int): Can be used to offset reading from.
             pol (int): Which polarisation to read.
             npoln (int): Number of polarisations to read.
+            c_min (int): First channel to read (default: 0)
+            c_max (int): Channel to stop reading at, exclusive (default: nchans)
 
         Returns:
-            numpy.ndarray: data.
+            numpy.ndarray: data. This is a read-only view of the file unless
+            polarisations are combined or the data has fewer than 8 bits, which is
+            unpacked to a new uint8 array.
         """
         assert npoln in [1, 4], "npoln can only be 1 or 4"
 
-        bstart = int(nstart) * self.bytes_per_spectrum
-        nbytes = int(nsamp) * self.bytes_per_spectrum
-        b0 = self.hdrbytes + bstart + (offset * self.bytes_per_spectrum)
-        b1 = b0 + nbytes
-
-        data = numpy.frombuffer(
-            self._mmdata[int(b0) : int(b1)], dtype=self.dtype
-        ).reshape((-1, self.nifs, self.nchans))
+        if self.nbits < 8:
+            data = self._read_packed(nstart + offset, nsamp)
+        else:
+            bstart = int(nstart) * self.bytes_per_spectrum
+            nbytes = int(nsamp) * self.bytes_per_spectrum
+            b0 = int(self.hdrbytes + bstart + (offset * self.bytes_per_spectrum))
+            b1 = min(int(b0 + nbytes), len(self._mmdata))
+            nspec = max(b1 - b0, 0) // int(self.bytes_per_spectrum)
+
+            # read-only view of the memory map, no data is copied here
+            if nspec > 0:
+                data = numpy.frombuffer(
+                    self._mmdata,
+                    dtype=self.dtype,
+                    count=nspec * self.nifs * self.nchans,
+                    offset=b0,
+                )
+            else:
+                data = numpy.empty(0, dtype=self.dtype)
+        data = data.reshape((-1, self.nifs, self.nchans))[:, :, c_min:c_max]
 
         if self.nifs == 1:
             return data
@@ -331,20 +374,40 @@ class SigprocFile(object):
         """
         if self.nbits >= 8:
             return self.get_data(nstart, nsamp).astype(numpy.float32)
-        bstart = int(nstart) * self.bytes_per_spectrum
-        nbytes = int(nsamp) * self.bytes_per_spectrum
-        b0 = self.hdrbytes + bstart
-        b1 = b0 + nbytes
-        # reshape with the frequency axis reduced by packing factor
-        fac = 8 / self.nbits
-        d = numpy.frombuffer(self._mmdata[b0:b1], dtype=numpy.uint8).reshape(
-            (nsamp, self.nifs, self.nchans / fac)
+        data = self._read_packed(nstart, nsamp)
+        return data.reshape((-1, self.nifs, self.nchans)).astype(numpy.float32)
+
+    def _read_packed(self, nstart, nsamp):
+        """
+        Unpack nsamp spectra of sub-byte data starting at nstart. Spectra which do not
+        fill whole bytes can start in the middle of a byte, so the read is aligned on
+        bits rather than bytes.
+
+        Args:
+            nstart (int): Starting spectra number to start reading from.
+            nsamp (int): Number of spectra to read.
+
+        Returns:
+            numpy.ndarray: flat uint8 array with the unpacked values
+        """
+        nvals = self.nifs * self.nchans
+        nstart = int(nstart)
+        nspec = max(min(int(nsamp), SigprocFile.native_nspectra(self) - nstart), 0)
+        if nspec == 0:
+            return numpy.empty(0, dtype=numpy.uint8)
+
+        bit0 = nstart * nvals * self.nbits
+        skip = (bit0 % 8) // self.nbits
+        count = nspec * nvals
+        nbytes = -(-(skip + count) * self.nbits // 8)
+        packed = numpy.frombuffer(
+            self._mmdata,
+            dtype=numpy.uint8,
+            count=nbytes,
+            offset=self.hdrbytes + bit0 // 8,
         )
-        unpacked = numpy.empty((nsamp, self.nifs, self.nchans), dtype=numpy.float32)
-        for i in range(fac):
-            mask = 2 ** (self.nbits * i) * (2**self.nbits - 1)
-            unpacked[..., i::fac] = (d & mask) / 2 ** (i * self.nbits)
-        return unpacked
+        # sigproc packs the first channel in the least significant bits
+        return unpack(packed, self.nbits, bitorder="little")[skip : skip + count]
 
     def native_tsamp(self):
         """
@@ -0,0 +1,76 @@
+"""
+Unpack 1, 2 and 4-bit data packed into bytes, using lookup tables.
+
+Every possible byte value is decoded once into a 256 entry table, so unpacking is a
+single gather from the table instead of a shift and mask pass per sample in the byte.
+"""
+
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_NBITS = (1, 2, 4)
+
+
+@lru_cache(maxsize=None)
+def lookup_table(nbits, bitorder="big", dtype=np.uint8):
+    """
+    Lookup table which maps a byte to the values packed in it.
+
+    Args:
+        nbits (int): Number of bits per value (1, 2 or 4)
+        bitorder (str): "big" if the first value is in the most significant bits
+        (PSRFITS), "little" if it is in the least significant bits (sigproc filterbank)
+        dtype: dtype of the unpacked values
+
+    Returns:
+        np.ndarray: read-only table of shape (256, 8 // nbits)
+
+    """
+    if nbits not in SUPPORTED_NBITS:
+        raise ValueError(f"nbits ({nbits}) can only be one of {SUPPORTED_NBITS}")
+    if bitorder not in ("big", "little"):
+        raise ValueError(f"bitorder ({bitorder}) can only be 'big' or 'little'")
+
+    shifts = np.arange(0, 8, nbits, dtype=np.uint8)
+    if bitorder == "big":
+        shifts = shifts[::-1]
+    byte = np.arange(256, dtype=np.uint8)[:, None]
+    table = ((byte >> shifts) & (2**nbits - 1)).astype(dtype)
+    table.flags.writeable = False
+    return table
+
+
+def unpack(data, nbits, bitorder="big", out=None):
+    """
+    Unpack sub-byte data along its last axis.
+
+    Args:
+        data (np.ndarray): uint8 array with the packed values
+        nbits (int): Number of bits per value (1, 2 or 4)
+        bitorder (str): "big" (PSRFITS) or "little" (sigproc filterbank), see
+        `lookup_table`
+        out (np.ndarray): Optional array to unpack into, with the last axis `8 // nbits`
+        times longer than that of data. Its dtype sets the dtype of the unpacked values.
+
+    Returns:
+        np.ndarray: unpacked array (uint8 unless out is given)
+
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    samples_per_byte = 8 // nbits
+    shape = data.shape[:-1] + (data.shape[-1] * samples_per_byte,)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+
+    table = lookup_table(nbits, bitorder, out.dtype.type)
+    # splitting the last axis never needs a copy, so the values land in out
+    target = out.view()
+    target.shape = data.shape + (samples_per_byte,)
+    np.take(table, data, axis=0, out=target, mode="clip")
+    return out
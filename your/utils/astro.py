@@ -1,8 +1,27 @@
+import datetime
+import re
+
 import numpy as np
 
 ARCSECTORAD = float("4.8481368110953599358991410235794797595635330237270e-6")
 RADTODEG = float("57.295779513082320876798154814105170332405472466564")
 
+# Rotation from J2000 equatorial (ICRS) to galactic coordinates, from the Hipparcos
+# catalogue (ESA 1997)
+GALACTIC_ROTATION = np.array(
+    [
+        [-0.0548755604162154, -0.8734370902348850, -0.4838350155487132],
+        [0.4941094278755837, -0.4448296299600112, 0.7469822444972189],
+        [-0.8676661490190047, -0.1980763734312015, 0.4559837761750669],
+    ]
+)
+
+MJD_EPOCH = datetime.datetime(1858, 11, 17)
+
+sexagesimal_re = re.compile(
+    r"^\s*(?P<sign>[+-]?)(?P<first>[0-9]+)[:\s]+(?P<min>[0-9]+)(?:[:\s]+(?P<sec>[0-9.]+))?\s*$"
+)
+
 
 def dec2deg(src_dej):
     """
@@ -31,19 +50,158 @@ def ra2deg(src_raj):
     return 15.0 * dec2deg(src_raj)
 
 
-def dedisperse(data, dm, tsamp, chan_freqs=[], delays=[]):
+def sexagesimal2deg(value, hours=False):
+    """
+    Convert a sexagesimal string (e.g. the RA and DEC cards of PSRFITS files) to degrees
+
+    Args:
+        value (str): "DD:MM:SS.SS" (or "HH:MM:SS.SS"), the fields can also be separated
+        by spaces
+        hours (bool): The value is in hours (right ascension)
+
+    Returns:
+        float: angle in degrees
+
+    """
+    match = sexagesimal_re.match(value)
+    if match is None:
+        raise ValueError(f"Could not parse sexagesimal angle: {value}")
+    seconds = float(match.group("sec") or 0.0)
+    angle = (
+        int(match.group("first")) + (int(match.group("min")) + seconds / 60.0) / 60.0
+    )
+    if match.group("sign") == "-":
+        angle = -angle
+    return 15.0 * angle if hours else angle
+
+
+def radec2galactic(ra_deg, dec_deg):
+    """
+    Convert J2000 equatorial coordinates to galactic coordinates
+
+    Args:
+        ra_deg (float): RA in degrees
+        dec_deg (float): Dec in degrees
+
+    Returns:
+        tuple: galactic longitude (0 to 360 degrees) and latitude (degrees)
+
+    """
+    ra = np.deg2rad(ra_deg)
+    dec = np.deg2rad(dec_deg)
+    equatorial = np.array(
+        [np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)]
+    )
+    x, y, z = GALACTIC_ROTATION @ equatorial
+    gl = np.rad2deg(np.arctan2(y, x)) % 360.0
+    gb = np.rad2deg(np.arcsin(np.clip(z, -1.0, 1.0)))
+    return float(gl), float(gb)
+
+
+def mjd2isot(mjd):
+    """
+    Convert a UTC MJD to an ISO 8601 string, with milliseconds (like astropy's
+    Time.isot)
+
+    Note:
+        Days with a leap second are not treated differently.
+
+    Args:
+        mjd (float): MJD
+
+    Returns:
+        str: date and time, e.g. "2019-10-07T02:57:46.667"
+
+    """
+    day = int(np.floor(mjd))
+    ms = int(round((mjd - day) * 86400000.0))
+    time = MJD_EPOCH + datetime.timedelta(days=day, milliseconds=ms)
+    return time.strftime("%Y-%m-%dT%H:%M:%S.") + f"{time.microsecond // 1000:03d}"
+
+
+def shift_channels(data, shifts, time_axis=1, mode="wrap", out=None):
+    """
+    Shift every channel of the data in time by a number of samples, with a single gather
+    over all the channels.
+
+    Args:
+        data (numpy.ndarray): 2D array with the channels along one axis and time along
+        the other
+        shifts (numpy.ndarray): number of samples to shift each channel by (positive
+        shifts move the data later)
+        time_axis (int): axis of the data along time (1 for (nf, nt) data, 0 for
+        (nt, nf) data)
+
+        mode (str): "wrap" to roll the samples shifted out of a channel around to its
+        other end, keeping all the samples, or "valid" to keep only the samples where
+        every channel has data
+        out (numpy.ndarray): Optional array to write the shifted data into (of the shape
+        of the data with "wrap")
+
+    Note:
+        With "wrap", a channel shifted by as many samples as it has, or more, is left
+        unchanged. With "valid", the output has nt - (max(shifts) - min(shifts))
+        samples, and matches the samples from max(shifts) to nt + min(shifts) of the
+        output with "wrap".
+
+    Returns:
+        numpy.ndarray: shifted data, float32 unless `out` has another dtype
+
+    """
+    if data.ndim != 2 or time_axis not in (0, 1):
+        raise ValueError("data should be 2D, with time along axis 0 or 1")
+    nt = data.shape[time_axis]
+    nf = data.shape[1 - time_axis]
+    shifts = np.asarray(shifts, dtype=np.int64)
+    if shifts.shape != (nf,):
+        raise ValueError(f"shifts has shape {shifts.shape}, expected ({nf},)")
+
+    # index[t, c]: sample of channel c which ends up at sample t
+    if mode == "wrap":
+        shifts = np.where(np.abs(shifts) < nt, shifts, 0)
+        index = np.arange(nt)[:, None] - shifts
+        index %= nt
+    elif mode == "valid":
+        nvalid = max(nt - int(shifts.max() - shifts.min()), 0) if nf else nt
+        index = np.arange(nvalid)[:, None] + (shifts.max(initial=0) - shifts)
+    else:
+        raise ValueError(f"mode ({mode}) can only be 'wrap' or 'valid'")
+
+    # flat indices into the data, so that the gather can write into out
+    data = np.ascontiguousarray(data)
+    if time_axis == 0:
+        index *= nf
+        index += np.arange(nf)
+    else:
+        index = index.T
+        index += (np.arange(nf) * nt)[:, None]
+    if out is None:
+        out = np.empty(index.shape, dtype=np.float32)
+    elif out.shape != index.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {index.shape}")
+    if out.dtype == data.dtype:
+        np.take(data.ravel(), index, out=out)
+    else:
+        out[...] = np.take(data.ravel(), index)
+    return out
+
+
+def dedisperse(data, dm, tsamp, chan_freqs=[], delays=[], mode="wrap", out=None):
     """
     Dedisperse a chunk of data..
 
     Note:
-        Our method rolls the data around while dedispersing it.
+        Our method rolls the data around while dedispersing it. Use mode="valid" to keep
+        only the samples which are not rolled around in any channel.
 
     Args:
-        data: data to dedisperse
+        data: data to dedisperse, of shape (nf, nt)
         dm (float): The DM to dedisperse the data at.
         chan_freqs (float): frequencies
         tsamp (float): sampling time in seconds
         delays (float): dispersion delays for each channel (in seconds)
+        mode (str): "wrap" or "valid", see `shift_channels`
+        out (numpy.ndarray): Optional array to write the dedispersed data into
 
     Returns:
         dedispersed (float): Dedispersed data
@@ -56,15 +214,7 @@ def dedisperse(data, dm, tsamp, chan_freqs=[], delays=[]):
         delays = calc_dispersion_delays(dm, chan_freqs)
 
     delay_bins = np.round(delays / tsamp).astype("int64")
-    dedispersed = np.zeros(data.shape, dtype=np.float32)
-    for ii in range(nf):
-        dedispersed[ii, :] = np.concatenate(
-            [
-                data[ii, -delay_bins[ii] :],
-                data[ii, : -delay_bins[ii]],
-            ]
-        )
-    return dedispersed
+    return shift_channels(data, delay_bins, time_axis=1, mode=mode, out=out)
 
 
 def calc_dispersion_delays(dm, chan_freqs):
@@ -0,0 +1,122 @@
+"""
+Shared parts of the fused (dedisperse, DM-time and crop) CPU and GPU kernels, which
+process batches of candidates at once: the decimation of the outputs, the grouping of
+the candidates whose chunks can be stacked and the delay tables of a batch.
+"""
+
+import logging
+
+import numpy as np
+
+from your.utils.astro import calc_dispersion_delays
+
+logger = logging.getLogger(__name__)
+
+
+def crop_parameters(cand, size=256):
+    """
+    Decimation factors and crop of the fused kernels, for a candidate.
+
+    Args:
+        cand: Candidate instance
+        size (int): Number of DMs of the DM-time array and of time samples (and at least
+        the number of channels) of the outputs
+
+    Returns:
+        tuple: time decimation factor, frequency decimation factor and first (decimated)
+        sample of the crop
+
+    """
+    if cand.width < 3:
+        time_decimation_factor = 1
+    else:
+        time_decimation_factor = cand.width // 2
+
+    nt, nf = cand.data.shape
+    if nf < size:
+        raise IndexError(f"The fused candmaker will not work if nchans < {size}.")
+
+    frequency_decimation_factor = nf // size
+    nt_out = nt // time_decimation_factor
+    if nt_out < size:
+        raise ValueError(
+            f"The data has {nt_out} samples after decimation, "
+            f"cannot crop {size} of them."
+        )
+    return time_decimation_factor, frequency_decimation_factor, nt_out // 2 - size // 2
+
+
+def group_candidates(cands, size=256):
+    """
+    Group the candidates whose chunks can be stacked and processed together, those with
+    the same number of samples and channels and the same decimation.
+
+    Args:
+        cands (list): Candidate instances, with their data
+        size (int): see `crop_parameters`
+
+    Returns:
+        dict: lists of the candidates, keyed by (samples, channels, time decimation
+        factor, frequency decimation factor, first sample of the crop)
+
+    """
+    groups = {}
+    for cand in cands:
+        key = cand.data.shape + crop_parameters(cand, size)
+        groups.setdefault(key, []).append(cand)
+    logger.debug(f"{len(cands)} candidates in {len(groups)} batches")
+    return groups
+
+
+def stack_data(cands, dtypes=("uint8", "int8", "uint16", "int16")):
+    """
+    Stack the (time, frequency) chunks of candidates into a (candidate, frequency, time)
+    array, so that each channel is contiguous.
+
+    Args:
+        cands (list): Candidate instances, whose data have the same shape
+        dtypes (tuple): dtypes to keep the data in, other data is converted to float32
+
+    Returns:
+        numpy.ndarray: stacked data
+
+    """
+    dtype = np.result_type(*(cand.data.dtype for cand in cands))
+    if dtype.name not in dtypes:
+        dtype = np.dtype(np.float32)
+    nt, nf = cands[0].data.shape
+    data = np.empty((len(cands), nf, nt), dtype=dtype)
+    for out, cand in zip(data, cands):
+        out[:] = cand.data.T
+    return data
+
+
+def delay_tables(cands, size=256):
+    """
+    Delays of the fused kernels, for a batch of candidates. The sample t of a shifted
+    channel c is the sample (t - shift[c]) % nt of the data. As on the GPU, the
+    dedispersion delays use float32 frequencies and the DM-time delays, at `size` DMs
+    from 0 to twice the DM of each candidate, float64 ones.
+
+    Args:
+        cands (list): Candidate instances, whose data have the same shape
+        size (int): Number of DMs of the DM-time arrays
+
+    Returns:
+        tuple: int32 dedispersion shifts of shape (ncand, 1, nf) and DM-time shifts of
+        shape (ncand, size, nf)
+
+    """
+    nt, nf = cands[0].data.shape
+    ft_shifts = np.empty((len(cands), 1, nf), dtype=np.int32)
+    dmt_shifts = np.empty((len(cands), size, nf), dtype=np.int32)
+    for ii, cand in enumerate(cands):
+        tsamp = cand.your_header.tsamp
+        chan_freqs = np.asarray(cand.chan_freqs, dtype=np.float32).astype(np.float64)
+        delays = np.round(calc_dispersion_delays(cand.dm, chan_freqs) / tsamp)
+        ft_shifts[ii, 0] = delays.astype(np.int64) % nt
+
+        dm_list = np.linspace(0, 2 * cand.dm, size)
+        delays = calc_dispersion_delays(dm_list[:, None], np.asarray(cand.chan_freqs))
+        dmt_shifts[ii] = np.round(delays / tsamp).astype(np.int64) % nt
+    return ft_shifts, dmt_shifts
@@ -0,0 +1,211 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+from your.utils.astro import calc_dispersion_delays
+from your.utils.batch import delay_tables, group_candidates, stack_data
+
+logger = logging.getLogger(__name__)
+
+
+def dmt_shifts(dms, chan_freqs, tsamp, nt):
+    """
+    Shift of every channel at every DM, as used to dedisperse by rolling the data.
+
+    Args:
+        dms (numpy.ndarray): DMs to dedisperse at
+        chan_freqs (numpy.ndarray): frequencies of the channels
+        tsamp (float): sampling time in seconds
+        nt (int): number of time samples of the data
+
+    Note:
+        The shifts are wrapped into [0, nt), the sample t of a dedispersed channel c is
+        sample (t - shift[c]) % nt of the data. As for
+        `your.utils.astro.shift_channels`, a channel whose delay is of nt samples or
+        more is not shifted.
+
+    Returns:
+        numpy.ndarray: shifts (samples) of shape (ndm, nf)
+
+    """
+    dms = np.asarray(dms, dtype=np.float64)
+    delays = calc_dispersion_delays(dms[:, None], np.asarray(chan_freqs))
+    shifts = np.round(delays / tsamp).astype("int64")
+    shifts[np.abs(shifts) >= nt] = 0
+    return shifts % nt
+
+
+@lru_cache(maxsize=None)
+def _numba_dmt():
+    """
+    Compile the numba kernel on first use, so that numba is only imported when needed.
+    """
+    from numba import njit, prange
+
+    @njit(parallel=True, cache=True)
+    def dmt(data, shifts, out):
+        ndm, nt = out.shape
+        nf = data.shape[0]
+        for kk in prange(ndm):
+            for ff in range(nf):
+                s = shifts[kk, ff]
+                for tt in range(s):
+                    out[kk, tt] += data[ff, nt - s + tt]
+                for tt in range(s, nt):
+                    out[kk, tt] += data[ff, tt - s]
+
+    return dmt
+
+
+def dm_time(data, dms, chan_freqs, tsamp):
+    """
+    DM-time array of the data, the dedispersed time series at every DM. The DMs are
+    dedispersed in parallel, each by adding up the rolled channels of the data.
+
+    Args:
+        data (numpy.ndarray): data of shape (nt, nf)
+        dms (numpy.ndarray): DMs to dedisperse at
+        chan_freqs (numpy.ndarray): frequencies of the channels
+        tsamp (float): sampling time in seconds
+
+    Returns:
+        numpy.ndarray: float32 DM-time array of shape (ndm, nt)
+
+    """
+    nt, nf = data.shape
+    if nf != len(chan_freqs):
+        raise ValueError(
+            f"data has {nf} channels, but there are {len(chan_freqs)} frequencies"
+        )
+    shifts = dmt_shifts(dms, chan_freqs, tsamp, nt)
+    # channels as rows, so that the kernel reads each of them contiguously
+    data = np.ascontiguousarray(data.T, dtype=np.float32)
+    out = np.zeros((len(shifts), nt), dtype=np.float32)
+    logger.debug(f"Dedispersing {nf} channels of {nt} samples at {len(shifts)} DMs")
+    _numba_dmt()(data, shifts, out)
+    return out
+
+
+def cpu_dmt(cand, dmsteps=256):
+    """
+
+    CPU DM-Time bow-tie (by rolling the array), at `dmsteps` DMs from 0 to twice the DM
+    of the candidate
+
+    Args:
+        cand: Candidate instance
+        dmsteps (int): Number of DMs to dedisperse at
+
+    Returns:
+        candidate object
+
+    """
+    dm_list = cand.dm + np.linspace(-cand.dm, cand.dm, dmsteps)
+    cand.dmt = dm_time(cand.data, dm_list, cand.chan_freqs, cand.native_tsamp)
+    return cand
+
+
+@lru_cache(maxsize=None)
+def _numba_dedisp_and_dmt_crop():
+    """
+    Compile the numba kernels on first use, so that numba is only imported when needed.
+    """
+    from numba import njit, prange
+
+    @njit(parallel=True, cache=True)
+    def sum_shifted(data, shifts, start, tdf, group, out):
+        # out[n, k, c, j] is the sum of the samples (start + j) * tdf to
+        # (start + j + 1) * tdf - 1 of the channels c * group to (c + 1) * group - 1 of
+        # the candidate n, each shifted by shifts[n, k, channel]
+
+        ncand, ndm, nrows, ncols = out.shape
+        nt = data.shape[2]
+        t0 = start * tdf
+        nsamp = ncols * tdf
+        for nkr in prange(ncand * ndm * nrows):
+            nn = nkr // (ndm * nrows)
+            kk = nkr // nrows % ndm
+            row = nkr % nrows
+            acc = np.zeros(nsamp, dtype=np.float32)
+            for ff in range(row * group, (row + 1) * group):
+                # samples t0 - s onwards of the channel, wrapped around at its end
+                first = (t0 - shifts[nn, kk, ff]) % nt
+                nfirst = min(nsamp, nt - first)
+                for tt in range(nfirst):
+                    acc[tt] += data[nn, ff, first + tt]
+                for tt in range(nfirst, nsamp):
+                    acc[tt] += data[nn, ff, tt - nfirst]
+            for jj in range(ncols):
+                out[nn, kk, row, jj] += acc[jj * tdf : (jj + 1) * tdf].sum()
+
+    return sum_shifted
+
+
+def cpu_dedisp_and_dmt_crop_batch(cands, size=256):
+    """
+
+    CPU based dedispersion, DM time bow-time plot and crop of a batch of candidates (see
+    `cpu_dedisp_and_dmt_crop`). The candidates whose chunks have the same shape are
+    stacked and processed together, by one call of the kernel for all their dedispersed
+    arrays and one for all their DM-time arrays.
+
+    Args:
+        cands (list): Candidate instances
+        size (int): Number of DMs of the DM-time array and of time samples (and at least
+        the number of channels) of the outputs
+
+    Returns:
+        list: candidate objects
+
+    """
+    sum_shifted = _numba_dedisp_and_dmt_crop()
+    for key, group in group_candidates(cands, size).items():
+        nt, nf, time_decimation_factor, frequency_decimation_factor, start = key
+        logger.debug(
+            f"Processing {len(group)} candidates, "
+            f"freq decimation factor: {frequency_decimation_factor}, "
+            f"time decimation factor: {time_decimation_factor}"
+        )
+        data = stack_data(group)
+        ft_shifts, dmt_shifts = delay_tables(group, size)
+
+        nrows = nf // frequency_decimation_factor
+        dedispersed = np.zeros((len(group), 1, nrows, size), dtype=np.float32)
+        sum_shifted(
+            data,
+            ft_shifts,
+            start,
+            time_decimation_factor,
+            frequency_decimation_factor,
+            dedispersed,
+        )
+        dmt = np.zeros((len(group), size, 1, size), dtype=np.float32)
+        sum_shifted(data, dmt_shifts, start, time_decimation_factor, nf, dmt)
+
+        for ii, cand in enumerate(group):
+            cand.dedispersed = dedispersed[ii, 0].T
+            cand.dmt = dmt[ii, :, 0]
+    return cands
+
+
+def cpu_dedisp_and_dmt_crop(cand, size=256):
+    """
+
+    CPU based dedispersion, DM time bow-time plot and crop it to 256x256 shaped arrays
+    (by rolling the array). This does the same as `gpu_dedisp_and_dmt_crop` of
+    `your.utils.gpu`, in a single pass over the data which only computes the cropped
+    samples.
+
+
+    Args:
+        cand: Candidate instance
+        size (int): Number of DMs of the DM-time array and of time samples (and at least
+        the number of channels) of the outputs
+
+    Returns:
+        candidate object
+
+    """
+    cpu_dedisp_and_dmt_crop_batch([cand], size)
+    return cand
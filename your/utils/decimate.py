@@ -0,0 +1,165 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def accumulator_dtype(dtype, nsum):
+    """
+    Smallest dtype which can hold the sum of `nsum` values of `dtype` without
+    overflowing.
+
+    Args:
+        dtype: dtype of the data to sum
+        nsum (int): number of values which are summed together
+
+    Returns:
+        numpy.dtype: dtype of the accumulator
+
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return np.dtype(np.float64) if dtype.itemsize > 4 else np.dtype(np.float32)
+    if dtype.kind == "b":
+        dtype = np.dtype(np.uint8)
+    if dtype.kind not in "ui":
+        raise TypeError(f"Cannot decimate data of dtype {dtype}")
+
+    info = np.iinfo(dtype)
+    candidates = (
+        (np.uint16, np.uint32, np.uint64)
+        if dtype.kind == "u"
+        else (np.int16, np.int32, np.int64)
+    )
+    for acc in candidates:
+        acc_info = np.iinfo(acc)
+        if (
+            acc_info.max >= info.max * nsum
+            and acc_info.min <= info.min * nsum
+            and np.dtype(acc).itemsize >= dtype.itemsize
+        ):
+            return np.dtype(acc)
+    return np.dtype(candidates[-1])
+
+
+@lru_cache(maxsize=None)
+def _numba_block_sum():
+    """
+    Compile the numba kernel on first use, so that numba is only imported when needed.
+    """
+    from numba import njit, prange
+
+    @njit(parallel=True, cache=True)
+    def block_sum(data, time_decimation_factor, frequency_decimation_factor, out):
+        nt_out, nifs, nf_out = out.shape
+        for ii in prange(nt_out):
+            for tt in range(
+                ii * time_decimation_factor, (ii + 1) * time_decimation_factor
+            ):
+                for pp in range(nifs):
+                    for jj in range(nf_out):
+                        acc = out[ii, pp, jj]
+                        for ff in range(
+                            jj * frequency_decimation_factor,
+                            (jj + 1) * frequency_decimation_factor,
+                        ):
+                            acc += data[tt, pp, ff]
+                        out[ii, pp, jj] = acc
+
+    return block_sum
+
+
+def block_sum(
+    data, time_decimation_factor=1, frequency_decimation_factor=1, use_numba=False
+):
+    """
+    Sum adjacent blocks of time samples and frequency channels in a widened accumulator.
+
+    Args:
+        data (numpy.ndarray): data of shape (nt, nf) or (nt, nifs, nf)
+        time_decimation_factor (int): number of adjacent time samples to add
+        frequency_decimation_factor (int): number of adjacent frequency channels to add
+        use_numba (bool): use the numba kernel instead of numpy
+
+    Returns:
+        numpy.ndarray: summed data of shape (nt // time_decimation_factor, [nifs,] nf //
+        frequency_decimation_factor)
+
+    """
+    if data.ndim not in (2, 3):
+        raise ValueError(
+            f"data shape is {data.shape}. But data can only have either 2 (nt, nf) "
+            "or 3 (nt, nifs, nf) dimensions."
+        )
+    nt, nf = data.shape[0], data.shape[-1]
+    if nt % time_decimation_factor != 0:
+        raise ValueError(
+            f"time_decimation_factor: {time_decimation_factor} should be a divisor "
+            f"of nt: {nt}"
+        )
+    if nf % frequency_decimation_factor != 0:
+        raise ValueError(
+            f"frequency_decimation_factor: {frequency_decimation_factor} should be a "
+            f"divisor of nf: {nf}"
+        )
+
+    acc_dtype = accumulator_dtype(
+        data.dtype, time_decimation_factor * frequency_decimation_factor
+    )
+    logger.debug(f"Summing blocks of {data.dtype} data in a {acc_dtype} accumulator")
+
+    data3d = data if data.ndim == 3 else data[:, None, :]
+    out_shape = (
+        nt // time_decimation_factor,
+        data3d.shape[1],
+        nf // frequency_decimation_factor,
+    )
+    if use_numba:
+        out = np.zeros(out_shape, dtype=acc_dtype)
+        _numba_block_sum()(
+            data3d, time_decimation_factor, frequency_decimation_factor, out
+        )
+    else:
+        # adjacent samples and channels get their own axes, so that a single reduction
+        # sums them
+        out = data3d.reshape(
+            out_shape[0],
+            time_decimation_factor,
+            out_shape[1],
+            out_shape[2],
+            frequency_decimation_factor,
+        ).sum(axis=(1, 4), dtype=acc_dtype)
+
+    return out if data.ndim == 3 else out[:, 0, :]
+
+
+def block_decimate(
+    data, time_decimation_factor=1, frequency_decimation_factor=1, use_numba=False
+):
+    """
+    Average adjacent blocks of time samples and frequency channels. The blocks are
+    summed in an integer accumulator (for integer data) and only divided at the end, so
+    no full size float copy of the data is made.
+
+    Args:
+        data (numpy.ndarray): data of shape (nt, nf) or (nt, nifs, nf)
+        time_decimation_factor (int): number of adjacent time samples to average
+        frequency_decimation_factor (int): number of adjacent frequency channels to
+        average
+        use_numba (bool): use the numba kernel instead of numpy
+
+    Returns:
+        numpy.ndarray: float32 decimated data of shape (nt // time_decimation_factor,
+        [nifs,] nf // frequency_decimation_factor)
+
+    """
+    summed = block_sum(
+        data, time_decimation_factor, frequency_decimation_factor, use_numba
+    )
+    return np.divide(
+        summed,
+        time_decimation_factor * frequency_decimation_factor,
+        dtype=np.float32,
+    )
@@ -1,12 +1,238 @@
 import logging
 import math
+import os
 import subprocess
+import threading
+from functools import lru_cache
 
 import numpy as np
 from numba import cuda
 
+from your.utils.batch import delay_tables, group_candidates, stack_data
+
 logger = logging.getLogger(__name__)
 
+# dtypes of the data the kernels are compiled for, other data is copied to the GPU as
+# float32
+DATA_TYPES = ("uint8", "int16", "uint16", "int32", "float32")
+
+
+def _dedisperse_kernel(cand_data_in, chan_freqs, dm, cand_data_out, tsamp):
+    ii, jj = cuda.grid(2)
+    if ii < cand_data_in.shape[0] and jj < cand_data_in.shape[1]:
+        disp_time = int(
+            round(
+                -4148808.0
+                * dm
+                * (1 / (chan_freqs[0]) ** 2 - 1 / (chan_freqs[ii]) ** 2)
+                / 1000
+                / tsamp
+            )
+        )
+        cand_data_out[ii, jj] = cand_data_in[
+            ii, (jj + disp_time) % cand_data_in.shape[1]
+        ]
+
+
+def _dmt_kernel(cand_data_in, chan_freqs, dms, cand_data_out, tsamp):
+    ii, jj, kk = cuda.grid(3)
+    if ii < cand_data_in.shape[0] and jj < cand_data_in.shape[1] and kk < dms.shape[0]:
+        disp_time = int(
+            round(
+                -1
+                * 4148808.0
+                * dms[kk]
+                * (1 / (chan_freqs[0]) ** 2 - 1 / (chan_freqs[ii]) ** 2)
+                / 1000
+                / tsamp
+            )
+        )
+        cuda.atomic.add(
+            cand_data_out,
+            (kk, jj),
+            cand_data_in[ii, (jj + disp_time) % cand_data_in.shape[1]],
+        )
+
+
+def _sum_shifted_kernel(data_in, shifts, start, tdf, group, data_out):
+    # data_out[n, k, c, j] is the sum of the samples (start + j) * tdf to
+    # (start + j + 1) * tdf - 1 of the channels c * group to (c + 1) * group - 1 of
+    # the candidate n, each shifted by shifts[n, k, channel]
+
+    jj, ii, nk = cuda.grid(3)
+    nn = nk // data_out.shape[1]
+    kk = nk % data_out.shape[1]
+    row = ii // group
+    col = jj // tdf
+    if nn < data_out.shape[0] and row < data_out.shape[2] and col < data_out.shape[3]:
+        cuda.atomic.add(
+            data_out,
+            (nn, kk, row, col),
+            data_in[nn, ii, (start * tdf + jj - shifts[nn, kk, ii]) % data_in.shape[2]],
+        )
+
+
+def _zero_kernel(data):
+    ii = cuda.grid(1)
+    if ii < data.shape[0]:
+        data[ii] = 0
+
+
+SIGNATURES = {
+    _dedisperse_kernel: [
+        f"void({t}[:, ::1], float32[::1], float64, {t}[:, ::1], float64)"
+        for t in DATA_TYPES
+    ],
+    _dmt_kernel: [
+        f"void({t}[:, ::1], float32[::1], float32[::1], float32[:, ::1], float64)"
+        for t in DATA_TYPES
+    ],
+    _sum_shifted_kernel: [
+        f"void({t}[:, :, ::1], int32[:, :, ::1], int64, int64, int64, "
+        "float32[:, :, :, ::1])"
+        for t in DATA_TYPES
+    ],
+    _zero_kernel: ["void(float32[::1])"],
+}
+
+
+@lru_cache(maxsize=None)
+def _compile(kernel):
+    """
+    Compile a kernel for all its signatures, once per process, on first use (so that
+    importing this module does not need a GPU).
+    """
+    logger.debug(f"Compiling {kernel.__name__}")
+    return cuda.jit(SIGNATURES[kernel])(kernel)
+
+
+class _DeviceState(threading.local):
+    """
+    CUDA context of a thread: the selected device, its stream and the device buffers
+    kept between calls.
+    """
+
+    def __init__(self):
+        self.device = None
+        self.stream = None
+        self.buffers = {}
+
+
+_state = _DeviceState()
+
+
+def _after_fork():
+    """
+    Forget the context inherited by a forked child process, the child has to create its
+    own.
+    """
+    global _state
+    _state = _DeviceState()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _select_device(device):
+    """
+    Make the context of the device current, creating it only if the thread was using
+    another device (or none).
+
+    Returns:
+        numba.cuda.cudadrv.driver.Stream: stream of the device
+    """
+    if _state.device != device:
+        if _state.device is not None:
+            release_gpu()
+        cuda.select_device(device)
+        _state.device = device
+        _state.stream = cuda.stream()
+        logger.debug(f"Created CUDA context and stream on the GPU {device}")
+    return _state.stream
+
+
+def _device_buffer(name, shape, dtype):
+    """
+    Device array of the thread called `name`, allocated again only if its shape or dtype
+    changes.
+    """
+    dtype = np.dtype(dtype)
+    shape = tuple(int(s) for s in shape)
+    buffer = _state.buffers.get(name)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = cuda.device_array(shape, dtype=dtype, stream=_state.stream)
+        _state.buffers[name] = buffer
+    return buffer
+
+
+def _to_device(name, array):
+    """
+    Copy an array into the device buffer `name`.
+    """
+    array = np.ascontiguousarray(array)
+    buffer = _device_buffer(name, array.shape, array.dtype)
+    buffer.copy_to_device(array, stream=_state.stream)
+    return buffer
+
+
+def _data_to_device(data, dtype):
+    """
+    Copy the (time, frequency) data to the device as a (frequency, time) array of dtype
+    (or float32 if the kernels are not compiled for dtype).
+    """
+    if np.dtype(dtype).name not in DATA_TYPES:
+        dtype = np.float32
+    return _to_device("data_in", np.asarray(data.T, dtype=dtype))
+
+
+def _sum_shifted(data_in, shifts, start, tdf, group, data_out, stream):
+    """
+    Zero data_out and accumulate the shifted and decimated channels of the candidates
+    into it, see `_sum_shifted_kernel`.
+    """
+    _zero(data_out, stream)
+    ncand, ndm, nrows, ncols = data_out.shape
+    # a warp adds consecutive samples of a channel, which mostly go to different output
+    # samples
+    threadsperblock = (32, 1, 32) if ndm > 1 else (32, 32, 1)
+    blockspergrid = _blocks((ncols * tdf, nrows * group, ncand * ndm), threadsperblock)
+    _compile(_sum_shifted_kernel)[blockspergrid, threadsperblock, stream](
+        data_in, shifts, int(start), int(tdf), int(group), data_out
+    )
+
+
+def _zero(buffer, stream):
+    """
+    Zero a float32 device buffer, before accumulating into it.
+    """
+    buffer = buffer.reshape(-1)
+    threadsperblock = 256
+    _compile(_zero_kernel)[
+        math.ceil(buffer.shape[0] / threadsperblock), threadsperblock, stream
+    ](buffer)
+
+
+def _blocks(shape, threadsperblock):
+    """
+    Number of blocks of threadsperblock threads to cover an array of shape.
+    """
+    return tuple(math.ceil(s / t) for s, t in zip(shape, threadsperblock))
+
+
+def release_gpu():
+    """
+    Free the device buffers and close the CUDA context of this thread. The GPU functions
+    keep them open between calls, so that the candidates after the first do not pay for
+    creating the context and allocating the arrays.
+    """
+    if _state.device is not None:
+        logger.debug(f"Closing the CUDA context on the GPU {_state.device}")
+        _state.buffers.clear()
+        _state.stream = None
+        _state.device = None
+        cuda.close()
+
 
 def gpu_dedisperse(cand, device=0):
     """
@@ -21,37 +247,17 @@ def gpu_dedisperse(cand, device=0):
         candidate object
 
     """
-    cuda.select_device(device)
-    chan_freqs = cuda.to_device(np.array(cand.chan_freqs, dtype=np.float32))
-    cand_data_in = cuda.to_device(np.array(cand.data.T, dtype=cand.your_header.dtype))
-    cand_data_out = cuda.to_device(
-        np.zeros_like(cand.data.T, dtype=cand.your_header.dtype)
+    stream = _select_device(device)
+    chan_freqs = _to_device("chan_freqs", np.array(cand.chan_freqs, dtype=np.float32))
+    cand_data_in = _data_to_device(cand.data, cand.your_header.dtype)
+    cand_data_out = _device_buffer(
+        "dedispersed", cand_data_in.shape, cand_data_in.dtype
     )
 
-    @cuda.jit
-    def gpu_dedisp(cand_data_in, chan_freqs, dm, cand_data_out, tsamp):
-        ii, jj = cuda.grid(2)
-        if ii < cand_data_in.shape[0] and jj < cand_data_in.shape[1]:
-            disp_time = int(
-                round(
-                    -4148808.0
-                    * dm
-                    * (1 / (chan_freqs[0]) ** 2 - 1 / (chan_freqs[ii]) ** 2)
-                    / 1000
-                    / tsamp
-                )
-            )
-            cand_data_out[ii, jj] = cand_data_in[
-                ii, (jj + disp_time) % cand_data_in.shape[1]
-            ]
-
     threadsperblock = (32, 32)
-    blockspergrid_x = math.ceil(cand_data_in.shape[0] / threadsperblock[0])
-    blockspergrid_y = math.ceil(cand_data_in.shape[1] / threadsperblock[1])
+    blockspergrid = _blocks(cand_data_in.shape, threadsperblock)
 
-    blockspergrid = (blockspergrid_x, blockspergrid_y)
-
-    gpu_dedisp[blockspergrid, threadsperblock](
+    _compile(_dedisperse_kernel)[blockspergrid, threadsperblock, stream](
         cand_data_in,
         chan_freqs,
         float(cand.dm),
@@ -59,14 +265,13 @@ def gpu_dedisperse(cand, device=0):
         float(cand.your_header.tsamp),
     )
 
-    cand.dedispersed = cand_data_out.copy_to_host().T
-
-    cuda.close()
+    cand.dedispersed = cand_data_out.copy_to_host(stream=stream).T
+    stream.synchronize()
 
     return cand
 
 
-def gpu_dmt(cand, device=0):
+def gpu_dmt(cand, device=0, dmsteps=256):
     """
 
     GPU DM-Time bow-tie (by rolling the array)
@@ -74,240 +279,115 @@ def gpu_dmt(cand, device=0):
     Args:
         cand: Candidate instance
         device (int): GPU ID
+        dmsteps (int): Number of DMs to dedisperse at
 
     Returns:
         candidate object
 
     """
-    cuda.select_device(device)
-    chan_freqs = cuda.to_device(np.array(cand.chan_freqs, dtype=np.float32))
-    dm_list = cuda.to_device(np.linspace(0, 2 * cand.dm, 256, dtype=np.float32))
-    dmt_return = cuda.to_device(np.zeros((256, cand.data.shape[0]), dtype=np.float32))
-    cand_data_in = cuda.to_device(np.array(cand.data.T, dtype=cand.data.dtype))
-
-    @cuda.jit
-    def gpu_dmt(cand_data_in, chan_freqs, dms, cand_data_out, tsamp):
-        ii, jj, kk = cuda.grid(3)
-        if (
-            ii < cand_data_in.shape[0]
-            and jj < cand_data_in.shape[1]
-            and kk < dms.shape[0]
-        ):
-            disp_time = int(
-                round(
-                    -1
-                    * 4148808.0
-                    * dms[kk]
-                    * (1 / (chan_freqs[0]) ** 2 - 1 / (chan_freqs[ii]) ** 2)
-                    / 1000
-                    / tsamp
-                )
-            )
-            cuda.atomic.add(
-                cand_data_out,
-                (kk, jj),
-                cand_data_in[ii, (jj + disp_time) % cand_data_in.shape[1]],
-            )
+    stream = _select_device(device)
+    chan_freqs = _to_device("chan_freqs", np.array(cand.chan_freqs, dtype=np.float32))
+    dm_list = _to_device(
+        "dm_list", np.linspace(0, 2 * cand.dm, dmsteps, dtype=np.float32)
+    )
+    cand_data_in = _data_to_device(cand.data, cand.data.dtype)
+    dmt_return = _device_buffer("dmt", (dmsteps, cand.data.shape[0]), np.float32)
+    _zero(dmt_return, stream)
 
     threadsperblock = (16, 8, 8)
-    blockspergrid_x = math.ceil(cand_data_in.shape[0] / threadsperblock[0])
-    blockspergrid_y = math.ceil(cand_data_in.shape[1] / threadsperblock[1])
-    blockspergrid_z = math.ceil(dm_list.shape[0] / threadsperblock[2])
-
-    blockspergrid = (blockspergrid_x, blockspergrid_y, blockspergrid_z)
+    blockspergrid = _blocks(
+        (cand_data_in.shape[0], cand_data_in.shape[1], dm_list.shape[0]),
+        threadsperblock,
+    )
 
-    gpu_dmt[blockspergrid, threadsperblock](
+    _compile(_dmt_kernel)[blockspergrid, threadsperblock, stream](
         cand_data_in, chan_freqs, dm_list, dmt_return, float(cand.your_header.tsamp)
     )
 
-    cand.dmt = dmt_return.copy_to_host()
-
-    cuda.close()
+    cand.dmt = dmt_return.copy_to_host(stream=stream)
+    stream.synchronize()
 
     return cand
 
 
-def gpu_dedisp_and_dmt_crop(cand, device=0):
+def gpu_dedisp_and_dmt_crop_batch(cands, device=0, size=256):
     """
 
-    GPU based dedispersion, DM time bow-time plot and crop it to 256x256 shaped arrays (by rolling the array)
+    GPU based dedispersion, DM time bow-time plot and crop of a batch of candidates (see
+    `gpu_dedisp_and_dmt_crop`). The candidates whose chunks have the same shape are
+    copied to the GPU together and processed by one launch of the kernel for all their
+    dedispersed arrays and one for all their DM-time arrays.
 
     Args:
-        cand: Candidate instance
+        cands (list): Candidate instances
         device (int): GPU ID
+        size (int): Number of DMs of the DM-time array and of time samples (and at least
+        the number of channels) of the outputs
 
     Returns:
-        candidate object
+        list: candidate objects
 
     """
-
-    if cand.width < 3:
-        time_decimation_factor = 1
-    else:
-        time_decimation_factor = cand.width // 2
-
-    if cand.data.shape[1] < 256:
-        raise IndexError("GPU candmaker will not work if nchans < 256.")
-
-    frequency_decimation_factor = math.floor(cand.data.shape[1] // 256)
-
-    logger.debug(f"Freq decimation factor: {frequency_decimation_factor}")
-    logger.debug(f"Time decimation factor: {time_decimation_factor}")
-
-    cuda.select_device(device)
-    stream = cuda.stream()
-
-    logger.debug("Created CUDA Stream")
-
-    chan_freqs = cuda.to_device(
-        np.array(cand.chan_freqs, dtype=np.float32), stream=stream
-    )
-    cand_data_in = cuda.to_device(
-        np.array(cand.data.T, dtype=cand.your_header.dtype), stream=stream
-    )
-    dmt_on_device = cuda.device_array(
-        (256, int(cand.data.shape[0] // time_decimation_factor)),
-        dtype=np.float32,
-        stream=stream,
-    )
-    cand_dedispersed_on_device = cuda.device_array(
-        (
-            int(cand.data.shape[1] / frequency_decimation_factor),
-            int(cand.data.shape[0] // time_decimation_factor),
-        ),
-        dtype=np.float32,
-        stream=stream,
-    )
-    cand_dedispersed_out = cuda.device_array(
-        shape=(int(cand.data.shape[1] / frequency_decimation_factor), 256),
-        dtype=np.float32,
-        stream=stream,
-    )
-    dmt_return = cuda.device_array(shape=(256, 256), dtype=np.float32, stream=stream)
-    dm_list = cuda.to_device(
-        np.linspace(0, 2 * cand.dm, 256, dtype=np.float32), stream=stream
-    )
-
-    logger.debug("Allocated arrays on the GPU")
-
-    @cuda.jit
-    def crop_time(data_in, data_out, side_stride):
-        ii, jj = cuda.grid(2)
-        if ii < data_out.shape[0] and jj < data_out.shape[1]:
-            data_out[ii, jj] = data_in[ii, jj + side_stride]
-
-    @cuda.jit
-    def gpu_dedisp(
-        cand_data_in,
-        chan_freqs,
-        dm,
-        cand_data_out,
-        tsamp,
-        time_decimation_factor,
-        frequency_decimation_factor,
-    ):
-        ii, jj = cuda.grid(2)
-        if ii < cand_data_in.shape[0] and jj < cand_data_in.shape[1]:
-            disp_time = int(
-                round(
-                    -4148808.0
-                    * dm
-                    * (1 / (chan_freqs[0]) ** 2 - 1 / (chan_freqs[ii]) ** 2)
-                    / 1000
-                    / tsamp
-                )
-            )
-            cuda.atomic.add(
-                cand_data_out,
-                (
-                    int(ii / frequency_decimation_factor),
-                    int(jj / time_decimation_factor),
-                ),
-                cand_data_in[ii, (jj + disp_time) % cand_data_in.shape[1]],
-            )
-
-    threadsperblock_2d = (32, 32)
-    blockspergrid_x_2d_in = math.ceil(cand_data_in.shape[0] / threadsperblock_2d[0])
-    blockspergrid_y_2d_in = math.ceil(cand_data_in.shape[1] / threadsperblock_2d[1])
-
-    blockspergrid_2d_in = (blockspergrid_x_2d_in, blockspergrid_y_2d_in)
-
-    gpu_dedisp[blockspergrid_2d_in, threadsperblock_2d, stream](
-        cand_data_in,
-        chan_freqs,
-        float(cand.dm),
-        cand_dedispersed_on_device,
-        float(cand.your_header.tsamp),
-        int(time_decimation_factor),
-        int(frequency_decimation_factor),
-    )
-
-    blockspergrid_x_2d_out = math.ceil(
-        cand_dedispersed_on_device.shape[0] / threadsperblock_2d[0]
-    )
-    blockspergrid_y_2d_out = math.ceil(
-        cand_dedispersed_on_device.shape[1] / threadsperblock_2d[0]
-    )
-
-    blockspergrid_2d_out = (blockspergrid_x_2d_out, blockspergrid_y_2d_out)
-    crop_time[blockspergrid_2d_out, threadsperblock_2d, stream](
-        cand_dedispersed_on_device,
-        cand_dedispersed_out,
-        int(int(cand_dedispersed_on_device.shape[1] / 2) - 128),
-    )
-    cand.dedispersed = cand_dedispersed_out.copy_to_host(stream=stream).T
-
-    logger.debug("cand.dedisersed set!")
-
-    disp_time = np.zeros(shape=(cand_data_in.shape[0], 256), dtype=np.int32)
-    for idx, dms in enumerate(np.linspace(0, 2 * cand.dm, 256)):
-        disp_time[:, idx] = np.round(
-            -1
-            * 4148808.0
-            * dms
-            * (1 / (cand.chan_freqs[0]) ** 2 - 1 / (cand.chan_freqs) ** 2)
-            / 1000
-            / cand.your_header.tsamp
+    groups = group_candidates(cands, size)
+    stream = _select_device(device)
+    for key, group in groups.items():
+        nt, nf, time_decimation_factor, frequency_decimation_factor, start = key
+        logger.debug(
+            f"Processing {len(group)} candidates, "
+            f"freq decimation factor: {frequency_decimation_factor}, "
+            f"time decimation factor: {time_decimation_factor}"
         )
+        ft_shifts, dmt_shifts = delay_tables(group, size)
+        cand_data_in = _to_device("batch_data_in", stack_data(group, DATA_TYPES))
+        ft_shifts = _to_device("ft_shifts", ft_shifts)
+        dmt_shifts = _to_device("dmt_shifts", dmt_shifts)
+        nrows = nf // frequency_decimation_factor
+        dedispersed = _device_buffer(
+            "dedispersed_crop", (len(group), 1, nrows, size), np.float32
+        )
+        dmt = _device_buffer("dmt_crop", (len(group), size, 1, size), np.float32)
+
+        logger.debug("Copied the data and delays to the GPU")
+
+        _sum_shifted(
+            cand_data_in,
+            ft_shifts,
+            start,
+            time_decimation_factor,
+            frequency_decimation_factor,
+            dedispersed,
+            stream,
+        )
+        _sum_shifted(
+            cand_data_in, dmt_shifts, start, time_decimation_factor, nf, dmt, stream
+        )
+        dedispersed = dedispersed.copy_to_host(stream=stream)
+        dmt = dmt.copy_to_host(stream=stream)
+        stream.synchronize()
 
-    all_delays = cuda.to_device(disp_time, stream=stream)
-
-    @cuda.jit
-    def gpu_dmt(cand_data_in, all_delays, dms, cand_data_out, time_decimation_factor):
-        ii, jj, kk = cuda.grid(3)
-        if (
-            ii < cand_data_in.shape[0]
-            and jj < cand_data_in.shape[1]
-            and kk < dms.shape[0]
-        ):
-            cuda.atomic.add(
-                cand_data_out,
-                (kk, int(jj / time_decimation_factor)),
-                cand_data_in[ii, (jj + all_delays[ii, kk]) % cand_data_in.shape[1]],
-            )
-
-    threadsperblock_3d = (1, 32, 32)
-    blockspergrid_x = math.ceil(cand_data_in.shape[0] / threadsperblock_3d[0])
-    blockspergrid_y = math.ceil(cand_data_in.shape[1] / threadsperblock_3d[1])
-    blockspergrid_z = math.ceil(dm_list.shape[0] / threadsperblock_3d[2])
+        for ii, cand in enumerate(group):
+            cand.dedispersed = dedispersed[ii, 0].T
+            cand.dmt = dmt[ii, :, 0]
+    return cands
 
-    blockspergrid = (blockspergrid_x, blockspergrid_y, blockspergrid_z)
 
-    gpu_dmt[blockspergrid, threadsperblock_3d, stream](
-        cand_data_in, all_delays, dm_list, dmt_on_device, int(time_decimation_factor)
-    )
+def gpu_dedisp_and_dmt_crop(cand, device=0, size=256):
+    """
 
-    crop_time[blockspergrid_2d_out, threadsperblock_2d, stream](
-        dmt_on_device,
-        dmt_return,
-        int(int(cand_dedispersed_on_device.shape[1] / 2) - 128),
-    )
+    GPU based dedispersion, DM time bow-time plot and crop it to 256x256 shaped arrays
+    (by rolling the array)
 
-    cand.dmt = dmt_return.copy_to_host(stream=stream)
+    Args:
+        cand: Candidate instance
+        device (int): GPU ID
+        size (int): Number of DMs of the DM-time array and of time samples (and at least
+        the number of channels) of the outputs
 
-    logger.debug("cand.dmt set!")
+    Returns:
+        candidate object
 
-    cuda.close()
+    """
+    gpu_dedisp_and_dmt_crop_batch([cand], device=device, size=size)
     return cand
 
 
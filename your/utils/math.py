@@ -3,7 +3,6 @@ import math
 from functools import reduce
 
 import numpy as np
-from scipy import stats
 
 
 def bandpass_fitter(
@@ -29,6 +28,8 @@ def bandpass_fitter(
     diff = bandpass - poly(
         channels
     )  # find the difference between fitted and real bandpass
+    from scipy import stats
+
     std_diff = stats.median_abs_deviation(diff, scale="normal")
     logging.debug("Standard Deviation of fit: %f:.4f", std_diff)
     mask = np.abs(diff - np.median(diff)) < mask_sigma * std_diff
@@ -160,6 +161,8 @@ def smad_plotter(
     Returns:
         np.ndarray: clipped/flagged data
     """
+    from scipy import stats
+
     medians = np.median(freq_time, axis=0)
     sigs = 1.4826 * sigma * stats.median_abs_deviation(freq_time, axis=0)
     if clip:
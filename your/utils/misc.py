@@ -9,8 +9,6 @@ import argparse
 import json
 import os
 
-from skimage.transform import resize
-
 
 def _decimate(data, decimate_factor, axis, pad=False, **kwargs):
     """
@@ -64,6 +62,8 @@ def _resize(data, size, axis, **kwargs):
         np.ndarray: Resized array
 
     """
+    from skimage.transform import resize
+
     if axis:
         return resize(data, (data.shape[0], size), **kwargs)
     else:
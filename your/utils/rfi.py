@@ -1,8 +1,6 @@
 import logging
 
 import numpy as np
-from scipy import stats
-from scipy.signal import savgol_filter as sg
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +38,8 @@ def savgol_filter(bandpass, channel_bandwidth, frequency_window=15, sigma=6):
 
     logger.debug(f"Window size for savgol filter is {window}.")
 
+    from scipy.signal import savgol_filter as sg
+
     y = sg(bandpass, window, 2)
     sub = bandpass - y
     sigma = sigma * np.std(sub)
@@ -92,6 +92,8 @@ def sk_filter(data, channel_bandwidth, tsamp, N=None, d=None, sigma=5):
     nan_mask = np.isnan(sk)
     sk[nan_mask] = np.nan
     sk_c = sk[~nan_mask]
+    from scipy import stats
+
     std = 1.4826 * stats.median_abs_deviation(sk_c)
     h = np.median(sk_c) + sigma * std
     l = np.median(sk_c) - sigma * std
@@ -41,6 +41,7 @@ class Writer:
         time_decimation_factor (int): Time Decimation Factor (in number of samples)
         frequency_decimation_factor (int): Frequency Decimation Factor (in number of samples)
         replacement_policy (str): Replace flagged values with mean, median or zeros.
+        workers (int): Number of threads decoding PSRFITS subints while reading
 
     """
 
@@ -65,6 +66,7 @@ class Writer:
         time_decimation_factor=1,
         frequency_decimation_factor=1,
         replacement_policy="mean",
+        workers=1,
     ):
         self.your_object = your_object
         self.nstart = nstart
@@ -88,6 +90,7 @@ class Writer:
             raise NotImplementedError("We have not implemented this feature yet.")
 
         self.replacement_policy = replacement_policy
+        self.workers = workers
 
         if self.replacement_policy not in ["mean", "median", "zero"]:
             raise ValueError(
@@ -149,6 +152,14 @@ class Writer:
         for arg, value in sorted(vars(self).items()):
             logging.debug("Attribute %s: %r", arg, value)
 
+    @property
+    def copy_on_read(self):
+        """
+        Data is only modified in place when flagging RFI or subtracting the zero DM time
+        series, otherwise it can be read without a copy.
+        """
+        return self.flag_rfi or self.zero_dm_subt
+
     @property
     def chan_min(self):
         if self.c_min:
@@ -197,7 +208,7 @@ class Writer:
         else:
             raise ValueError("npoln can only be 1 or 4.")
 
-    def get_data_to_write(self, start_sample, nsamp):
+    def get_data_to_write(self, start_sample, nsamp, data=None):
         """
 
         Read data to self.data, selects channels
@@ -207,15 +218,25 @@ class Writer:
 
             start_sample (int): Start sample number to read from
             nsamp (int): Number of samples to read
+            data (np.ndarray): Already read data of the selected channels (e.g. from
+            `Your.iter_chunks`) to use instead of reading it again
 
         """
-        data = self.your_object.get_data(start_sample, nsamp, npoln=self.npoln)
+        if data is None:
+            data = self.your_object.get_data(
+                start_sample,
+                nsamp,
+                npoln=self.npoln,
+                copy=self.copy_on_read,
+                c_min=self.chan_min,
+                c_max=self.chan_max,
+                workers=self.workers,
+            )
 
         if self.npoln == 1:
             data = np.expand_dims(data, 1)
 
-        # shape of data is (nt, npoln, nf)
-        data = data[:, :, self.chan_min : self.chan_max]
+        # shape of data is (nt, npoln, nf), only the selected channels are read
         if self.flag_rfi:
             for i in range(data.shape[1]):
                 data_to_flag = data[:, i, :]
@@ -261,7 +282,7 @@ class Writer:
                     max_value,
                 )
 
-        data = data.astype(self.your_object.your_header.dtype)
+        data = data.astype(self.your_object.your_header.dtype, copy=False)
 
         # shape of data is (nt, npoln, nf)
         if self.highest_frequency_first and self.your_object.your_header.foff > 0:
@@ -308,25 +329,30 @@ class Writer:
                 raise IOError("Failed to write the filterbank file")
 
             if data == None:
-                # get the nstart and number of samples to write
-                start_sample = self.nstart
-                samples_left = self.nsamp
-
                 # open the file
                 with open(self.outname, "ab") as f:
-                    # read till there are spectra to read
-                    while samples_left > 0:
-                        self.get_data_to_write(start_sample, self.gulp)
+                    # read till there are spectra to read, next gulp is read while this
+                    # one is written
+                    for start_sample, data in self.your_object.iter_chunks(
+                        self.gulp,
+                        nstart=self.nstart,
+                        nsamp=self.nsamp,
+                        npoln=self.npoln,
+                        copy=self.copy_on_read,
+                        c_min=self.chan_min,
+                        c_max=self.chan_max,
+                        workers=self.workers,
+                    ):
+                        self.get_data_to_write(start_sample, len(data), data=data)
                         self.data = self.data.squeeze()
                         # goto the end of the file and dump
                         f.seek(0, os.SEEK_END)
                         f.write(self.data.ravel())
-                        progress.update(task, advance=self.gulp)
+                        progress.update(task, advance=len(data))
                         logger.debug(
-                            f"Wrote from spectra {start_sample}-{start_sample + self.gulp} to the filterbank"
+                            f"Wrote from spectra {start_sample}-"
+                            f"{start_sample + len(data)} to the filterbank"
                         )
-                        start_sample += self.gulp
-                        samples_left -= self.gulp
             else:
                 if data.dtype == self.your_object.your_header.dtype:
                     logger.debug(f"write data of shape {data.shape} to {self.outname}")
@@ -396,7 +422,20 @@ class Writer:
             else:
                 task = progress.add_task("[green]Writing...", total=nsubints)
 
-            for istart in np.arange(0, nsubints, n_read_subints):
+            # the next n_read_subints are read while the current ones are written
+            chunks = self.your_object.iter_chunks(
+                n_read_subints * npsub,
+                nstart=st,
+                nsamp=nsubints * npsub,
+                npoln=self.npoln,
+                copy=self.copy_on_read,
+                c_min=self.chan_min,
+                c_max=self.chan_max,
+                workers=self.workers,
+            )
+            for istart, (st, data) in zip(
+                np.arange(0, nsubints, n_read_subints), chunks
+            ):
                 istop = istart + n_read_subints
                 if istop > nsubints:
                     istop = nsubints
@@ -409,11 +448,9 @@ class Writer:
                 )
 
                 # Read in nread samples from filfile
-                nread = isub * npsub
-                self.get_data_to_write(st, nread)
+                self.get_data_to_write(st, len(data), data=data)
                 progress.update(task, advance=n_read_subints)
                 data = self.data
-                st += nread
 
                 nvals = isub * npsub  # * nifs
                 if data.shape[0] < nvals:
@@ -515,11 +552,18 @@ class Writer:
             else:
                 task = progress.add_task("[green]Reading...", total=self.nsamp)
 
-            for data_read in range(
-                self.nstart, self.nstart + self.nsamp, self.data_step
+            for data_read, data in self.your_object.iter_chunks(
+                self.data_step,
+                nstart=self.nstart,
+                nsamp=self.nsamp,
+                npoln=self.npoln,
+                copy=self.copy_on_read,
+                c_min=self.chan_min,
+                c_max=self.chan_max,
+                workers=self.workers,
             ):
                 logger.debug(f"Data read is {data_read}, Data step is {self.data_step}")
-                self.get_data_to_write(data_read, self.data_step)
+                self.get_data_to_write(data_read, len(data), data=data)
                 self.DM.dump_header(header)
                 self.DM.dump_data(self.data.flatten())
                 progress.update(task, advance=self.data_step)
@@ -2,11 +2,16 @@
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 
 import numpy as np
 
+from your.array import YourArray
 from your.formats.psrfits import PsrfitsFile
 from your.formats.pysigproc import SigprocFile
+from your.utils.astro import mjd2isot, radec2galactic
+from your.utils.decimate import block_decimate
 from your.utils.misc import MyEncoder, check_file_exist
 
 logger = logging.getLogger(__name__)
@@ -20,6 +25,15 @@ class Your(PsrfitsFile, SigprocFile):
 
     Args:
         file: String or a list of files. It can either filterbank or psrfits files.
+        subint_cache_mb (float): Size of the cache of decoded PSRFITS subints of this
+        object (MB). Repeated reads of the same subints (e.g. candidates close in time)
+        are then served from the cache. The cache is disabled if 0 or None.
+        use_header_index (bool): Keep the PSRFITS header values in an index file next to
+        the files, so that opening the same observation again does not read the headers.
+        Defaults to the YOUR_HEADER_INDEX environment variable ("1" to use the index).
+        subint_cache (SubintCache): Cache of decoded PSRFITS subints to use instead of a
+        cache of this object, e.g. `your.formats.psrfits.SUBINT_CACHE` to share it with
+        the other objects of the process.
 
     Examples:
         your_object = your.Your("/path/to/filterbank.fil")
@@ -30,7 +44,9 @@ class Your(PsrfitsFile, SigprocFile):
 
     """
 
-    def __init__(self, file):
+    def __init__(
+        self, file, subint_cache_mb=None, use_header_index=None, subint_cache=None
+    ):
         self.your_file = file
         if isinstance(self.your_file, str):
             ext = os.path.splitext(self.your_file)[1]
@@ -69,7 +85,16 @@ class Your(PsrfitsFile, SigprocFile):
 
         logger.debug(f"Reading the file(s): {self.your_file}")
         self.formatclass = FORMATS[self.format]
-        self.formatclass.__init__(self, self.your_file)
+        if self.format == "fits":
+            self.formatclass.__init__(
+                self,
+                self.your_file,
+                subint_cache_mb=subint_cache_mb,
+                use_header_index=use_header_index,
+                subint_cache=subint_cache,
+            )
+        else:
+            self.formatclass.__init__(self, self.your_file)
         if not self.source_name:
             logger.info(
                 "Source name not present in the file. Setting source name to TEMP"
@@ -77,6 +102,12 @@ class Your(PsrfitsFile, SigprocFile):
             self.source_name = "TEMP"
         self.your_header = Header(self)
 
+    def __getstate__(self):
+        return self.formatclass.__getstate__(self)
+
+    def __setstate__(self, state):
+        FORMATS[state["format"]].__setstate__(self, state)
+
     @property
     def chan_freqs(self):
         """
@@ -155,6 +186,104 @@ class Your(PsrfitsFile, SigprocFile):
         logger.debug(f"Generating bandpass using {ns} spectra.")
         return self.get_data(nstart=0, nsamp=int(ns)).mean(0)
 
+    def as_array(self, chunk_mb=256, workers=1):
+        """
+        Read-only array view of the data, of shape (nspectra, npol, nchans). Data is
+        only read when the view is indexed, and only the spectra and channels the index
+        spans.
+
+        Args:
+            chunk_mb (float): Maximum size of each read (MB)
+            workers (int): Number of threads decoding PSRFITS subints
+
+        Examples:
+            data = your_object.as_array()
+            spectra = data[1000:2000, 0, 100:200]
+
+        Returns:
+            YourArray: the array view
+
+        """
+        return YourArray(self, chunk_mb=chunk_mb, workers=workers)
+
+    def chunk_blocks(self, gulp, overlap=0, nstart=0, nsamp=None):
+        """
+        Plan the consecutive blocks of data read by `iter_chunks`.
+
+        Args:
+            gulp (int): number of samples to step forward by for every block
+            overlap (int): number of extra samples to read at the end of every block
+            nstart (int): start sample
+            nsamp (int): number of samples to iterate over (default: till the end of the
+            data)
+
+        Note:
+            Blocks are clipped at `nstart + nsamp`, so the last block (and its overlap)
+            can be shorter than `gulp + overlap`.
+
+        Yields:
+            tuple: (start sample, number of samples) of every block
+
+        """
+        if gulp <= 0:
+            raise ValueError(f"gulp ({gulp}) should be a positive integer.")
+        if overlap < 0:
+            raise ValueError(f"overlap ({overlap}) cannot be negative.")
+
+        if nsamp is None:
+            nsamp = self.your_header.nspectra - nstart
+        nend = int(nstart + nsamp)
+        for start in range(int(nstart), nend, int(gulp)):
+            yield start, min(start + int(gulp) + int(overlap), nend) - start
+
+    def iter_chunks(self, gulp, overlap=0, nstart=0, nsamp=None, **kwargs):
+        """
+        Iterate over consecutive blocks of data. The next block is read on a background
+        thread while the current one is being processed by the caller.
+
+        Args:
+            gulp (int): number of samples to step forward by for every block
+            overlap (int): number of extra samples to read at the end of every block
+            (e.g. maximum dispersion delay)
+            nstart (int): start sample
+            nsamp (int): number of samples to iterate over (default: till the end of the
+            data)
+            **kwargs: arguments passed on to `get_data` (e.g. pol, npoln, decimation
+            factors)
+
+        Note:
+            Blocks are clipped at `nstart + nsamp`, so the last block (and its overlap)
+            can be shorter than `gulp + overlap`.
+
+        Examples:
+            for start, data in your_object.iter_chunks(4096, overlap=max_delay):
+                process(start, data)
+
+        Yields:
+            tuple: (start sample of the block, numpy.ndarray of data)
+
+        """
+        blocks = list(self.chunk_blocks(gulp, overlap, nstart, nsamp))
+        if not blocks:
+            return
+
+        def read(block):
+            return self.get_data(*block, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(read, blocks[0])
+            try:
+                for i, (start, _) in enumerate(blocks):
+                    data = future.result()
+                    if i + 1 < len(blocks):
+                        logger.debug(
+                            f"Prefetching block starting at sample {blocks[i + 1][0]}"
+                        )
+                        future = executor.submit(read, blocks[i + 1])
+                    yield start, data
+            finally:
+                future.cancel()
+
     def get_data(
         self,
         nstart: int,
@@ -163,6 +292,12 @@ class Your(PsrfitsFile, SigprocFile):
         frequency_decimation_factor=None,
         pol: int = 0,
         npoln: int = 1,
+        copy: bool = True,
+        out=None,
+        c_min: int = None,
+        c_max: int = None,
+        workers: int = 1,
+        use_numba: bool = False,
     ):
         """
         Read data from files
@@ -174,11 +309,32 @@ class Your(PsrfitsFile, SigprocFile):
             frequency_decimation_factor (int): number of frequency channels to average
             pol (int): which polarization to chose
             npoln (int): number of polarization to return
+            copy (bool): If False, data which already has the output dtype is returned
+            without a copy. For filterbank files this is a read-only view of the memory
+            mapped file.
+            out (numpy.ndarray): Optional array to write the data into, with the same
+            shape as the returned data. It can be reused across calls with a fixed gulp
+            to avoid allocating a new array for every read.
+            c_min (int): First channel to read (default: 0)
+            c_max (int): Channel to stop reading at, exclusive (default: nchans). Only
+            the selected channels are decoded by the format readers.
+            workers (int): Number of threads decoding PSRFITS subints concurrently. Not
+            used for filterbank files, which are memory mapped.
+            use_numba (bool): Decimate with the parallel numba kernel instead of numpy,
+            which is faster when channels are averaged (see `block_decimate`).
 
         Note:
-            The decimation (both in time and frequency) is done on the data read i.e containing `nsamp` number of samples
-            and `nchans` number of channels. Therefore, both decimation factors should exactly divide the
-            nsamps or nchans respectively.
+            The decimation (both in time and frequency) is done on the data read i.e
+            containing `nsamp` number of samples and `nchans` number of channels (or
+            `c_max - c_min` if a channel range is selected). Therefore, both decimation
+            factors should exactly divide the nsamps or nchans respectively.
+
+
+            The decimation factors which are passed are stored in the header (whose
+            nspectra, tsamp, etc. depend on them), and those of the header are used
+            otherwise. A read uses its own copy of the factors, so one object can be
+            read from many threads at once, and from processes forked or unpickled from
+            it. Reads with other factors than those of the header should pass them.
 
         Returns:
             numpy.ndarray: 2D numpy array of data
@@ -187,38 +343,49 @@ class Your(PsrfitsFile, SigprocFile):
         """
         logger.debug(f"Reading {nsamp} samples from sample {nstart}")
 
-        if self.your_header.time_decimation_factor != 1:
+        # the factors of this call are kept in local variables, so that concurrent calls
+        # with other factors do not change them halfway through the read
+        if time_decimation_factor is None:
+            time_decimation_factor = self.your_header.time_decimation_factor
+        else:
+            self.your_header.time_decimation_factor = time_decimation_factor
+        if frequency_decimation_factor is None:
+            frequency_decimation_factor = self.your_header.frequency_decimation_factor
+        else:
+            self.your_header.frequency_decimation_factor = frequency_decimation_factor
+
+        if time_decimation_factor != 1:
             logger.warning(
-                f"Setting Time decimation factor to {self.your_header.time_decimation_factor},"
+                f"Setting Time decimation factor to {time_decimation_factor},"
                 f"this will change the properties of the class"
             )
 
-        if self.your_header.frequency_decimation_factor != 1:
+        if frequency_decimation_factor != 1:
             logger.warning(
-                f"Setting frequency decimation factor to {self.your_header.frequency_decimation_factor},"
+                f"Setting frequency decimation factor to {frequency_decimation_factor},"
                 f"this will change the properties of the class"
             )
 
-        if time_decimation_factor is not None:
-            self.your_header.time_decimation_factor = time_decimation_factor
-        if frequency_decimation_factor is not None:
-            self.your_header.frequency_decimation_factor = frequency_decimation_factor
+        logger.debug(f"time_decimation_factor: {time_decimation_factor}")
+        logger.debug(f"frequency_decimation_factor: {frequency_decimation_factor}")
 
-        logger.debug(
-            f"time_decimation_factor: {self.your_header.time_decimation_factor}"
-        )
-        logger.debug(
-            f"frequency_decimation_factor: {self.your_header.frequency_decimation_factor}"
-        )
+        if nsamp % time_decimation_factor != 0:
+            raise ValueError(
+                f"time_decimation_factor: {time_decimation_factor} should be a divisor "
+                f"of nsamp: {nsamp}"
+            )
 
-        if nsamp % self.your_header.time_decimation_factor != 0:
+        nchans = len(range(self.nchans)[c_min:c_max])
+        if nchans == 0:
             raise ValueError(
-                f"time_decimation_factor: {self.your_header.time_decimation_factor} should be a divisor of nsamp: {nsamp}"
+                f"No channels selected with c_min: {c_min} and c_max: {c_max} "
+                f"(nchans: {self.nchans})"
             )
 
-        if self.nchans % self.your_header.frequency_decimation_factor != 0:
+        if nchans % frequency_decimation_factor != 0:
             raise ValueError(
-                f"frequency_decimation_factor: {self.your_header.frequency_decimation_factor} should be a divisor or nchans:{self.nchans}"
+                f"frequency_decimation_factor: {frequency_decimation_factor} should be "
+                f"a divisor or nchans:{nchans}"
             )
 
         assert npoln <= self.your_header.npol, (
@@ -252,45 +419,141 @@ class Your(PsrfitsFile, SigprocFile):
                 f"npoln ({npoln}) can only be 1 (one polarisation) or 4 (all)."
             )
 
-        data = self.formatclass.get_data(self, nstart, nsamp, pol=pol, npoln=npoln)
+        decimate = (time_decimation_factor > 1) or (frequency_decimation_factor > 1)
+        if out is not None:
+            expected_shape = (
+                nsamp // time_decimation_factor,
+                npoln,
+                nchans // frequency_decimation_factor,
+            )
+            if npoln == 1:
+                expected_shape = expected_shape[::2]
+            if out.shape != expected_shape:
+                raise ValueError(
+                    f"out has shape {out.shape}, expected {expected_shape}"
+                )
+
+        if out is not None and not decimate and self.format == "fits":
+            # decode the subints straight into the output array
+            data = self.formatclass.get_data(
+                self,
+                nstart,
+                nsamp,
+                pol=pol,
+                npoln=npoln,
+                out=out[:, None, :] if npoln == 1 else out,
+                c_min=c_min,
+                c_max=c_max,
+                workers=workers,
+            )
+            if self.your_header.nbits != 32 and np.issubdtype(data.dtype, np.floating):
+                np.rint(data, out=data)
+            return data[:, 0, :] if npoln == 1 else data
+
+        format_kwargs = {"workers": workers} if self.format == "fits" else {}
+        data = self.formatclass.get_data(
+            self,
+            nstart,
+            nsamp,
+            pol=pol,
+            npoln=npoln,
+            c_min=c_min,
+            c_max=c_max,
+            **format_kwargs,
+        )
 
         if data.shape[1] == 1:
             data = data[:, 0, :]
 
-        if (self.your_header.time_decimation_factor > 1) or (
-            self.your_header.frequency_decimation_factor > 1
-        ):
-            sh = data.shape
-            if len(sh) == 2:
-                nt, nf = sh
-                data = data.reshape(
-                    self.your_header.time_decimation_factor,
-                    nt // self.your_header.time_decimation_factor,
-                    nf // self.your_header.frequency_decimation_factor,
-                    self.your_header.frequency_decimation_factor,
-                )
-            elif len(sh) == 3:
-                nt, nifs, nf = sh
-                data = data.reshape(
-                    self.your_header.time_decimation_factor,
-                    nt // self.your_header.time_decimation_factor,
-                    nifs,
-                    nf // self.your_header.frequency_decimation_factor,
-                    self.your_header.frequency_decimation_factor,
-                )
+        if decimate:
+            data = block_decimate(
+                data,
+                time_decimation_factor,
+                frequency_decimation_factor,
+                use_numba=use_numba,
+            )
+        if out is not None:
+            out = out[: len(data)]
+            if self.your_header.nbits != 32 and data.dtype != self.your_header.dtype:
+                np.rint(data, out=out, casting="unsafe")
             else:
-                raise ValueError(
-                    f"data shape is {sh}. But data can only have either 2 (nt, nf) or 3 (nt, nifs, nf) "
-                    f"dimensions."
-                )
-            data = data.astype(np.float32)
-            data = data.mean(axis=0)
-            data = data.mean(axis=-1)
-        if self.your_header.nbits != 32:
-            data = np.round(data)
-            data = data.astype(self.your_header.dtype)
+                out[...] = data
+            data = out
+        elif self.your_header.nbits != 32:
+            if copy or data.dtype != self.your_header.dtype:
+                data = np.round(data)
+                data = data.astype(self.your_header.dtype)
+            else:
+                logger.debug("Returning data without a copy")
         return data
 
+    def get_data_many(self, windows, max_span_mb=1024, **kwargs):
+        """
+        Read many windows of data, reading overlapping or adjacent windows once. The
+        windows are sorted and merged into spans, each span is read with a single
+        `get_data` call, and the windows are returned as views into the spans.
+
+        Args:
+            windows (list): (nstart, nsamp) of each window
+            max_span_mb (float): Windows are not merged into spans larger than this
+            (MB), unless a single window is larger
+            **kwargs: arguments passed on to `get_data` (e.g. pol, npoln, c_min, c_max,
+            workers)
+
+        Examples:
+            windows = [(1000, 256), (1100, 256), (50000, 512)]
+            for data in your_object.get_data_many(windows):
+                process(data)
+
+        Returns:
+            list: numpy.ndarray of data for each window, in the order of windows.
+            Windows read from the same span share its memory.
+
+        """
+        if (
+            self.your_header.time_decimation_factor != 1
+            or kwargs.get("time_decimation_factor", 1) != 1
+        ):
+            raise ValueError("get_data_many can not decimate the data in time.")
+        for arg in ("out", "copy"):
+            if arg in kwargs:
+                raise TypeError(f"get_data_many does not take the '{arg}' argument")
+
+        bytes_per_sample = (
+            np.dtype(self.your_header.dtype).itemsize
+            * self.your_header.nchans
+            * kwargs.get("npoln", 1)
+        )
+        max_span = max(int(max_span_mb * 2**20 // bytes_per_sample), 1)
+
+        # merge the sorted windows into spans of [start, stop)
+        windows = [(int(nstart), int(nsamp)) for nstart, nsamp in windows]
+        order = sorted(range(len(windows)), key=lambda i: windows[i][0])
+        spans = []
+        span_of = {}
+        for i in order:
+            nstart, nsamp = windows[i]
+            if nsamp < 0:
+                raise ValueError(f"nsamp ({nsamp}) of window {i} can not be negative")
+            if spans:
+                start, stop = spans[-1]
+                if nstart <= stop and max(stop, nstart + nsamp) - start <= max_span:
+                    spans[-1][1] = max(stop, nstart + nsamp)
+                    span_of[i] = len(spans) - 1
+                    continue
+            spans.append([nstart, nstart + nsamp])
+            span_of[i] = len(spans) - 1
+        logger.debug(f"Reading {len(windows)} windows in {len(spans)} spans")
+
+        span_data = [
+            self.get_data(start, stop - start, **kwargs) for start, stop in spans
+        ]
+        out = []
+        for i, (nstart, nsamp) in enumerate(windows):
+            start = spans[span_of[i]][0]
+            out.append(span_data[span_of[i]][nstart - start : nstart - start + nsamp])
+        return out
+
     def __repr__(self):
         if isinstance(self.your_file, list):
             s = "\n".join(map(str, self.your_file))
@@ -344,6 +607,9 @@ class Header:
         tstart (float): Start MJD of the data
         fch1 (float): Frequency of the first channel (MHz)
         npol (int): Number of polarisations in the data
+        gl (float): Galactic longitude of the source (degrees), computed when first used
+        gb (float): Galactic latitude of the source (degrees), computed when first used
+        tstart_utc (str): Start time of the data in UTC, computed when first used
     """
 
     def __init__(self, your):
@@ -401,23 +667,35 @@ class Header:
         self.npol = your.nifs
         self.poln_order = your.poln_order
         self.tstart = your.tstart
-        from astropy.coordinates import SkyCoord
 
-        if self.ra_deg and self.dec_deg:
-            loc = SkyCoord(self.ra_deg, self.dec_deg, unit="deg")
-            self.gl = loc.galactic.l.value - 180
-            self.gb = loc.galactic.b.value
-        else:
-            # for 174 bit header Filterbank
-            self.gl = None
-            self.gb = None
+        logger.debug(f"Successfully generated unified header for file {self.filename}")
 
-        from astropy.time import Time
+    @cached_property
+    def gl(self):
+        """
+        Galactic longitude of the source (degrees, -180 to 180), None if the file has no
+        coordinates
+        """
+        if self.ra_deg and self.dec_deg:
+            return radec2galactic(self.ra_deg, self.dec_deg)[0] - 180
+        # for 174 bit header Filterbank
+        return None
 
-        ts = Time(your.tstart, format="mjd")
-        self.tstart_utc = ts.utc.isot
+    @cached_property
+    def gb(self):
+        """
+        Galactic latitude of the source (degrees), None if the file has no coordinates
+        """
+        if self.ra_deg and self.dec_deg:
+            return radec2galactic(self.ra_deg, self.dec_deg)[1]
+        return None
 
-        logger.debug(f"Successfully generated unified header for file {self.filename}")
+    @cached_property
+    def tstart_utc(self):
+        """
+        Start time of the data in UTC (ISO 8601)
+        """
+        return mjd2isot(self.tstart)
 
     @property
     def tsamp(self):
@@ -444,3 +722,35 @@ class Header:
         return "Unified Header:" + json.dumps(d, cls=MyEncoder, indent=2)[1:-1].replace(
             ",", ""
         )
+
+
+def read_headers(files, workers=8, use_header_index=None):
+    """
+    Read the unified headers of many observations, opening the files on a thread pool.
+    Useful to build a catalogue of an archive, where the time to open each file (rather
+    than to read it) dominates.
+
+    Args:
+        files (list): Observations to read, each a file name or a list of PSRFITS files
+        (see `Your`)
+        workers (int): Number of threads opening the files
+        use_header_index (bool): Keep the PSRFITS header values in an index next to the
+        files, see `Your`
+
+    Returns:
+        list: Header of each observation, in the order of files
+
+    """
+
+    def read_header(file):
+        your_object = Your(file, use_header_index=use_header_index)
+        if your_object.format == "fits":
+            # only the header is kept, don't wait for the garbage collector to close the
+            # files
+            your_object.fits_pool.close()
+        return your_object.your_header
+
+    if workers > 1 and len(files) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            return list(pool.map(read_header, files))
+    return [read_header(file) for file in files]